@@ -1,7 +1,12 @@
-import streamlit as st
-import pandas as pd
+import logging
+import sqlite3
 from datetime import date
+import streamlit as st
 from src.database.connection import db_instance
+from src.services.stats_service import StatsService
+
+# Log para rastreabilidade (configurado no ponto de entrada, não nos módulos)
+logging.basicConfig(level=logging.INFO)
 
 # Configuração da Página deve ser a primeira linha executável
 st.set_page_config(
@@ -12,51 +17,41 @@ st.set_page_config(
 )
 
 def load_summary():
-    """Carrega estatísticas rápidas do banco."""
-    conn = db_instance.get_connection()
+    """Carrega estatísticas rápidas do banco (contadores + extremos do índice de datas)."""
     try:
-        # Busca totais
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM transactions")
-        total_recs = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM transactions WHERE category IS NULL OR category = ''")
-        pending_recs = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT MIN(date), MAX(date) FROM transactions")
-        min_date, max_date = cursor.fetchone()
-        
-        return total_recs, pending_recs, min_date, max_date
-    except Exception as e:
-        return 0, 0, None, None
-    finally:
-        conn.close()
+        return StatsService().get_system_stats(), None
+    except sqlite3.Error as e:
+        return None, e
 
 # --- INTERFACE ---
 st.title("🛡️ Finanças: Modo Absoluto")
 st.markdown("### Visão Geral do Sistema")
 
 # Carrega dados
-total, pending, start, end = load_summary()
+stats, stats_error = load_summary()
+
+if stats_error:
+    st.error(f"Falha ao ler estatísticas do banco: {stats_error}")
+    stats = {"total": 0, "archived": 0, "pending": 0, "start": None, "end": None, "db_size_bytes": 0}
 
 # Métricas de Topo
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
-    st.metric("Total Transações", total)
+    st.metric("Total Transações", stats["total"])
 
 with col2:
-    st.metric("Pendentes de Classificação", pending, delta_color="inverse")
+    st.metric("Pendentes de Classificação", stats["pending"], delta_color="inverse")
 
 with col3:
-    if start:
+    if stats["start"]:
         # Formatação de data pode variar conforme banco, tratamento básico
-        st.metric("Início dos Registros", pd.to_datetime(start).strftime("%d/%m/%Y"))
+        st.metric("Início dos Registros", date.fromisoformat(str(stats["start"])[:10]).strftime("%d/%m/%Y"))
     else:
         st.metric("Início", "-")
 
 with col4:
-    status = "Online" if total >= 0 else "Erro"
+    status = "Erro" if stats_error else "Online"
     st.metric("Status do Banco", status, delta="G: Drive Conectado" if "G:" in str(db_instance.db_path) else "Modo Local")
 
 st.divider()
@@ -86,4 +81,7 @@ with c3:
 
 # Rodapé Técnico
 st.markdown("---")
-st.caption(f"Caminho do Banco de Dados: `{db_instance.db_path}`")
\ No newline at end of file
+size_mb = stats["db_size_bytes"] / (1024 * 1024)
+period = f"{stats['start']} → {stats['end']}" if stats["start"] else "-"
+archived = f" · Acervo: {stats['archived']} transações em `{db_instance.archive_dir.name}/`" if stats["archived"] else ""
+st.caption(f"Caminho do Banco de Dados: `{db_instance.db_path}` · Tamanho: {size_mb:.1f} MB · Período: {period}{archived}")
\ No newline at end of file
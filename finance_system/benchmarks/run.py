@@ -0,0 +1,357 @@
+"""
+Suíte de benchmarks dos caminhos críticos (parsing, importação, classificação, dashboard).
+
+Os bancos de 10k/100k/1M transações são gerados por `synthetic.py` na primeira execução
+e ficam em cache em benchmarks/data/ (o nome inclui semente e versão do gerador).
+Casos que gravam no banco rodam sobre uma cópia nova a cada repetição.
+
+Uso (a partir de finance_system/):
+    python benchmarks/run.py                                  # 10k e 100k, tabela no terminal
+    python benchmarks/run.py --sizes 10k 100k 1m --output benchmarks/baseline.json
+    python benchmarks/run.py --compare benchmarks/baseline.json   # código 1 se houver regressão
+    python benchmarks/run.py --cases parse_bb_csv dashboard_load --repeat 10
+"""
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, List, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT = BENCH_DIR.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(BENCH_DIR))
+
+import synthetic  # noqa: E402
+from src.database.connection import db_instance  # noqa: E402
+from src.database.writer import writer  # noqa: E402
+
+DATA_DIR = BENCH_DIR / "data"
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+# Data de referência fixa (fim do histórico sintético): resultados independem do dia da execução
+REFERENCE_DATE = date(2025, 12, 31)
+CATEGORY_IGNORE = "⛔ IGNORADO"
+
+# Regressão = mediana acima de (1 + limiar) x baseline e pelo menos NOISE_FLOOR_MS mais lenta
+DEFAULT_THRESHOLD = 0.25
+NOISE_FLOOR_MS = 2.0
+
+@dataclass
+class Context:
+    """Dados de um tamanho de banco: caminho em cache, arquivos sintéticos e pasta de rascunho."""
+    label: str
+    rows: int
+    seed: int
+    db_path: Path
+    scratch: Path
+    _payloads: Optional[list] = field(default=None, repr=False)
+
+    @property
+    def payloads(self) -> list:
+        """Arquivos sintéticos (nome, bytes) que deram origem ao banco (gerados uma vez)."""
+        if self._payloads is None:
+            self._payloads = synthetic.generate_payloads(self.rows, self.seed)
+        return self._payloads
+
+    @property
+    def scratch_db(self) -> Path:
+        return self.scratch / f"scratch_{self.label}.db"
+
+    def fresh_copy(self) -> Path:
+        """Cópia do banco em cache (API de backup: consistente mesmo com WAL) e aponta o singleton para ela."""
+        target = self.scratch_db
+        writer.close()  # A conexão de escrita ainda aponta para a cópia anterior (e o WAL dela)
+        for stale in (target, target.with_name(target.name + "-wal"), target.with_name(target.name + "-shm")):
+            stale.unlink(missing_ok=True)
+        src, dst = sqlite3.connect(self.db_path), sqlite3.connect(target)
+        try:
+            src.backup(dst)
+        finally:
+            src.close()
+            dst.close()
+        db_instance.configure(target)
+        return target
+
+@dataclass
+class Case:
+    """
+    Um benchmark: `setup(ctx)` prepara o estado (não cronometrado), `run(state)` é medido.
+    `mutates=True` recria a cópia do banco em cada repetição; `max_rows` pula tamanhos maiores.
+    """
+    name: str
+    run: Callable
+    setup: Callable = lambda ctx: None
+    mutates: bool = False
+    max_rows: Optional[int] = None
+    skip_reason: str = ""
+
+# --- CASOS ---
+
+def _setup_csv(ctx: Context):
+    return [(name, data) for name, data in ctx.payloads if name.endswith(".csv")]
+
+def _run_csv(files):
+    from src.utils.parsers import parse_bb_csv
+    return sum(len(parse_bb_csv(io.BytesIO(data), name)) for name, data in files)
+
+def _setup_txt(ctx: Context):
+    return [(name, data) for name, data in ctx.payloads if name.endswith(".txt")]
+
+def _run_txt(files):
+    from src.utils.parsers import parse_sisbb_txt
+    return sum(len(parse_sisbb_txt(io.BytesIO(data), name)) for name, data in files)
+
+def _setup_import(ctx: Context):
+    """Um mês novo (após o histórico), no formato de UploadedFile, sobre uma cópia do banco."""
+    ctx.fresh_copy()
+    month = synthetic.START_MONTH + synthetic.MONTHS
+    payloads = synthetic.generate_payloads(
+        max(1, ctx.rows // synthetic.MONTHS), seed=ctx.seed + 1, months=1, start_month=month
+    )
+    return [SimpleNamespace(name=name, getvalue=(lambda data=data: data)) for name, data in payloads]
+
+def _run_import(uploads):
+    from src.services.importer_service import ImporterService
+    return ImporterService().process_files(uploads)["saved"]
+
+def _setup_classification(ctx: Context):
+    """Cópia do banco com todas as classificações automáticas desfeitas."""
+    ctx.fresh_copy()
+    conn = db_instance.get_connection()
+    try:
+        conn.execute("UPDATE transactions SET category = NULL WHERE is_manual = 0")
+        conn.commit()
+    finally:
+        conn.close()
+
+def _run_classification(_):
+    from src.services.categorizer_service import CategorizerService
+    return CategorizerService().run_auto_classification()
+
+def _run_vacation(_):
+    from src.services.importer_service import ImporterService
+    to_update, protected = ImporterService().preview_vacation_mode(date(2025, 12, 1), date(2025, 12, 7))
+    return len(to_update) + len(protected)
+
+def _run_dashboard(_):
+    """Mesma carga de pages/4_📊_Dashboard.py (últimos 12 meses) e seus agrupamentos principais."""
+    import pandas as pd
+
+    start, end = REFERENCE_DATE.replace(year=REFERENCE_DATE.year - 1), REFERENCE_DATE
+    conn = db_instance.get_connection()
+    try:
+        df = pd.read_sql_query(f"""
+            SELECT * FROM transactions
+            WHERE date BETWEEN '{start}' AND '{end}'
+            AND (category IS NULL OR category != '{CATEGORY_IGNORE}')
+        """, conn)
+    finally:
+        conn.close()
+    df['date'] = pd.to_datetime(df['date']).dt.date
+    expenses = df[df['amount'] < 0]
+    expenses.groupby('category')['amount'].sum()
+    df.assign(month=pd.to_datetime(df['date']).dt.to_period('M')).groupby('month')['amount'].sum()
+    return len(df)
+
+def _run_liabilities(_):
+    from src.services.loan_service import LoanService
+    return len(LoanService().project_liabilities(start_date=REFERENCE_DATE, horizon_months=120, by_source=True))
+
+def _run_stats(_):
+    from src.services.stats_service import StatsService
+    return StatsService().get_system_stats()["total"]
+
+def _run_forecast(_):
+    """Previsão de 60 meses sem cache (o caso medido é o recálculo após uma mudança nos dados)."""
+    from src.services import forecast_service
+    forecast_service._CACHE.clear()
+    return len(forecast_service.ForecastService().forecast(horizon_months=60, as_of=REFERENCE_DATE)["monthly"])
+
+def _run_trends(_):
+    """Matriz categoria x mês remontada e janelas de todo o histórico (sem cache)."""
+    from src.services import trend_service
+    trend_service._CACHE.clear()
+    return len(trend_service.TrendService().trends())
+
+def _run_plan(_):
+    from src.services.loan_service import LoanService
+    return len(LoanService().generate_plan("Financiamento Imóvel", 2500.0, date(2026, 1, 10), 420))
+
+CASES = [
+    Case("parse_bb_csv", _run_csv, _setup_csv),
+    Case("parse_sisbb_txt", _run_txt, _setup_txt),
+    Case("process_files", _run_import, _setup_import, mutates=True),
+    Case("run_auto_classification", _run_classification, _setup_classification, mutates=True),
+    Case("preview_vacation_mode", _run_vacation),
+    Case("dashboard_load", _run_dashboard),
+    Case("project_liabilities", _run_liabilities),
+    Case("home_stats", _run_stats),
+    Case("generate_plan", _run_plan),
+    Case("forecast", _run_forecast),
+    Case("trends", _run_trends),
+]
+
+# --- EXECUÇÃO ---
+
+def prepare(label: str, seed: int, rebuild: bool) -> Context:
+    """Garante o banco em cache do tamanho `label` (gera na primeira vez) e aponta o singleton para ele."""
+    rows = SIZES[label]
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    db_path = DATA_DIR / f"bench_{label}_s{seed}_v{synthetic.GENERATOR_VERSION}.db"
+    if rebuild or not db_path.exists():
+        print(f"Gerando banco {label} ({rows} transações)...", file=sys.stderr, flush=True)
+        started = time.perf_counter()
+        partial = db_path.with_suffix(".partial")
+        synthetic.build_database(partial, rows, seed, workers=os.cpu_count() or 1)
+        partial.replace(db_path)
+        print(f"  pronto em {time.perf_counter() - started:.1f}s", file=sys.stderr, flush=True)
+    db_instance.configure(db_path)
+    return Context(label, rows, seed, db_path, DATA_DIR)
+
+def measure(case: Case, ctx: Context, repeat: int) -> dict:
+    """Mede `repeat` execuções (com aquecimento nos casos só de leitura) e resume em ms."""
+    if case.max_rows is not None and ctx.rows > case.max_rows:
+        return {"skipped": case.skip_reason or f"acima de {case.max_rows} linhas"}
+
+    timings, result = [], None
+    state = None if case.mutates else case.setup(ctx)
+    if not case.mutates:
+        case.run(state)  # Aquecimento: cache de páginas do SQLite e imports tardios
+    for _ in range(repeat):
+        if case.mutates:
+            state = case.setup(ctx)
+        gc.collect()
+        started = time.perf_counter()
+        result = case.run(state)
+        timings.append((time.perf_counter() - started) * 1000)
+    if case.mutates:
+        db_instance.configure(ctx.db_path)
+        ctx.scratch_db.unlink(missing_ok=True)
+
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "min_ms": round(min(timings), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "stdev_ms": round(statistics.stdev(timings), 3) if len(timings) > 1 else 0.0,
+        "repeat": len(timings),
+        "result": result if isinstance(result, (int, float)) else None,
+    }
+
+def environment(seed: int) -> dict:
+    """Metadados da execução (para saber se duas baselines são comparáveis)."""
+    import numpy
+    import pandas
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=ROOT
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "seed": seed,
+        "generator_version": synthetic.GENERATOR_VERSION,
+    }
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[dict]:
+    """Compara medianas caso a caso; status 'regressão', 'melhora' ou 'ok'."""
+    rows = []
+    for label, cases in current["results"].items():
+        for name, now in cases.items():
+            before = baseline.get("results", {}).get(label, {}).get(name)
+            if not before or "median_ms" not in before or "median_ms" not in now:
+                continue
+            ratio = now["median_ms"] / before["median_ms"] if before["median_ms"] else float("inf")
+            delta = now["median_ms"] - before["median_ms"]
+            status = "ok"
+            if ratio > 1 + threshold and delta > NOISE_FLOOR_MS:
+                status = "regressão"
+            elif ratio < 1 - threshold and -delta > NOISE_FLOOR_MS:
+                status = "melhora"
+            rows.append({
+                "size": label, "case": name, "baseline_ms": before["median_ms"],
+                "median_ms": now["median_ms"], "ratio": round(ratio, 3), "status": status,
+            })
+    return rows
+
+def print_table(report: dict, comparison: Optional[List[dict]]):
+    """Tabela legível: mediana/mínimo por caso e, se houver, a comparação com a baseline."""
+    compared = {(r["size"], r["case"]): r for r in comparison or []}
+    header = f"{'caso':<26}{'tamanho':>8}{'mediana ms':>13}{'mín ms':>11}"
+    if comparison is not None:
+        header += f"{'baseline ms':>13}{'razão':>8}  status"
+    print(header)
+    print("-" * len(header))
+    for label, cases in report["results"].items():
+        for name, res in cases.items():
+            if "skipped" in res:
+                print(f"{name:<26}{label:>8}  pulado: {res['skipped']}")
+                continue
+            line = f"{name:<26}{label:>8}{res['median_ms']:>13.1f}{res['min_ms']:>11.1f}"
+            row = compared.get((label, name))
+            if row:
+                line += f"{row['baseline_ms']:>13.1f}{row['ratio']:>8.2f}  {row['status']}"
+            print(line)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks dos caminhos críticos.")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=["10k", "100k"],
+                        help="Tamanhos de banco (1m leva alguns minutos para gerar na primeira vez).")
+    parser.add_argument("--cases", nargs="+", choices=[c.name for c in CASES], help="Subconjunto de casos.")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetições medidas por caso.")
+    parser.add_argument("--seed", type=int, default=42, help="Semente dos dados sintéticos.")
+    parser.add_argument("--rebuild", action="store_true", help="Regenera os bancos em cache.")
+    parser.add_argument("--output", help="Grava o resultado em JSON (ex: nova baseline).")
+    parser.add_argument("--compare", help="Baseline JSON para detectar regressões.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Aumento relativo da mediana tolerado (padrão: 0.25 = 25%%).")
+    parser.add_argument("--json", action="store_true", help="Imprime o relatório em JSON (stdout).")
+    args = parser.parse_args(argv)
+
+    selected = [c for c in CASES if not args.cases or c.name in args.cases]
+    report = {"meta": environment(args.seed), "results": {}}
+    for label in args.sizes:
+        ctx = prepare(label, args.seed, args.rebuild)
+        report["results"][label] = {}
+        for case in selected:
+            print(f"[{label}] {case.name}...", file=sys.stderr, flush=True)
+            report["results"][label][case.name] = measure(case, ctx, max(1, args.repeat))
+
+    comparison = None
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        comparison = compare(report, baseline, args.threshold)
+        report["comparison"] = {"baseline": args.compare, "threshold": args.threshold, "rows": comparison}
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_table(report, comparison)
+
+    regressions = [r for r in comparison or [] if r["status"] == "regressão"]
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
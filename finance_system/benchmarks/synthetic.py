@@ -0,0 +1,221 @@
+"""
+Gerador determinístico de extratos sintéticos (BB CSV e fatura SISBB TXT).
+
+Os arquivos seguem o layout lido por `parse_bb_csv` / `parse_sisbb_txt`: um CSV e um TXT
+por mês, com linhas de saldo/pagamento que os parsers descartam. A mesma semente gera
+sempre os mesmos bytes, então bancos e medições são comparáveis entre máquinas.
+
+Uso (a partir de finance_system/):
+    python benchmarks/synthetic.py files ./amostras --rows 10000
+    python benchmarks/synthetic.py db benchmarks/data/teste.db --rows 100000
+"""
+import argparse
+import os
+import sys
+from datetime import date
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# Versão do gerador: mudar o layout ou o catálogo invalida os bancos em cache
+GENERATOR_VERSION = 1
+
+START_MONTH = np.datetime64("2021-01", "M")  # Histórico sintético: 60 meses a partir daqui
+MONTHS = 60
+CARD_SHARE = 0.3  # Fração das linhas que vêm pela fatura do cartão (TXT)
+
+# (nome, canal, categoria da regra ou None = fica pendente, valor mínimo, máximo, peso)
+# Canais: 'card' (cartão: TXT e "Compra com Cartão" no CSV), 'pix_out', 'pix_in', 'boleto'
+MERCHANTS = [
+    ("PADARIA SOL NASCENTE", "card", "Alimentação", 5, 60, 8),
+    ("SUPERMERCADO BOM PRECO", "card", "Mercado", 40, 900, 7),
+    ("ATACADAO DIA A DIA", "card", "Mercado", 80, 1200, 3),
+    ("IFOOD *RESTAURANTE", "card", "Alimentação", 25, 160, 6),
+    ("UBER *TRIP", "card", "Transporte", 9, 70, 7),
+    ("POSTO SHELL ASA NORTE", "card", "Transporte", 80, 350, 4),
+    ("DROGARIA ROSARIO", "card", "Saúde", 12, 400, 4),
+    ("NETFLIX.COM", "card", "Assinaturas", 39.9, 55.9, 1),
+    ("SPOTIFY BRASIL", "card", "Assinaturas", 21.9, 34.9, 1),
+    ("AMAZON MARKETPLACE", "card", "Compras", 20, 800, 4),
+    ("MERCADOLIVRE*VENDEDOR", "card", "Compras", 15, 1500, 3),
+    ("LOJAS RENNER", "card", "Vestuário", 60, 700, 2),
+    ("CINEMARK BRASILIA", "card", "Lazer", 30, 150, 2),
+    ("BONNAPAN BRASILIA BR", "card", "Alimentação", 8, 80, 3),
+    ("PET SHOP AMIGO FIEL", "card", "Pet", 30, 450, 2),
+    ("LOJA 190 VARIEDADES", "card", None, 5, 300, 3),
+    ("PAG*JOSEDASILVA", "card", None, 10, 250, 3),
+    ("SUMUP *COMERCIO", "card", None, 5, 200, 2),
+    ("ESCOLA PEQUENO PRINCIPE", "boleto", "Educação", 1800, 2400, 1),
+    ("CONDOMINIO RES IPE", "boleto", "Moradia", 650, 900, 1),
+    ("NEOENERGIA", "boleto", "Moradia", 120, 600, 1),
+    ("CLARO TELEFONIA", "boleto", "Moradia", 99, 180, 1),
+    ("Maria Aparecida", "pix_out", "Diarista", 150, 250, 2),
+    ("Joao Pedro Santos", "pix_out", None, 20, 500, 3),
+    ("Academia Corpo Livre", "pix_out", "Saúde", 110, 140, 1),
+    ("Ana Carolina Lima", "pix_in", None, 20, 600, 2),
+    ("Reembolso Empresa", "pix_in", "Receitas", 50, 900, 1),
+]
+
+# Termos de regra (substring da descrição gravada) para as categorias do catálogo
+RULES: List[Tuple[str, str]] = [
+    (name.split("*")[0].split(" ")[0] if channel == "card" else name, category)
+    for name, channel, category, *_ in MERCHANTS if category
+]
+
+SALARY = ("Crédito Salário", 9500.0)  # Entrada fixa no dia 5 de cada mês (CSV)
+
+def _loans():
+    """Contratos de exemplo (importação tardia: o modelo só é necessário ao popular o banco)."""
+    from src.models.loan import Loan, SCHEDULE_SAC
+    return [
+        Loan("Financiamento Imóvel", 350_000.0, 0.0085, 360, date(2021, 3, 10), SCHEDULE_SAC, "Moradia"),
+        Loan("Financ. Carro", 60_000.0, 0.0149, 48, date(2023, 7, 15)),
+        Loan("Consignado", 15_000.0, 0.0179, 24, date(2025, 2, 5)),
+    ]
+
+def _br_amount(value: float) -> str:
+    """1234.5 -> '1.234,50' (padrão da fatura SISBB)."""
+    return f"{value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+def _month_rows(rng: np.random.Generator, month: np.datetime64, count: int):
+    """Linhas sorteadas de um mês: (datas, índices do catálogo, valores positivos)."""
+    weights = np.array([m[5] for m in MERCHANTS], dtype=np.float64)
+    idx = rng.choice(len(MERCHANTS), size=count, p=weights / weights.sum())
+    lo = np.array([m[3] for m in MERCHANTS])[idx]
+    hi = np.array([m[4] for m in MERCHANTS])[idx]
+    amounts = np.round(rng.uniform(lo, hi), 2)
+
+    first = month.astype("datetime64[D]")
+    days = ((month + 1).astype("datetime64[D]") - first).astype(int)
+    dates = first + rng.integers(0, days, size=count)
+    order = np.argsort(dates, kind="stable")
+    return dates[order], idx[order], amounts[order]
+
+def _csv_month(rng: np.random.Generator, month: np.datetime64, count: int) -> bytes:
+    """Extrato BB (CSV, latin-1) de um mês, com saldo anterior, salário e saldo final."""
+    dates, idx, amounts = _month_rows(rng, month, count)
+    hours = rng.integers(6, 23, size=count)
+    minutes = rng.integers(0, 60, size=count)
+
+    lines = ['"Data","Dependencia Origem","Histórico","Data do Balancete","Número do documento","Valor",']
+    first = month.astype("datetime64[D]").item()
+    lines.append(f'"{first:%d/%m/%Y}","","Saldo Anterior","","0","0.00",')
+    lines.append(f'"{first.replace(day=5):%d/%m/%Y}","","{SALARY[0]}","","0","{SALARY[1]:.2f}",')
+
+    for d, i, value, hh, mm in zip(dates.tolist(), idx.tolist(), amounts.tolist(), hours.tolist(), minutes.tolist()):
+        name, channel = MERCHANTS[i][0], MERCHANTS[i][1]
+        stamp = f"{d:%d/%m} {hh:02d}:{mm:02d}"
+        if channel == "card":
+            history, value = f"Compra com Cartão - {stamp} {name}", -value
+        elif channel == "pix_out":
+            history, value = f"Pix - Enviado - {stamp} {name}", -value
+        elif channel == "pix_in":
+            history = f"Pix - Recebido - {stamp} {name}"
+        else:
+            history, value = f"Pagamento de Boleto - {name}", -value
+        lines.append(f'"{d:%d/%m/%Y}","","{history}","","{rng.integers(1, 999999)}","{value:.2f}",')
+
+    last = ((month + 1).astype("datetime64[D]") - 1).item()
+    lines.append(f'"{last:%d/%m/%Y}","","S A L D O","","0","0.00",')
+    return ("\n".join(lines) + "\n").encode("latin-1")
+
+def _txt_month(rng: np.random.Generator, month: np.datetime64, count: int) -> bytes:
+    """Fatura SISBB (TXT, latin-1) de um mês: cabeçalho, saldo/pagamento (descartados) e compras."""
+    card = np.array([i for i, m in enumerate(MERCHANTS) if m[1] == "card"])
+    dates, idx, amounts = _month_rows(rng, month, count)
+    # Fatura só tem compras no cartão: remapeia para um estabelecimento do canal 'card'
+    idx = card[idx % len(card)]
+
+    first = month.astype("datetime64[D]").item()
+    lines = [
+        "SISBB - SISTEMA DE INFORMACOES BANCO DO BRASIL",
+        f"OUROCARD VISA INFINITE - FATURA {first:%m/%Y}",
+        "",
+        "Data       Transações                                         Valor em R$",
+        "-" * 78,
+        f"{first:%d.%m.%Y} SALDO FATURA ANTERIOR                          {_br_amount(1000.0):>14}",
+        f"{first:%d.%m.%Y} PGTO DEBITO CONTA                              {_br_amount(1000.0):>14}",
+    ]
+    for d, i, value in zip(dates.tolist(), idx.tolist(), amounts.tolist()):
+        lines.append(f"{d:%d.%m.%Y} {MERCHANTS[i][0]:<46} {_br_amount(value):>14}")
+    lines.append("-" * 78)
+    return ("\n".join(lines) + "\n").encode("latin-1")
+
+def generate_payloads(rows: int, seed: int = 42, months: int = MONTHS,
+                      start_month: np.datetime64 = START_MONTH) -> List[Tuple[str, bytes]]:
+    """
+    Arquivos (nome, bytes) com ~`rows` transações distribuídas em `months` meses:
+    um extrato CSV e uma fatura TXT por mês. Mesmo formato de `ImporterService.process_payloads`.
+    """
+    rng = np.random.default_rng(seed)
+    per_month = max(1, rows // months)
+    card = int(per_month * CARD_SHARE)
+    payloads = []
+    for offset in range(months):
+        month = start_month + offset
+        label = str(month).replace("-", "")
+        payloads.append((f"extrato_{label}.csv", _csv_month(rng, month, per_month - card - 1)))
+        if card:
+            payloads.append((f"fatura_{label}.txt", _txt_month(rng, month, card)))
+    return payloads
+
+def write_files(folder, rows: int, seed: int = 42) -> List[Path]:
+    """Grava os arquivos sintéticos em `folder` (para testar a CLI/watcher com arquivos reais)."""
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for name, data in generate_payloads(rows, seed):
+        path = folder / name
+        path.write_bytes(data)
+        paths.append(path)
+    return paths
+
+def build_database(path, rows: int, seed: int = 42, workers: int = 1) -> dict:
+    """
+    Cria um banco populado em `path`: importa os arquivos sintéticos pelo caminho real
+    (parser + importador), cadastra as regras do catálogo (classifica ~85% das linhas)
+    e os contratos de exemplo. Aponta `db_instance` para o novo arquivo.
+    """
+    from src.database.connection import db_instance
+    from src.database.writer import writer
+    from src.services.categorizer_service import CategorizerService
+    from src.services.importer_service import ImporterService
+    from src.services.loan_service import LoanService
+
+    path = Path(path)
+    for stale in (path, path.with_name(path.name + "-wal"), path.with_name(path.name + "-shm")):
+        stale.unlink(missing_ok=True)
+    db_instance.configure(path)
+
+    stats = ImporterService().process_payloads(generate_payloads(rows, seed), workers=workers)
+    stats.update(CategorizerService().apply_rule_changes(created=RULES))
+    service = LoanService()
+    for loan in _loans():
+        service.save_loan(loan)
+    # Fecha a conexão de escrita: o WAL volta para o arquivo (que em seguida pode ser renomeado)
+    writer.close()
+    return stats
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Gera extratos BB sintéticos (determinísticos).")
+    parser.add_argument("target", choices=["files", "db"], help="Gravar arquivos CSV/TXT ou um banco populado.")
+    parser.add_argument("path", help="Pasta de saída (files) ou arquivo .db (db).")
+    parser.add_argument("--rows", type=int, default=10_000, help="Quantidade aproximada de transações.")
+    parser.add_argument("--seed", type=int, default=42, help="Semente do gerador.")
+    args = parser.parse_args(argv)
+
+    if args.target == "files":
+        paths = write_files(args.path, args.rows, args.seed)
+        print(f"{len(paths)} arquivos gravados em {args.path}")
+    else:
+        stats = build_database(args.path, args.rows, args.seed, workers=os.cpu_count() or 1)
+        print(f"Banco {args.path}: {stats['saved']} transações, {stats['classified']} classificadas")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""
+Ponto de entrada de linha de comando (sem Streamlit).
+
+Exemplos (a partir de finance_system/):
+    python cli.py import ~/Downloads/extratos --recursive --workers 4
+    python cli.py import ~/Downloads/extratos --dry-run --json
+    python cli.py --db data/teste.db import ./amostras
+    python cli.py watch ~/Downloads/extratos --interval 5
+    python cli.py archive --list
+    python cli.py archive --until 2023
+    python cli.py archive --restore 2021
+    python cli.py export --format parquet
+
+Código de saída diferente de zero quando algum arquivo falha, para uso em cron/agendadores.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+from src.database.connection import db_instance
+
+def _collect_files(folder: Path, recursive: bool) -> list:
+    """Lista os arquivos suportados (CSV/TXT) da pasta, em ordem estável."""
+    from src.services.importer_service import SUPPORTED_EXTENSIONS
+
+    pattern = "**/*" if recursive else "*"
+    return sorted(
+        p for p in folder.glob(pattern)
+        if p.is_file() and p.suffix.lower() in SUPPORTED_EXTENSIONS
+    )
+
+def cmd_import(args) -> int:
+    """Importa uma pasta de extratos BB (CSV) e faturas SISBB (TXT)."""
+    from src.services.importer_service import ImporterService
+
+    folder = Path(args.folder).expanduser()
+    if not folder.is_dir():
+        print(f"Pasta não encontrada: {folder}", file=sys.stderr)
+        return 2
+
+    files = _collect_files(folder, args.recursive)
+    started = time.perf_counter()
+    stats = ImporterService().process_payloads(
+        ((p.name, p.read_bytes()) for p in files),
+        dry_run=args.dry_run,
+        workers=args.workers
+    )
+    stats["folder"] = str(folder)
+    stats["duplicates"] = stats["read"] - stats["saved"]
+    stats["elapsed_s"] = round(time.perf_counter() - started, 3)
+
+    if args.json:
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+    else:
+        prefix = "[simulação] " if args.dry_run else ""
+        print(f"{prefix}Arquivos: {stats['files']} | Lidos: {stats['read']} | "
+              f"Novos: {stats['saved']} | Duplicados: {stats['duplicates']} | {stats['elapsed_s']}s")
+        for err in stats["errors"]:
+            print(f"ERRO: {err}", file=sys.stderr)
+
+    return 1 if stats["errors"] else 0
+
+def cmd_watch(args) -> int:
+    """Monitora uma pasta e ingere incrementalmente os arquivos novos ou que cresceram."""
+    from src.services.watcher_service import IngestionWatcher
+
+    folder = Path(args.folder).expanduser()
+    if not folder.is_dir():
+        print(f"Pasta não encontrada: {folder}", file=sys.stderr)
+        return 2
+
+    watcher = IngestionWatcher(folder, interval=args.interval, recursive=args.recursive)
+    report = (lambda stats: print(json.dumps(stats, ensure_ascii=False), flush=True)) if args.json else None
+
+    if args.once:
+        stats = watcher.poll_once()
+        print(json.dumps(stats, ensure_ascii=False, indent=2 if not args.json else None))
+        return 1 if stats["errors"] else 0
+
+    try:
+        watcher.run(on_poll=report)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def cmd_archive(args) -> int:
+    """Move anos encerrados para o acervo (arquivos anuais) ou os traz de volta."""
+    from datetime import date
+    from src.services.archive_service import ArchiveService
+
+    service = ArchiveService()
+    if args.restore:
+        for year in args.restore:
+            result = service.restore_year(year)
+            print(f"{result['year']}: {result['restored']} transações de volta ao banco principal")
+            if result["kept"]:
+                print(f"{result['year']}: {result['archived'] - result['restored']} linha(s) já existiam no banco "
+                      f"principal e não foram trazidas; arquivo mantido em {result['kept']}", file=sys.stderr)
+        return 0
+
+    if args.list or (not args.years and args.until is None):
+        archives = service.list_archives()
+        if archives.empty:
+            print("Nenhum ano arquivado.")
+        for row in archives.itertuples():
+            size = f"{row.size_bytes / 1024 / 1024:.1f} MB" if row.size_bytes else "arquivo ausente"
+            print(f"{row.year}: {row.rows} transações ({row.min_date} a {row.max_date}) · {size} · {row.path}")
+        candidates = service.archivable_years()
+        for row in candidates.itertuples():
+            note = f", {row.pending} pendente(s)" if row.pending else ""
+            print(f"  disponível: {row.year} ({row.rows} transações{note})")
+        return 0
+
+    years = sorted(set(args.years or []))
+    if args.until is not None:
+        years = sorted(set(years) | {y for y in service.archivable_years()["year"] if y <= args.until})
+    years = [y for y in years if y < date.today().year]
+
+    failed = False
+    for year in years:
+        try:
+            # Compacta o banco principal uma única vez, no último ano
+            result = service.archive_year(year, force=args.force, vacuum=year == years[-1])
+            print(f"{year}: {result['moved']} transações movidas para {result['path']}")
+        except ValueError as e:
+            print(f"{year}: {e}", file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+def cmd_export(args) -> int:
+    """Exporta as transações em partições mensais colunares (só os meses alterados)."""
+    from src.services.export_service import ExportService
+
+    service = ExportService(root=Path(args.output).expanduser() if args.output else None)
+    started = time.perf_counter()
+    try:
+        result = service.export(fmt=args.format, full=args.full)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    result["elapsed_s"] = round(time.perf_counter() - started, 3)
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print(f"{result['path']} ({result['format']}): {result['partitions']} partições, {result['rows']} transações | "
+              f"Regravadas: {len(result['written'])} | Removidas: {len(result['removed'])} | {result['elapsed_s']}s")
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cli.py", description="Finanças Modo Absoluto - linha de comando")
+    parser.add_argument("--db", help="Caminho do banco SQLite (padrão: Drive ou fallback local).")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Exibe logs de diagnóstico.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_import = sub.add_parser("import", help="Importa uma pasta de extratos (CSV/TXT).")
+    p_import.add_argument("folder", help="Pasta com os arquivos baixados do banco.")
+    p_import.add_argument("-r", "--recursive", action="store_true", help="Inclui subpastas.")
+    p_import.add_argument("--dry-run", action="store_true", help="Apenas lê e conta; não grava no banco.")
+    p_import.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1,
+                          help="Processos de parsing em paralelo (padrão: núcleos da CPU).")
+    p_import.add_argument("--json", action="store_true", help="Estatísticas em JSON (stdout).")
+    p_import.set_defaults(func=cmd_import)
+
+    p_watch = sub.add_parser("watch", help="Monitora uma pasta e importa incrementalmente.")
+    p_watch.add_argument("folder", help="Pasta monitorada (ex: destino da exportação do banco).")
+    p_watch.add_argument("-r", "--recursive", action="store_true", help="Inclui subpastas.")
+    p_watch.add_argument("-i", "--interval", type=float, default=5.0, help="Segundos entre varreduras.")
+    p_watch.add_argument("--once", action="store_true", help="Executa uma única varredura e sai.")
+    p_watch.add_argument("--json", action="store_true", help="Uma linha JSON por varredura com novidades.")
+    p_watch.set_defaults(func=cmd_watch)
+
+    p_archive = sub.add_parser("archive", help="Acervo: move anos encerrados para arquivos anuais.")
+    p_archive.add_argument("years", nargs="*", type=int, help="Anos a arquivar (ex: 2021 2022).")
+    p_archive.add_argument("--until", type=int, help="Arquiva todos os anos encerrados até este (inclusive).")
+    p_archive.add_argument("--restore", nargs="+", type=int, help="Traz os anos de volta ao banco principal.")
+    p_archive.add_argument("--list", action="store_true", help="Lista o acervo e os anos disponíveis.")
+    p_archive.add_argument("--force", action="store_true", help="Arquiva mesmo com pendências de classificação.")
+    p_archive.set_defaults(func=cmd_archive)
+
+    p_export = sub.add_parser("export", help="Exportação colunar por mês (Feather/Parquet/NumPy) para análises.")
+    p_export.add_argument("--format", choices=["feather", "parquet", "npy"], help="Formato (padrão: o da última exportação ou feather).")
+    p_export.add_argument("--full", action="store_true", help="Regrava todas as partições.")
+    p_export.add_argument("-o", "--output", help="Pasta de destino (padrão: data/exports/<banco>).")
+    p_export.add_argument("--json", action="store_true", help="Resultado em JSON (stdout).")
+    p_export.set_defaults(func=cmd_export)
+
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    if args.db:
+        db_instance.configure(args.db)
+
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
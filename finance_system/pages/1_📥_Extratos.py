@@ -1,5 +1,6 @@
 import streamlit as st
 from src.services.importer_service import ImporterService
+from src.services.duplicate_service import DuplicateService
 
 st.set_page_config(page_title="Importar Extratos", layout="centered")
 
@@ -39,4 +40,61 @@ if uploaded_files:
             
             if results["saved"] > 0:
                 st.success("Importação concluída com sucesso!")
-                st.balloons()
\ No newline at end of file
+                st.balloons()
+
+# --- DUPLICIDADES ENTRE CONTAS ---
+st.markdown("---")
+st.subheader("🔁 Possíveis Duplicidades")
+st.caption("Mesma compra na fatura (TXT) e no extrato (CSV), com descrição diferente ou data deslocada.")
+
+c1, c2 = st.columns(2)
+window_days = c1.slider("Janela (dias)", 0, 7, 2)
+min_similarity = c2.slider("Similaridade mínima da descrição", 0.0, 1.0, 0.3, step=0.05)
+
+if st.button("🔍 Procurar Duplicidades", use_container_width=True):
+    with st.spinner("Comparando lançamentos..."):
+        st.session_state["dup_candidates"] = DuplicateService().find_candidates(
+            window_days=window_days, min_similarity=min_similarity
+        ).head(100)
+
+candidates = st.session_state.get("dup_candidates")
+if candidates is not None:
+    if candidates.empty:
+        st.success("Nenhuma duplicidade provável encontrada.")
+    else:
+        ACTIONS = ["—", "Ignorar 2ª", "Ignorar 1ª", "Não é duplicata"]
+        review = candidates.assign(Ação="—")
+        edited = st.data_editor(
+            review,
+            column_config={
+                "id_a": None, "id_b": None, "source_a": None, "source_b": None,
+                "date_a": st.column_config.DateColumn("Data 1ª", format="DD/MM/YYYY"),
+                "date_b": st.column_config.DateColumn("Data 2ª", format="DD/MM/YYYY"),
+                "description_a": "1ª Descrição",
+                "description_b": "2ª Descrição",
+                "amount": st.column_config.NumberColumn("Valor", format="R$ %.2f"),
+                "days_apart": "Dias",
+                "similarity": st.column_config.ProgressColumn("Similaridade", min_value=0, max_value=1),
+                "score": st.column_config.NumberColumn("Score", format="%.2f"),
+                "Ação": st.column_config.SelectboxColumn("Ação", options=ACTIONS, required=True),
+            },
+            disabled=[c for c in review.columns if c != "Ação"],
+            hide_index=True,
+            use_container_width=True,
+            key="dup_editor",
+        )
+
+        if st.button("✅ Aplicar Decisões", type="primary"):
+            service = DuplicateService()
+            decided = edited[edited["Ação"] != "—"]
+            for _, row in decided.iterrows():
+                a, b = int(row["id_a"]), int(row["id_b"])
+                if row["Ação"] == "Ignorar 2ª":
+                    service.confirm(keep_id=a, drop_id=b, score=row["score"])
+                elif row["Ação"] == "Ignorar 1ª":
+                    service.confirm(keep_id=b, drop_id=a, score=row["score"])
+                else:
+                    service.dismiss(a, b, score=row["score"])
+            st.session_state.pop("dup_candidates", None)
+            st.success(f"{len(decided)} par(es) revisado(s).")
+            st.rerun()
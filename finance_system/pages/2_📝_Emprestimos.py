@@ -1,75 +1,174 @@
 import streamlit as st
-import pandas as pd
 from datetime import date
+from src.models.loan import (
+    Loan, Prepayment, SCHEDULE_PRICE, SCHEDULE_SAC, PREPAY_REDUCE_TERM, PREPAY_REDUCE_INSTALLMENT
+)
 from src.services.loan_service import LoanService
 
 st.set_page_config(page_title="Cadastro de Passivos", layout="centered")
 
+service = LoanService()
+
 st.title("📝 Gestão de Empréstimos")
 st.caption("Cadastre contratos de longo prazo para projetar seu fluxo de caixa futuro.")
 st.divider()
 
+SCHEDULE_LABELS = {SCHEDULE_PRICE: "Price (Parcela Fixa)", SCHEDULE_SAC: "SAC (Amortização Constante)"}
+
+def load_for_edit(loan: Loan):
+    """Carrega um contrato existente no formulário (callback, roda antes do rerun)."""
+    st.session_state['loan_name'] = loan.name
+    st.session_state['loan_type'] = loan.schedule_type
+    st.session_state['loan_input_mode'] = "Valor Financiado"
+    st.session_state['loan_value'] = float(loan.principal)
+    st.session_state['loan_rate'] = loan.monthly_rate * 100
+    st.session_state['loan_term'] = int(loan.term)
+    st.session_state['loan_first_date'] = loan.first_due_date
+    st.session_state['loan_edit_id'] = loan.id
+    st.session_state.pop('loan_preview', None)
+
+# Valores padrão do formulário (via sessão, para permitir carregar um contrato em edição)
+st.session_state.setdefault('loan_term', 12)
+st.session_state.setdefault('loan_rate', 0.0)
+# Padrão: Data de hoje, facilitando a lógica temporal
+st.session_state.setdefault('loan_first_date', date.today())
+
 # --- ÁREA DE INPUT ---
 with st.container(border=True):
-    st.subheader("Novo Contrato")
-    
+    editing_id = st.session_state.get('loan_edit_id')
+    st.subheader("Editar Contrato" if editing_id else "Novo Contrato")
+
     col1, col2 = st.columns(2)
     with col1:
-        name = st.text_input("Nome do Credor", placeholder="Ex: Financiamento Imóvel")
-        installments = st.number_input("Parcelas Restantes", min_value=1, value=12, step=1)
-    
+        name = st.text_input("Nome do Credor", placeholder="Ex: Financiamento Imóvel", key="loan_name")
+        schedule_type = st.selectbox(
+            "Tabela de Amortização",
+            list(SCHEDULE_LABELS),
+            format_func=SCHEDULE_LABELS.get,
+            key="loan_type"
+        )
+        installments = st.number_input("Parcelas Restantes", min_value=1, step=1, key="loan_term")
+
     with col2:
-        amount = st.number_input("Valor da Parcela (R$)", min_value=0.0, format="%.2f")
-        # Padrão: Data de hoje, facilitando a lógica temporal
-        first_date = st.date_input("Próximo Vencimento", value=date.today())
+        input_mode = st.radio(
+            "Informar por:", ["Valor da Parcela", "Valor Financiado"], horizontal=True, key="loan_input_mode"
+        )
+        value = st.number_input(f"{input_mode} (R$)", min_value=0.0, format="%.2f", key="loan_value")
+        rate_pct = st.number_input("Juros Mensais (%)", min_value=0.0, format="%.4f", key="loan_rate")
+        first_date = st.date_input("Próximo Vencimento", key="loan_first_date")
 
     if st.button("Gerar Projeção", type="primary", use_container_width=True):
-        if not name or amount <= 0:
+        if not name or value <= 0:
             st.error("Por favor, preencha o nome e um valor válido.")
         else:
-            # Invoca a camada de serviço
-            service = LoanService()
-            plan = service.generate_plan(name, amount, first_date, installments)
-            
-            # Guarda na sessão para persistência posterior
-            st.session_state['loan_preview'] = plan
+            rate = rate_pct / 100
+            principal = value
+            if input_mode == "Valor da Parcela":
+                # Valor presente da série de parcelas (Price); sem juros é parcela x prazo
+                if rate > 0:
+                    principal = value * (1 - (1 + rate) ** -installments) / rate
+                else:
+                    principal = value * installments
+
+            # Guarda o contrato (compacto) na sessão para persistência posterior
+            st.session_state['loan_preview'] = Loan(
+                name=name,
+                principal=round(principal, 2),
+                monthly_rate=rate,
+                term=int(installments),
+                first_due_date=first_date,
+                schedule_type=schedule_type,
+                id=editing_id
+            )
             st.rerun()
 
 # --- ÁREA DE CONFIRMAÇÃO ---
 if 'loan_preview' in st.session_state:
-    plan = st.session_state['loan_preview']
-    
+    loan = st.session_state['loan_preview']
+    schedule = service.build_schedule(loan)
+
     st.divider()
     st.subheader("🔎 Pré-visualização do Impacto")
-    
+
     # Métricas Rápidas
-    total_divida = sum(t.amount for t in plan)
-    final_date = plan[-1].date
-    
-    m1, m2, m3 = st.columns(3)
+    total_divida = -schedule['payment'].sum()
+
+    m1, m2, m3, m4 = st.columns(4)
     m1.metric("Impacto Total", f"R$ {total_divida:,.2f}")
-    m2.metric("Término", final_date.strftime("%d/%m/%Y"))
-    m3.metric("Parcelas", len(plan))
+    m2.metric("Juros Totais", f"R$ {schedule['interest'].sum():,.2f}")
+    m3.metric("Término", loan.last_due_date.strftime("%d/%m/%Y"))
+    m4.metric("Parcelas", len(schedule))
+
+    # --- SIMULAÇÃO DE AMORTIZAÇÃO EXTRA ---
+    with st.expander("💸 Simular Amortização Extraordinária"):
+        e1, e2, e3 = st.columns(3)
+        extra_at = e1.number_input("Após a parcela nº", min_value=1, max_value=max(1, loan.term - 1), value=1, step=1)
+        extra_value = e2.number_input("Valor Extra (R$)", min_value=0.0, format="%.2f")
+        extra_mode = e3.radio("Efeito:", [PREPAY_REDUCE_TERM, PREPAY_REDUCE_INSTALLMENT],
+                              format_func={PREPAY_REDUCE_TERM: "Reduzir Prazo", PREPAY_REDUCE_INSTALLMENT: "Reduzir Parcela"}.get)
+
+        if extra_value > 0:
+            scenario = service.build_schedule(loan, [Prepayment(int(extra_at), extra_value, extra_mode)])
+            saved_interest = schedule['interest'].sum() - scenario['interest'].sum()
+
+            s1, s2, s3 = st.columns(3)
+            s1.metric("Economia de Juros", f"R$ {saved_interest:,.2f}")
+            s2.metric("Novo Término", scenario['date'].iloc[-1].strftime("%d/%m/%Y"),
+                      delta=f"{len(scenario) - len(schedule)} parcelas", delta_color="inverse")
+            s3.metric("Nova Parcela", f"R$ {scenario['payment'].iloc[int(extra_at)]:,.2f}" if len(scenario) > extra_at else "-")
 
     # Tabela Visual
-    df = pd.DataFrame([t.to_dict() for t in plan])
+    money = lambda label: st.column_config.NumberColumn(label, format="R$ %.2f")
     st.dataframe(
-        df[['Data', 'Descrição', 'Valor', 'Status Tempo']], 
-        use_container_width=True, 
+        schedule,
+        column_config={
+            "installment": "Parcela",
+            "date": st.column_config.DateColumn("Data", format="DD/MM/YYYY"),
+            "payment": money("Prestação"),
+            "interest": money("Juros"),
+            "amortization": money("Amortização"),
+            "extra": money("Extra"),
+            "balance": money("Saldo Devedor"),
+        },
+        use_container_width=True,
         hide_index=True
     )
 
     col_btn1, col_btn2 = st.columns([1, 4])
     if col_btn1.button("Cancelar"):
         del st.session_state['loan_preview']
+        st.session_state.pop('loan_edit_id', None)
+        st.rerun()
+
+    if col_btn2.button("💾 Confirmar e Gravar Contrato", type="primary"):
+        service.save_loan(loan)
+        st.success(f"Sucesso! Contrato '{loan.name}' gravado ({loan.term} parcelas projetadas).")
+        del st.session_state['loan_preview']
+        st.session_state.pop('loan_edit_id', None)
+
+# --- CONTRATOS CADASTRADOS ---
+st.divider()
+st.subheader("🏦 Contratos Ativos")
+
+loans = service.list_loans()
+if not loans:
+    st.info("Nenhum contrato cadastrado.")
+else:
+    st.dataframe(
+        [loan.to_dict() for loan in loans],
+        column_config={
+            "Valor Financiado": st.column_config.NumberColumn(format="R$ %.2f"),
+            "Taxa Mensal (%)": st.column_config.NumberColumn(format="%.4f"),
+            "Primeiro Vencimento": st.column_config.DateColumn(format="DD/MM/YYYY"),
+            "Último Vencimento": st.column_config.DateColumn(format="DD/MM/YYYY"),
+        },
+        use_container_width=True,
+        hide_index=True
+    )
+
+    selected = st.selectbox("Contrato:", loans, format_func=lambda loan: loan.name)
+    c_edit, c_del = st.columns(2)
+    c_edit.button("✏️ Editar", use_container_width=True, on_click=load_for_edit, args=(selected,))
+    if c_del.button("🗑️ Excluir", use_container_width=True):
+        service.delete_loan(selected.id)
         st.rerun()
-        
-    if col_btn2.button("💾 Confirmar e Gravar no Banco", type="primary"):
-        service = LoanService()
-        saved = service.save_plan(plan)
-        
-        if saved > 0:
-            st.success(f"Sucesso! {saved} parcelas foram registradas no seu fluxo futuro.")
-            del st.session_state['loan_preview']
-        else:
-            st.warning("Estas parcelas já constavam no banco de dados.")
\ No newline at end of file
@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+import sqlite3
 import sys
 import os
 from datetime import date, timedelta
@@ -10,11 +11,17 @@ root_dir = os.path.dirname(current_dir)
 sys.path.append(root_dir)
 # ------------------------
 
+from src.utils import profiling
 from src.services.categorizer_service import CategorizerService
+from src.services.suggestion_service import SuggestionService
+from src.services.category_service import CategoryService
+from src.utils.category_tree import render_category_tree
 
 st.set_page_config(page_title="Classificação", layout="wide")
+profiling.begin_page("Classificação")
 
 service = CategorizerService()
+category_service = CategoryService()
 CATEGORY_IGNORE = "⛔ IGNORADO"
 
 st.title("🏷️ Classificação Inteligente")
@@ -24,13 +31,16 @@ with st.sidebar:
     st.header("📚 Memória")
     existing_cats = service.get_unique_categories()
     if not existing_cats.empty:
-        clean_list = existing_cats[existing_cats['Categoria'] != CATEGORY_IGNORE]
-        st.dataframe(clean_list, hide_index=True, use_container_width=True, height=400)
+        clean_list = existing_cats[existing_cats['Categoria'] != CATEGORY_IGNORE]['Categoria']
+        # Categorias de regras ainda sem transações entram como raízes
+        memory_tree = category_service.rollup(pd.Series(0.0, index=clean_list.tolist()))
+        render_category_tree(memory_tree, key="memory_tree", container=st.sidebar)
 
 st.markdown("---")
 
-# 3 ABAS AGORA
-tab_pendencias, tab_ferias, tab_regras = st.tabs(["📝 Pendências", "🏖️ Modo Férias (Lote)", "⚙️ Regras"])
+tab_pendencias, tab_ferias, tab_regras, tab_categorias = st.tabs(
+    ["📝 Pendências", "🏖️ Modo Férias (Lote)", "⚙️ Regras", "🗂️ Categorias"]
+)
 
 # --- TAB 1: PENDÊNCIAS ---
 with tab_pendencias:
@@ -41,6 +51,10 @@ with tab_pendencias:
 
     # 2. Carrega pendências
     pending_df = service.get_pending_transactions()
+    # Sugestões de categoria para todos os grupos pendentes (um lote por carga da tela)
+    suggestions = {} if pending_df.empty else dict(
+        SuggestionService().suggest_pending()[['description', 'suggestions']].itertuples(index=False)
+    )
     
     if pending_df.empty:
         st.success("✅ Tudo limpo! Nenhuma pendência.")
@@ -196,6 +210,47 @@ with tab_pendencias:
                     ["Criar Regra (Todo Histórico)", "Apenas estes (Pontual)"],
                     horizontal=True
                 )
+
+                # --- PRÉVIA DE IMPACTO DA REGRA ---
+                rule_term = selected_desc
+                if "Criar Regra" in apply_mode:
+                    # Termo editável; volta para a descrição ao trocar de item
+                    if st.session_state.get("rule_term_for") != selected_desc:
+                        st.session_state["rule_term_for"] = selected_desc
+                        st.session_state["rule_term"] = selected_desc
+                    rule_term = st.text_input(
+                        "Termo da regra (contém):", key="rule_term",
+                        help="A regra vale para toda descrição que contenha este trecho. Encurte para abranger variações."
+                    ).strip()
+
+                    impact = service.preview_rule_impact(rule_term)
+                    m1, m2, m3 = st.columns(3)
+                    m1.metric("Atinge", impact["total"])
+                    m2.metric("Pendentes", impact["pending"])
+                    m3.metric("Já classif.", impact["classified"])
+
+                    if impact["replaces"]:
+                        st.warning(f"Substitui a regra existente deste termo (hoje: **{impact['replaces']}**).")
+                    if not impact["overlaps"].empty:
+                        st.warning(
+                            f"Sobrepõe {len(impact['overlaps'])} regra(s) existente(s); "
+                            "elas têm precedência nas linhas em comum."
+                        )
+                    with st.expander("Detalhes do impacto"):
+                        if not impact["overlaps"].empty:
+                            st.caption(f"Linhas em comum entre as {impact['overlap_rows']} atingidas mais recentes.")
+                            st.dataframe(impact["overlaps"], hide_index=True, use_container_width=True)
+                        st.dataframe(impact["by_category"], hide_index=True, use_container_width=True)
+                        st.dataframe(
+                            impact["sample"],
+                            column_config={
+                                "date": st.column_config.DateColumn("Data", format="DD/MM/YYYY"),
+                                "description": "Descrição",
+                                "amount": st.column_config.NumberColumn("Valor", format="R$ %.2f"),
+                                "category": "Categoria",
+                            },
+                            hide_index=True, use_container_width=True
+                        )
                 
                 # --- AUTOCOMPLETE INTELIGENTE ---
                 # 1. Busca categorias já existentes na memória do sistema
@@ -213,11 +268,18 @@ with tab_pendencias:
                 NEW_CAT_LABEL = "➕ Nova Categoria..."
                 final_options = [NEW_CAT_LABEL] + options
                 
+                # Sugestões do histórico: a mais provável já vem selecionada
+                item_suggestions = suggestions.get(selected_desc, [])
+                if item_suggestions:
+                    st.caption("💡 Sugestões: " + " · ".join(f"**{cat}** ({conf:.0%})" for cat, conf in item_suggestions))
+                top_suggestion = item_suggestions[0][0] if item_suggestions else None
+
                 # O Selectbox funciona como o "Sugestor"
                 selected_category_option = st.selectbox(
                     "Categoria:", 
                     final_options,
-                    index=0, # Padrão: Nova Categoria (ou pode mudar para index=None para forçar escolha)
+                    # Padrão: sugestão principal, se existir; senão Nova Categoria
+                    index=final_options.index(top_suggestion) if top_suggestion in final_options else 0,
                     help="Selecione uma existente ou crie uma nova."
                 )
                 
@@ -238,9 +300,11 @@ with tab_pendencias:
                 if st.button("💾 Salvar Classificação", type="primary", use_container_width=True):
                     if not new_category:
                         st.error("Por favor, defina uma categoria.")
+                    elif not rule_term:
+                        st.error("O termo da regra não pode ficar vazio.")
                     else:
                         if "Criar Regra" in apply_mode:
-                            service.create_rule(selected_desc, new_category)
+                            service.create_rule(rule_term, new_category)
                         else:
                             for hash_id in affected_rows['hash_id']:
                                 service.manual_update(hash_id, new_category)
@@ -253,7 +317,7 @@ with tab_pendencias:
                 # --- AÇÃO DE IGNORAR ---
                 if st.button(f"{CATEGORY_IGNORE}", use_container_width=True):
                     if "Criar Regra" in apply_mode:
-                        service.create_rule(selected_desc, CATEGORY_IGNORE)
+                        service.create_rule(rule_term, CATEGORY_IGNORE)
                     else:
                         for hash_id in affected_rows['hash_id']:
                             service.manual_update(hash_id, CATEGORY_IGNORE)
@@ -320,14 +384,164 @@ with tab_ferias:
 # --- TAB 3: REGRAS (Mantivemos idêntico) ---
 with tab_regras:
     st.markdown("### Regras Ativas")
-    rules_df = service.get_rules()
-    if not rules_df.empty:
-        for index, row in rules_df.iterrows():
-            c1, c2, c3 = st.columns([3, 2, 1])
-            with c1: st.text(row['match_term'])
-            with c2: st.caption(row['target_category'])
-            with c3:
-                if st.button("🗑️", key=f"del_{index}"):
-                    service.delete_rule(row['match_term'])
+    RULES_PAGE_SIZE = 50
+
+    f1, f2 = st.columns([2, 1])
+    rules_filter = f1.text_input("Filtrar (termo ou categoria):", key="rules_filter")
+    category_options = ["Todas"] + sorted(service.get_unique_categories()['Categoria'].tolist())
+    rules_category = f2.selectbox("Categoria:", category_options, key="rules_category")
+
+    # Filtro novo volta para a primeira página
+    if st.session_state.get("rules_criteria") != (rules_filter, rules_category):
+        st.session_state["rules_criteria"] = (rules_filter, rules_category)
+        st.session_state["rules_page"] = 1
+
+    _, rules_total = service.list_rules(
+        rules_filter, None if rules_category == "Todas" else rules_category, page_size=1
+    )
+    rules_pages = max(1, -(-rules_total // RULES_PAGE_SIZE))
+    rules_page = st.number_input(
+        f"Página (de {rules_pages}) · {rules_total} regra(s)", min_value=1, max_value=rules_pages, key="rules_page"
+    )
+
+    rules_df, _ = service.list_rules(
+        rules_filter, None if rules_category == "Todas" else rules_category,
+        page=rules_page, page_size=RULES_PAGE_SIZE
+    )
+
+    # Grade editável limitada à página; as alterações só vão ao banco ao salvar (um lote)
+    editor_key = f"rules_editor_{rules_page}_{rules_filter}_{rules_category}"
+    st.data_editor(
+        rules_df,
+        column_config={
+            "id": None,
+            "match_term": st.column_config.TextColumn("Termo (contém)", required=True),
+            "target_category": st.column_config.TextColumn("Categoria", required=True),
+        },
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        key=editor_key,
+    )
+
+    changes = st.session_state.get(editor_key, {})
+    pending_changes = sum(len(changes.get(k, [])) for k in ("edited_rows", "added_rows", "deleted_rows"))
+    if st.button(f"💾 Salvar alterações ({pending_changes})", type="primary", disabled=not pending_changes):
+        edited = changes.get("edited_rows", {})
+        updated = [
+            (int(rules_df.iloc[idx]['id']),
+             values.get('match_term', rules_df.iloc[idx]['match_term']),
+             values.get('target_category', rules_df.iloc[idx]['target_category']))
+            for idx, values in edited.items() if idx not in changes.get("deleted_rows", [])
+        ]
+        created = [(row.get('match_term'), row.get('target_category')) for row in changes.get("added_rows", [])]
+        deleted = [int(rules_df.iloc[idx]['id']) for idx in changes.get("deleted_rows", [])]
+        try:
+            result = service.apply_rule_changes(created=created, updated=updated, deleted=deleted)
+        except (ValueError, sqlite3.IntegrityError) as e:
+            st.error(f"Nada foi salvo: {e}")
+        else:
+            del st.session_state[editor_key]
+            st.toast(
+                f"{result['created']} criada(s), {result['updated']} alterada(s), {result['deleted']} removida(s); "
+                f"{result['classified']} pendência(s) classificada(s)."
+            )
+            st.rerun()
+
+# --- TAB 4: CATEGORIAS (RENOMEAR / UNIR) ---
+with tab_categorias:
+    st.markdown("### 🗂️ Renomear ou Unir Categorias")
+    st.info("Altera transações, regras **e** orçamentos de uma só vez. Use para padronizar nomes antigos (ex: 'Mercado' + 'Supermercado').")
+
+    usage = service.get_category_usage()
+    if usage.empty:
+        st.warning("Nenhuma categoria em uso ainda.")
+    else:
+        st.dataframe(usage, hide_index=True, use_container_width=True, height=300)
+        all_categories = usage['Categoria'].tolist()
+
+        col_rename, col_merge = st.columns(2)
+
+        with col_rename:
+            with st.container(border=True):
+                st.subheader("Renomear")
+                old_name = st.selectbox("Categoria atual:", all_categories, key="cat_rename_old")
+                new_name = st.text_input("Novo nome:", key="cat_rename_new")
+                if st.button("✏️ Renomear", use_container_width=True):
+                    if not new_name.strip():
+                        st.error("Informe o novo nome.")
+                    else:
+                        try:
+                            result = service.rename_category(old_name, new_name)
+                        except ValueError as e:
+                            st.error(f"Nada foi alterado: {e}")
+                        else:
+                            st.success(
+                                f"{result['transactions']} transação(ões), {result['rules']} regra(s) e "
+                                f"{result['budgets']} orçamento(s) atualizados."
+                            )
+                            st.rerun()
+
+        with col_merge:
+            with st.container(border=True):
+                st.subheader("Unir")
+                merge_sources = st.multiselect("Categorias a unir:", all_categories, key="cat_merge_sources")
+                merge_target = st.selectbox(
+                    "Destino:", ["➕ Novo nome..."] + all_categories, key="cat_merge_target"
+                )
+                if merge_target == "➕ Novo nome...":
+                    merge_target = st.text_input("Nome do destino:", key="cat_merge_new")
+                if st.button("🔗 Unir Categorias", use_container_width=True):
+                    if not merge_sources or not merge_target.strip():
+                        st.error("Escolha as categorias e o destino.")
+                    else:
+                        try:
+                            result = service.merge_categories(merge_sources, merge_target)
+                        except ValueError as e:
+                            st.error(f"Nada foi alterado: {e}")
+                        else:
+                            st.success(
+                                f"{result['transactions']} transação(ões), {result['rules']} regra(s) e "
+                                f"{result['budgets']} orçamento(s) unificados."
+                            )
+                            st.rerun()
+
+    # --- HIERARQUIA ---
+    st.markdown("### 🌳 Hierarquia")
+    st.info("Agrupe categorias (ex: 'Aluguel', 'Condomínio' e 'Energia' dentro de 'Moradia'). "
+            "Totais e orçamentos de uma categoria incluem todas as subcategorias.")
+
+    tree = category_service.tree()
+    paths = dict(zip(tree['name'], tree['path']))
+    show_path = lambda n: "(raiz)" if n is None else paths.get(n, n)
+    col_move, col_new = st.columns(2)
+
+    with col_move:
+        with st.container(border=True):
+            st.subheader("Mover")
+            move_name = st.selectbox("Categoria:", tree['name'].tolist(), format_func=show_path, key="cat_move_name")
+            move_parent = st.selectbox("Dentro de:", [None] + tree['name'].tolist(), format_func=show_path,
+                                       key="cat_move_parent")
+            if st.button("↪️ Mover", use_container_width=True, disabled=tree.empty):
+                try:
+                    category_service.move_category(move_name, move_parent)
+                except ValueError as e:
+                    st.error(str(e))
+                else:
                     st.rerun()
-            st.divider()
\ No newline at end of file
+
+    with col_new:
+        with st.container(border=True):
+            st.subheader("Nova subcategoria")
+            new_child = st.text_input("Nome:", key="cat_child_name")
+            new_parent = st.selectbox("Dentro de:", [None] + tree['name'].tolist(), format_func=show_path,
+                                      key="cat_child_parent")
+            if st.button("➕ Criar", use_container_width=True):
+                try:
+                    category_service.create_category(new_child, new_parent)
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    st.rerun()
+
+profiling.render_sidebar()
@@ -10,16 +10,26 @@ root_dir = os.path.dirname(current_dir)
 sys.path.append(root_dir)
 # ------------------------
 
+from src.utils import profiling
 from src.database.connection import db_instance
+from src.services.loan_service import LoanService
+from src.services.export_service import ExportService
+from src.services.forecast_service import ForecastService
+from src.services.budget_service import BudgetService
+from src.services.trend_service import WINDOWS as TREND_WINDOWS, TrendService
+from src.services.category_service import CategoryService
+from src.utils.category_tree import expanded_nodes, render_category_tree
 
 st.set_page_config(page_title="Dashboard Absoluto", layout="wide")
+profiling.begin_page("Dashboard")
 
 # Constante de Exclusão (Deve ser igual à da Classificação)
 CATEGORY_IGNORE = "⛔ IGNORADO"
 
+@profiling.profiled
 def get_data(start_date, end_date):
-    """Busca transações e calcula métricas."""
-    conn = db_instance.get_connection()
+    """Busca transações e calcula métricas (anexa só os anos do acervo que cobrem o período)."""
+    conn = db_instance.get_connection(archive=(start_date, end_date))
     try:
         # Filtra por data E remove os ignorados
         query = f"""
@@ -33,6 +43,15 @@ def get_data(start_date, end_date):
     finally:
         conn.close()
 
+@profiling.profiled
+def get_snapshot_data(start_date, end_date):
+    """Mesma carga de get_data, lida das partições mensais exportadas (memory-map, sem SQL)."""
+    df = ExportService().load_snapshot(start_date, end_date)
+    df = df[df['category'] != CATEGORY_IGNORE].copy()
+    df['category'] = df['category'].replace('', None)
+    df['date'] = df['date'].dt.date
+    return df
+
 # --- SIDEBAR: FILTROS ---
 with st.sidebar:
     st.header("📅 Período de Análise")
@@ -49,6 +68,7 @@ with st.sidebar:
     
     if len(date_range) != 2:
         st.warning("Selecione data inicial e final.")
+        profiling.render_sidebar()
         st.stop()
         
     start, end = date_range
@@ -60,13 +80,36 @@ with st.sidebar:
     
     st.info(f"Fator de Mensalização: **{months_diff:.1f} meses**")
 
+    # Análises de vários anos: lê a exportação colunar em vez de consultar o banco
+    use_snapshot = st.toggle(
+        "⚡ Ler do snapshot colunar",
+        key="dash_snapshot",
+        help="Usa as partições mensais exportadas (cli.py export). Mais rápido em períodos longos."
+    )
+    if use_snapshot:
+        exporter = ExportService()
+        stale = exporter.stale_months(start, end) if exporter.manifest() else None
+        if stale is None:
+            st.caption("Nenhum snapshot gerado ainda.")
+        elif stale:
+            st.caption(f"Snapshot desatualizado em {len(stale)} mês(es): {', '.join(stale[:6])}{'…' if len(stale) > 6 else ''}")
+        if stale is None or stale:
+            if st.button("🔄 Gerar/Atualizar snapshot", use_container_width=True):
+                with st.spinner("Exportando meses alterados..."):
+                    result = exporter.export()
+                st.toast(f"{len(result['written'])} partição(ões) gravadas ({result['format']}).")
+                st.rerun()
+            if stale is None:
+                use_snapshot = False
+
 # --- CARGA DE DADOS ---
-df = get_data(start, end)
+df = get_snapshot_data(start, end) if use_snapshot else get_data(start, end)
 
 st.title("📊 Visão Estratégica")
 
 if df.empty:
     st.warning("Nenhum dado encontrado para este período.")
+    profiling.render_sidebar()
     st.stop()
 
 # --- BLOC 1: SOLVÊNCIA (KPIs) ---
@@ -94,6 +137,16 @@ c4.metric(
     delta=f"R$ {delta_target:,.2f} vs Meta"
 )
 
+# Orçamento do último mês do período (só as categorias fora do limite)
+budget_month = end.strftime("%Y-%m")
+budget_alerts = BudgetService().alerts(budget_month)
+if not budget_alerts.empty:
+    st.warning(
+        f"**Orçamento {budget_month}:** " + " · ".join(
+            f"{row['category']} {row['used'] * 100:.0f}%" for _, row in budget_alerts.head(6).iterrows()
+        ) + (f" (+{len(budget_alerts) - 6})" if len(budget_alerts) > 6 else "")
+    )
+
 st.divider()
 
 # --- BLOCO 2: A MENSALIZAÇÃO (O Coração do Projeto) ---
@@ -108,14 +161,25 @@ cat_group['amount'] = cat_group['amount'].abs() # Torna positivo para o gráfico
 cat_group['Média Mensal'] = cat_group['amount'] / months_diff
 cat_group = cat_group.sort_values(by='Média Mensal', ascending=False)
 
-# Gráfico de Barras
-st.bar_chart(
-    cat_group,
-    x="category",
-    y="Média Mensal",
-    color="#FF4B4B", # Vermelho despesa
-    use_container_width=True
-)
+# Hierarquia: nós recolhidos mostram a subárvore inteira; abertos, só o gasto direto deles
+hierarchy = CategoryService().rollup(cat_group.set_index('category')['Média Mensal'])
+col_tree, col_chart = st.columns([1, 3])
+with col_tree:
+    st.caption("🌳 Expanda para detalhar")
+    shown = render_category_tree(hierarchy, key="dash_tree", values={"total": "R$ {:,.2f}/mês"})
+opened = shown['name'].isin(expanded_nodes("dash_tree")) & (shown['children'] > 0)
+level = shown.assign(**{"Média Mensal": shown['total'].where(~opened, shown['own'])})
+level = level[level['Média Mensal'] > 0].sort_values(by='Média Mensal', ascending=False)
+
+# Gráfico de Barras (no nível de detalhe aberto na árvore)
+with col_chart:
+    st.bar_chart(
+        level.rename(columns={'name': 'category'}),
+        x="category",
+        y="Média Mensal",
+        color="#FF4B4B", # Vermelho despesa
+        use_container_width=True
+    )
 
 # Tabela Detalhada
 with st.expander("Ver Detalhes Numéricos"):
@@ -138,29 +202,132 @@ st.divider()
 st.subheader("3. Radar de Passivos")
 st.caption("Compromissos já assumidos para além de hoje.")
 
-# Busca tudo que é Futuro (> hoje)
-conn = db_instance.get_connection()
-future_df = pd.read_sql_query(
-    f"SELECT * FROM transactions WHERE date > '{date.today()}' AND amount < 0 ORDER BY date", 
-    conn
-)
-conn.close()
+c_horizon, c_split = st.columns([3, 1])
+horizon = c_horizon.select_slider("Horizonte (meses)", options=[12, 24, 60, 120, 240, 420], value=120)
+split_by_source = c_split.toggle("Por contrato/origem")
 
-if not future_df.empty:
-    future_df['date'] = pd.to_datetime(future_df['date'])
-    # Agrupa por Mês/Ano
-    future_df['Mes_Ano'] = future_df['date'].dt.strftime('%Y-%m')
-    monthly_debt = future_df.groupby('Mes_Ano')['amount'].sum().abs()
-    
+# Totais mensais já agregados (índice de saídas + contratos projetados no horizonte)
+monthly_debt = LoanService().project_liabilities(horizon_months=horizon, by_source=split_by_source)
+
+if not monthly_debt.empty:
     col_chart, col_metric = st.columns([2, 1])
     
     with col_chart:
-        st.bar_chart(monthly_debt, color="#FFA500") # Laranja alerta
+        if split_by_source:
+            st.bar_chart(monthly_debt, x="month", y="amount", color="origin")
+        else:
+            st.bar_chart(monthly_debt, x="month", y="amount", color="#FFA500") # Laranja alerta
         
     with col_metric:
-        total_debt = future_df['amount'].sum()
+        total_debt = -monthly_debt['amount'].sum()
         st.metric("Dívida Contratada Total", f"R$ {total_debt:,.2f}")
         st.write("Isso é o que você já deve, independente se gastar mais ou não.")
 
 else:
-    st.info("Nenhuma dívida futura registrada. Parabéns ou cadastre em 'Empréstimos'.")
\ No newline at end of file
+    st.info("Nenhuma dívida futura registrada. Parabéns ou cadastre em 'Empréstimos'.")
+
+st.divider()
+
+# --- BLOCO 4: PREVISÃO DE CAIXA ---
+st.subheader("4. Previsão de Caixa")
+st.caption(
+    "Recorrentes (mensais e estáveis), sazonais (mesmo mês em anos anteriores), média dos gastos "
+    "avulsos e compromissos já contratados. Recalculada só quando os dados mudam."
+)
+
+c_fh, c_open = st.columns([3, 1])
+forecast_horizon = c_fh.select_slider("Horizonte da previsão (meses)", options=[12, 24, 36, 48, 60], value=24)
+opening = c_open.number_input("Saldo inicial (R$)", value=0.0, step=1000.0, format="%.2f")
+
+forecast = ForecastService().forecast(horizon_months=forecast_horizon, opening_balance=opening)
+projection = forecast["monthly"]
+
+f1, f2, f3 = st.columns(3)
+f1.metric("Saldo ao fim do horizonte", f"R$ {projection['balance'].iloc[-1]:,.2f}")
+f2.metric("Resultado mensal médio", f"R$ {projection['net'].mean():,.2f}")
+lowest = projection.loc[projection['balance'].idxmin()]
+f3.metric("Menor saldo projetado", f"R$ {lowest['balance']:,.2f}", delta=lowest['month'], delta_color="off")
+
+st.line_chart(projection, x="month", y="balance", color="#1F77B4")
+st.bar_chart(
+    projection.melt(id_vars="month", value_vars=["recurring", "seasonal", "variable", "commitments"],
+                    var_name="Componente", value_name="Valor"),
+    x="month", y="Valor", color="Componente"
+)
+
+with st.expander("Itens recorrentes e sazonais detectados"):
+    st.dataframe(
+        forecast["recurring"],
+        column_config={
+            "description": "Descrição",
+            "category": "Categoria",
+            "monthly_amount": st.column_config.NumberColumn("Valor mensal", format="R$ %.2f"),
+            "months_seen": "Meses (últimos 6)",
+            "variation": st.column_config.NumberColumn("Variação", format="%.2f"),
+        },
+        hide_index=True,
+        use_container_width=True,
+    )
+    if not forecast["seasonal"].empty:
+        st.dataframe(
+            forecast["seasonal"],
+            column_config={
+                "description": "Descrição",
+                "category": "Categoria",
+                "calendar_month": "Mês",
+                "amount": st.column_config.NumberColumn("Valor", format="R$ %.2f"),
+                "years_seen": "Anos",
+            },
+            hide_index=True,
+            use_container_width=True,
+        )
+
+st.divider()
+
+# --- BLOCO 5: TENDÊNCIAS ---
+st.subheader("5. Tendências por Categoria")
+st.caption(
+    "Médias móveis sobre o histórico completo (o início do período já traz a janela cheia), "
+    "variação sobre os 12 meses anteriores e run-rate anualizado (últimos 3 meses x 12)."
+)
+
+trend_service = TrendService()
+snapshot = trend_service.summary(end)
+expense_categories = snapshot[snapshot['trailing_12'] > 0]
+
+if expense_categories.empty:
+    st.info("Histórico insuficiente para calcular tendências.")
+else:
+    c_window, c_cats = st.columns([1, 3])
+    window = c_window.select_slider("Média móvel (meses)", options=list(TREND_WINDOWS), value=6)
+    selected = c_cats.multiselect(
+        "Categorias", expense_categories['category'].tolist(),
+        default=expense_categories['category'].head(5).tolist(), key="trend_categories"
+    )
+
+    series = trend_service.trends(start, end)
+    series = series[series['category'].isin(selected)]
+    if not series.empty:
+        st.line_chart(series, x="month", y=f"mean_{window}", color="category")
+
+    st.dataframe(
+        expense_categories.assign(
+            yoy_12=expense_categories['yoy_12'] * 100, momentum=expense_categories['momentum'] * 100
+        ),
+        column_config={
+            "category": "Categoria",
+            "month": "Mês",
+            "spent": st.column_config.NumberColumn("Gasto no mês", format="R$ %.2f"),
+            "mean_3": st.column_config.NumberColumn("Média 3m", format="R$ %.2f"),
+            "mean_6": st.column_config.NumberColumn("Média 6m", format="R$ %.2f"),
+            "mean_12": st.column_config.NumberColumn("Média 12m", format="R$ %.2f"),
+            "trailing_12": st.column_config.NumberColumn("Últimos 12m", format="R$ %.2f"),
+            "yoy_12": st.column_config.NumberColumn("vs 12m anteriores", format="%.1f%%"),
+            "run_rate": st.column_config.NumberColumn("Run-rate anual", format="R$ %.2f"),
+            "momentum": st.column_config.NumberColumn("3m vs 12m", format="%.1f%%"),
+        },
+        hide_index=True,
+        use_container_width=True,
+    )
+
+profiling.render_sidebar()
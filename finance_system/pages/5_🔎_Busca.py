@@ -0,0 +1,103 @@
+import streamlit as st
+import sys
+import os
+import time
+from datetime import date
+
+# --- CORREÇÃO DE PATH ---
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(current_dir)
+sys.path.append(root_dir)
+# ------------------------
+
+from src.utils import profiling
+from src.services.search_service import SearchService
+from src.services.categorizer_service import CategorizerService
+
+st.set_page_config(page_title="Busca", layout="wide")
+profiling.begin_page("Busca")
+
+PAGE_SIZE = 50
+PENDING_LABEL = "(Pendente)"
+
+service = SearchService()
+
+st.title("🔎 Busca no Histórico")
+st.caption('Palavras buscam por prefixo (ex: `ube 2023`); use aspas para frase exata (ex: `"pix env"`). Acentos são ignorados.')
+
+text = st.text_input("Buscar descrição", placeholder="Ex: UBER, \"padaria sol\", ifood")
+
+# --- FILTROS ---
+with st.expander("Filtros", expanded=False):
+    c1, c2, c3 = st.columns(3)
+    use_period = c1.checkbox("Filtrar período")
+    period = c1.date_input(
+        "Período", value=(date(date.today().year, 1, 1), date.today()),
+        format="DD/MM/YYYY", disabled=not use_period
+    )
+
+    use_amount = c2.checkbox("Filtrar valor")
+    min_amount = c2.number_input("Valor mínimo", value=-1000.0, step=50.0, disabled=not use_amount)
+    max_amount = c2.number_input("Valor máximo", value=0.0, step=50.0, disabled=not use_amount)
+
+    categories = CategorizerService().get_unique_categories()['Categoria'].tolist()
+    selected = c3.multiselect("Categorias", [PENDING_LABEL] + categories)
+    order = c3.radio("Ordenar por", ["Relevância", "Data"], horizontal=True)
+
+start_date, end_date = (period if use_period and len(period) == 2 else (None, None))
+
+# Nova busca volta para a primeira página
+criteria = (text, start_date, end_date, use_amount, min_amount, max_amount, tuple(selected), order)
+if st.session_state.get("search_criteria") != criteria:
+    st.session_state["search_criteria"] = criteria
+    st.session_state["search_page"] = 1
+
+page = st.session_state.get("search_page", 1)
+
+started = time.perf_counter()
+results, total = service.search(
+    text,
+    start_date=start_date,
+    end_date=end_date,
+    min_amount=min_amount if use_amount else None,
+    max_amount=max_amount if use_amount else None,
+    categories=[c for c in selected if c != PENDING_LABEL],
+    pending=PENDING_LABEL in selected,
+    order="relevance" if order == "Relevância" else "date",
+    page=page,
+    page_size=PAGE_SIZE,
+)
+elapsed_ms = (time.perf_counter() - started) * 1000
+
+pages = max(1, -(-total // PAGE_SIZE))
+st.markdown(f"**{total}** resultado(s) · página {page} de {pages} · {elapsed_ms:.0f} ms")
+
+if results.empty:
+    st.info("Nenhuma transação encontrada.")
+    profiling.render_sidebar()
+    st.stop()
+
+st.dataframe(
+    results.drop(columns=["hash_id"]),
+    column_config={
+        "date": st.column_config.DateColumn("Data", format="DD/MM/YYYY"),
+        "description": "Descrição",
+        "amount": st.column_config.NumberColumn("Valor", format="R$ %.2f"),
+        "source": "Origem",
+        "category": "Categoria",
+        "is_manual": st.column_config.CheckboxColumn("Manual"),
+    },
+    hide_index=True,
+    use_container_width=True,
+)
+st.caption(f"Soma da página: R$ {results['amount'].sum():,.2f}")
+
+# --- PAGINAÇÃO ---
+def go_to(target: int):
+    st.session_state["search_page"] = target
+
+nav_prev, nav_info, nav_next = st.columns([1, 3, 1])
+nav_prev.button("◀ Anterior", disabled=page <= 1, on_click=go_to, args=(page - 1,), use_container_width=True)
+nav_next.button("Próxima ▶", disabled=page >= pages, on_click=go_to, args=(page + 1,), use_container_width=True)
+
+profiling.render_sidebar()
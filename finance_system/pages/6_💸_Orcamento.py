@@ -0,0 +1,113 @@
+import streamlit as st
+import pandas as pd
+import sys
+import os
+from datetime import date
+
+# --- CORREÇÃO DE PATH ---
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(current_dir)
+sys.path.append(root_dir)
+# ------------------------
+
+from src.utils import profiling
+from src.services.budget_service import ALL_MONTHS, BudgetService
+from src.services.categorizer_service import CategorizerService
+
+st.set_page_config(page_title="Orçamento", layout="wide")
+profiling.begin_page("Orcamento")
+
+STATUS_LABELS = {
+    "estourado": "🔴 Estourado",
+    "alerta": "🟠 Acima de 90%",
+    "ritmo": "🟡 Ritmo acima do orçado",
+    "ok": "🟢 Dentro",
+}
+
+service = BudgetService()
+
+st.title("💸 Orçamento Mensal")
+st.caption("Limite de gastos por categoria. O realizado é mantido a cada importação ou reclassificação.")
+
+# --- MÊS DE REFERÊNCIA ---
+today = date.today()
+months = pd.period_range(end=pd.Period(today, "M"), periods=36, freq="M").astype(str)[::-1].tolist()
+month = st.selectbox("Mês", months, index=0)
+
+report = service.budget_vs_actual(month)
+
+if report.empty:
+    st.info("Nenhum orçamento cadastrado. Defina os limites na tabela abaixo.")
+else:
+    total_budget = report['budget'].sum()
+    total_spent = report['spent'].sum()
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Orçado", f"R$ {total_budget:,.2f}")
+    c2.metric("Gasto", f"R$ {total_spent:,.2f}",
+              delta=f"{(total_spent / total_budget * 100) if total_budget else 0:.0f}% do orçado", delta_color="off")
+    c3.metric("Saldo do Orçamento", f"R$ {total_budget - total_spent:,.2f}")
+
+    alerts = report[report['status'] != "ok"]
+    for _, row in alerts.sort_values("used", ascending=False).iterrows():
+        message = (f"**{row['category']}**: R$ {row['spent']:,.2f} de R$ {row['budget']:,.2f} "
+                   f"({row['used'] * 100:.0f}%)")
+        if row['status'] == "ritmo":
+            st.warning(f"{message}; no ritmo atual fecha o mês em R$ {row['projected']:,.2f}.")
+        elif row['status'] == "estourado":
+            st.error(message)
+        else:
+            st.warning(message)
+
+    st.dataframe(
+        report.assign(status=report['status'].map(STATUS_LABELS)),
+        column_config={
+            "category": "Categoria",
+            "budget": st.column_config.NumberColumn("Orçado", format="R$ %.2f"),
+            "spent": st.column_config.NumberColumn("Gasto", format="R$ %.2f"),
+            "remaining": st.column_config.NumberColumn("Restante", format="R$ %.2f"),
+            "used": st.column_config.ProgressColumn("Consumido", min_value=0, max_value=1, format="%.2f"),
+            "projected": st.column_config.NumberColumn("Projeção do mês", format="R$ %.2f"),
+            "status": "Situação",
+        },
+        hide_index=True,
+        use_container_width=True,
+    )
+
+# --- CADASTRO ---
+st.divider()
+st.subheader("✏️ Limites")
+st.caption(f"Mês `{ALL_MONTHS}` vale para todos os meses; um mês específico (AAAA-MM) substitui o padrão só naquele mês.")
+
+budgets = service.list_budgets()
+categories = CategorizerService().get_unique_categories()['Categoria'].tolist()
+categories = sorted(set(categories) | set(budgets['category']))
+
+edited = st.data_editor(
+    budgets,
+    column_config={
+        "category": st.column_config.SelectboxColumn("Categoria", options=categories, required=True),
+        "month": st.column_config.TextColumn("Mês", default=ALL_MONTHS, required=True),
+        "amount": st.column_config.NumberColumn("Limite (R$)", min_value=0.0, format="R$ %.2f", required=True),
+    },
+    num_rows="dynamic",
+    hide_index=True,
+    use_container_width=True,
+    key="budget_editor",
+)
+
+if st.button("💾 Salvar orçamento", type="primary"):
+    edited = edited.dropna(subset=["category"])
+    before = {(r.category, r.month): r.amount for r in budgets.itertuples()}
+    after = {(r.category, r.month or ALL_MONTHS): r.amount for r in edited.itertuples()}
+    upserts = [(c, m, a) for (c, m), a in after.items() if before.get((c, m)) != a]
+    deleted = [key for key in before if key not in after]
+    try:
+        result = service.apply_budget_changes(upserts=upserts, deleted=deleted)
+    except ValueError as e:
+        st.error(f"Nada foi salvo: {e}")
+    else:
+        del st.session_state["budget_editor"]
+        st.toast(f"{result['saved']} limite(s) gravado(s), {result['deleted']} removido(s).")
+        st.rerun()
+
+profiling.render_sidebar()
@@ -0,0 +1,96 @@
+import streamlit as st
+import pandas as pd
+import sys
+import os
+from datetime import datetime
+
+# --- CORREÇÃO DE PATH ---
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(current_dir)
+sys.path.append(root_dir)
+# ------------------------
+
+from src.database.connection import db_instance
+from src.database.instrumentation import monitor
+from src.database.writer import writer
+
+st.set_page_config(page_title="Diagnóstico", layout="wide")
+
+st.title("🩺 Diagnóstico do Banco")
+st.caption(
+    f"Arquivo: `{db_instance.db_path}` · coletando desde "
+    f"{datetime.fromtimestamp(monitor.since):%d/%m/%Y %H:%M:%S} (todas as páginas desta sessão do servidor)"
+)
+
+# --- CONTROLES ---
+c1, c2, c3 = st.columns([1, 1, 1])
+enabled = c1.toggle("Instrumentação ativa", value=monitor.enabled, help="Vale para as próximas conexões.")
+slow_ms = c2.number_input("Limiar de lentidão (ms)", min_value=1.0, value=float(monitor.slow_ms), step=50.0)
+monitor.configure(enabled=enabled, slow_ms=slow_ms)
+if c3.button("🧹 Zerar estatísticas", use_container_width=True):
+    monitor.reset()
+    st.rerun()
+
+report = pd.DataFrame(monitor.report())
+slow = monitor.slow()
+
+m1, m2, m3, m4 = st.columns(4)
+m1.metric("Comandos distintos", len(report))
+m2.metric("Execuções", int(report["calls"].sum()) if not report.empty else 0)
+m3.metric("Tempo total", f"{report['total_ms'].sum() / 1000:.2f} s" if not report.empty else "0 s")
+m4.metric("Lentos", len(slow))
+st.caption(
+    f"Coordenador de escritas: {writer.stats['jobs']} jobs em {writer.stats['commits']} commits · "
+    f"maior grupo {writer.stats['largest_group']} · {writer.stats['failed']} falha(s)"
+)
+
+tab_agg, tab_recent, tab_slow = st.tabs(["📊 Agregado", "🕒 Recentes", "🐢 Lentos"])
+
+with tab_agg:
+    if report.empty:
+        st.info("Nenhum comando registrado ainda. Navegue pelas outras páginas e volte aqui.")
+    else:
+        st.dataframe(
+            report,
+            column_config={
+                "sql": st.column_config.TextColumn("Comando (normalizado)", width="large"),
+                "calls": "Chamadas",
+                "total_ms": st.column_config.NumberColumn("Total (ms)", format="%.1f"),
+                "mean_ms": st.column_config.NumberColumn("Média (ms)", format="%.2f"),
+                "max_ms": st.column_config.NumberColumn("Máx (ms)", format="%.1f"),
+                "rows": "Linhas",
+                "errors": "Erros",
+                "call_sites": "Origens",
+            },
+            hide_index=True,
+            use_container_width=True,
+        )
+
+with tab_recent:
+    recent = monitor.recent(200)
+    if not recent:
+        st.info("Buffer vazio.")
+    else:
+        st.dataframe(
+            pd.DataFrame([{
+                "Horário": datetime.fromtimestamp(r.started_at).strftime("%H:%M:%S.%f")[:-3],
+                "Tipo": r.kind,
+                "ms": round(r.elapsed_ms, 2),
+                "Linhas": r.rows,
+                "Origem": r.call_site,
+                "Comando": " ".join(r.sql.split())[:300],
+                "Erro": r.error or "",
+            } for r in recent]),
+            hide_index=True,
+            use_container_width=True,
+        )
+
+with tab_slow:
+    if not slow:
+        st.success(f"Nenhum comando acima de {monitor.slow_ms:.0f} ms.")
+    for r in slow:
+        with st.expander(f"{r.elapsed_ms:.0f} ms · {r.rows} linhas · {r.call_site}"):
+            st.code(" ".join(r.sql.split()), language="sql")
+            if r.plan:
+                st.markdown("**Plano de execução**")
+                st.code(r.plan, language="text")
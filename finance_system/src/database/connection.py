@@ -1,24 +1,36 @@
 import sqlite3
 import os
 import logging
+import threading
 from pathlib import Path
+from typing import Optional
+from src.database.instrumentation import connect
 
-# Configuração de Log para rastreabilidade
-logging.basicConfig(level=logging.INFO)
+# Log para rastreabilidade (a configuração de handlers fica a cargo do ponto de entrada)
 logger = logging.getLogger(__name__)
 
 # --- PARAMETRIZAÇÃO DO USUÁRIO ---
 # Caminho alvo no Google Drive
 DRIVE_PATH = Path(r"G:\Meu Drive\4. Registros\Glaydson\Orçamento\db")
 DB_FILENAME = "finance_abs.db"
+ARCHIVE_DIRNAME = "archive"  # Subpasta (ao lado do banco) com os arquivos anuais do acervo
+BUSY_TIMEOUT_S = 30.0        # Espera por locks (escritor ou outro processo) antes de "database is locked"
+CATEGORY_IGNORE = "⛔ IGNORADO"  # Mesma constante das telas (fora da hierarquia de categorias)
+
+# Colunas lidas pela view de união (banco quente + acervo)
+_UNION_COLUMNS = "id, date, description, amount, source, category, is_manual, hash_id"
 
 class DatabaseConnection:
     """
     Singleton responsável pela conexão com o SQLite.
     Gerencia a resiliência do caminho do arquivo (Drive vs Local).
+
+    Inicialização preguiçosa: importar o módulo não toca no disco. O caminho é
+    resolvido (e o schema aplicado) apenas no primeiro uso, e fica em cache.
     """
     
     _instance = None
+    _lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
@@ -30,10 +42,34 @@ class DatabaseConnection:
         if self._initialized:
             return
             
-        self.db_path = self._resolve_db_path()
-        self._init_schema()
+        self._db_path: Optional[Path] = None
+        self.epoch = 0  # Incrementado a cada configure(): conexões longas (escritor) se reabrem
         self._initialized = True
 
+    @property
+    def db_path(self) -> Path:
+        """Caminho do banco. Resolvido e inicializado no primeiro acesso."""
+        if self._db_path is None:
+            with self._lock:
+                if self._db_path is None:
+                    path = self._resolve_db_path()
+                    self._init_schema(path)
+                    self._db_path = path
+        return self._db_path
+
+    def configure(self, path) -> None:
+        """
+        Aponta o singleton para um arquivo específico (CLI, benchmarks, bancos de teste).
+        Aplica o schema imediatamente; substitui a resolução Drive/Local.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self._init_schema(path)
+            self._db_path = path
+            self.epoch += 1
+            logger.info(f"Banco configurado explicitamente: {path}")
+
     def _resolve_db_path(self) -> Path:
         """
         Tenta usar o caminho do G: Drive. 
@@ -57,13 +93,66 @@ class DatabaseConnection:
             local_dir.mkdir(exist_ok=True)
             return local_dir / "finance_fallback.db"
 
-    def get_connection(self) -> sqlite3.Connection:
-        """Retorna uma nova conexão ativa."""
-        return sqlite3.connect(self.db_path)
+    @property
+    def archive_dir(self) -> Path:
+        """Pasta dos arquivos anuais do acervo (ver ArchiveService)."""
+        return self.db_path.parent / ARCHIVE_DIRNAME
+
+    def get_connection(self, archive=False) -> sqlite3.Connection:
+        """
+        Retorna uma nova conexão ativa (instrumentada: ver src/database/instrumentation.py).
+        Para leitura: escritas dos serviços passam pelo coordenador (src/database/writer.py).
 
-    def _init_schema(self):
+        `archive=True` anexa todos os anos do acervo; `archive=(início, fim)` só os que cobrem
+        o período. Com algum ano anexado, a view temporária `transactions` (banco quente + acervo)
+        encobre a tabela: leituras ficam transparentes e escritas sem `main.` falham (acervo é
+        somente leitura). Sem anos anexados, a conexão é a comum.
+        """
+        conn = connect(self.db_path, timeout=BUSY_TIMEOUT_S)
+        if archive:
+            start, end = archive if isinstance(archive, tuple) else (None, None)
+            try:
+                self._attach_archives(conn, start, end)
+            except Exception:
+                conn.close()
+                raise
+        return conn
+
+    def _attach_archives(self, conn: sqlite3.Connection, start=None, end=None) -> list:
+        """Anexa os anos arquivados que cobrem [start, end] e cria a view de união. Retorna os anos."""
+        where, params = [], []
+        if start is not None:
+            where.append("max_date >= ?")
+            params.append(str(start))
+        if end is not None:
+            where.append("min_date <= ?")
+            params.append(str(end))
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        rows = conn.execute(f"SELECT year, path FROM archive_catalog {clause} ORDER BY year", params).fetchall()
+        if not rows:
+            return []
+
+        limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        if len(rows) > limit:
+            raise sqlite3.OperationalError(
+                f"Período cobre {len(rows)} anos arquivados; o SQLite anexa no máximo {limit}. "
+                "Restrinja o período ou restaure anos antigos."
+            )
+
+        selects = [f"SELECT {_UNION_COLUMNS} FROM main.transactions"]
+        for year, relative in rows:
+            path = self.db_path.parent / relative
+            if not path.exists():
+                # ATTACH criaria um arquivo vazio e os totais ficariam errados sem aviso
+                raise sqlite3.OperationalError(f"Arquivo do acervo não encontrado: {path}")
+            conn.execute(f"ATTACH DATABASE ? AS archive_{int(year)}", (str(path),))
+            selects.append(f"SELECT {_UNION_COLUMNS} FROM archive_{int(year)}.transactions")
+        conn.execute(f"CREATE TEMP VIEW transactions AS {' UNION ALL '.join(selects)}")
+        return [year for year, _ in rows]
+
+    def _init_schema(self, path: Path):
         """Garante a existência das tabelas nucleares."""
-        conn = self.get_connection()
+        conn = sqlite3.connect(path)
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -74,21 +163,500 @@ class DatabaseConnection:
             )
         ''')
         
+        # Bancos antigos (hash_id TEXT como chave) são convertidos para a chave inteira
+        legacy = self._is_legacy_transactions(cursor)
+        if legacy:
+            cursor.execute("ALTER TABLE transactions RENAME TO transactions_legacy")
+
         # Tabela Única e Absoluta de Transações
+        # id = 8 primeiros bytes do md5 (int64, alias do rowid: sem índice extra para a PK).
+        # hash_id é derivado (coluna virtual, não ocupa disco) e mantém compatibilidade com o hex.
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS transactions (
-                hash_id TEXT PRIMARY KEY,
+                id INTEGER PRIMARY KEY,
                 date DATE NOT NULL,
                 description TEXT NOT NULL,
                 amount REAL NOT NULL,
                 source TEXT,
                 category TEXT,
-                is_manual BOOLEAN DEFAULT 0
+                is_manual BOOLEAN DEFAULT 0,
+                hash_id TEXT GENERATED ALWAYS AS (printf('%016x', id)) VIRTUAL
             )
         ''')
+        if legacy:
+            self._migrate_legacy_transactions(conn)
         
+        # Contratos de empréstimo: uma linha por contrato, parcelas expandidas sob demanda
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS loans (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                principal REAL NOT NULL,
+                monthly_rate REAL NOT NULL DEFAULT 0,
+                term INTEGER NOT NULL,
+                first_due_date DATE NOT NULL,
+                schedule_type TEXT NOT NULL DEFAULT 'PRICE',
+                category TEXT NOT NULL DEFAULT 'Empréstimos'
+            )
+        ''')
+
+        # Posição já lida de cada arquivo da pasta monitorada (ingestão incremental)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ingest_offsets (
+                path TEXT PRIMARY KEY,
+                offset INTEGER NOT NULL DEFAULT 0,
+                header BLOB,
+                capturing INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Pares de quase-duplicatas já revisados (confirmados ou descartados), por transactions.id
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS duplicate_links (
+                id_a INTEGER NOT NULL,
+                id_b INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                score REAL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (id_a, id_b)
+            )
+        ''')
+
+        # Acervo: anos encerrados movidos para arquivos próprios (caminho relativo à pasta do banco)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS archive_catalog (
+                year INTEGER PRIMARY KEY,
+                path TEXT NOT NULL,
+                rows INTEGER NOT NULL,
+                min_date DATE,
+                max_date DATE,
+                total_amount REAL,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Índice de datas: MIN/MAX e filtros por período sem varrer a tabela
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date)")
+
+        # Índice parcial de saídas: o Radar de Passivos agrega direto do índice (date > hoje AND amount < 0)
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_transactions_outflows
+            ON transactions(date, source, amount) WHERE amount < 0
+        ''')
+
+        self._init_counters(cursor)
+        self._init_search(cursor)
+        self._init_journal(cursor)
+        self._init_partitions(cursor)
+        self._init_budgets(cursor)
+        self._init_categories(cursor)
+
         conn.commit()
+        if legacy:
+            # Devolve ao sistema as páginas da tabela/índice antigos (arquivo menor no Drive)
+            conn.execute("VACUUM")
         conn.close()
 
+    def _is_legacy_transactions(self, cursor: sqlite3.Cursor) -> bool:
+        """True se a tabela de transações ainda usa hash_id TEXT como chave primária."""
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(transactions)")]
+        return bool(columns) and "id" not in columns
+
+    def _migrate_legacy_transactions(self, conn: sqlite3.Connection):
+        """
+        Copia `transactions_legacy` para a tabela com chave inteira e remove a antiga
+        (índices e triggers antigos caem junto e são recriados em seguida).
+        """
+        import hashlib
+        from src.models.transaction import transaction_key
+
+        def key(hash_id: str) -> int:
+            try:
+                return transaction_key(hash_id)
+            except ValueError:
+                # hash_id fora do padrão hex: deriva a chave do md5 do próprio texto
+                return transaction_key(hashlib.md5(hash_id.encode()).hexdigest())
+
+        rows = conn.execute('''
+            SELECT hash_id, date, description, amount, source, category, is_manual
+            FROM transactions_legacy
+        ''')
+        conn.executemany('''
+            INSERT OR IGNORE INTO transactions (id, date, description, amount, source, category, is_manual)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', ((key(h), *rest) for h, *rest in rows))
+        conn.execute("DROP TABLE transactions_legacy")
+
+        # Contadores são semeados de novo a partir da tabela migrada
+        conn.execute("DROP TABLE IF EXISTS system_counters")
+        logger.info("Tabela de transações migrada para chave primária inteira.")
+
+    def _init_counters(self, cursor: sqlite3.Cursor):
+        """
+        Contadores mantidos por triggers (total e pendentes).
+        Evitam COUNT(*) a cada carga da Home: a leitura é O(1) em qualquer tamanho de tabela.
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS system_counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        ''')
+
+        # Semeadura única (bancos já existentes): só varre a tabela se o contador não existir
+        seeded = cursor.execute("SELECT COUNT(*) FROM system_counters").fetchone()[0]
+        if not seeded:
+            cursor.execute("INSERT INTO system_counters (name, value) SELECT 'total', COUNT(*) FROM transactions")
+            cursor.execute('''
+                INSERT INTO system_counters (name, value)
+                SELECT 'pending', COUNT(*) FROM transactions WHERE COALESCE(category, '') = ''
+            ''')
+
+        # Versão dos contratos (chave de cache da previsão de caixa)
+        cursor.execute("INSERT OR IGNORE INTO system_counters (name, value) VALUES ('loans_version', 0)")
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_counters_loans_{event.lower()} AFTER {event} ON loans
+                BEGIN
+                    UPDATE system_counters SET value = value + 1 WHERE name = 'loans_version';
+                END
+            ''')
+
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_counters_insert AFTER INSERT ON transactions
+            BEGIN
+                UPDATE system_counters SET value = value + 1 WHERE name = 'total';
+                UPDATE system_counters SET value = value + 1
+                 WHERE name = 'pending' AND COALESCE(NEW.category, '') = '';
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_counters_delete AFTER DELETE ON transactions
+            BEGIN
+                UPDATE system_counters SET value = value - 1 WHERE name = 'total';
+                UPDATE system_counters SET value = value - 1
+                 WHERE name = 'pending' AND COALESCE(OLD.category, '') = '';
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_counters_update AFTER UPDATE OF category ON transactions
+            WHEN (COALESCE(OLD.category, '') = '') <> (COALESCE(NEW.category, '') = '')
+            BEGIN
+                UPDATE system_counters
+                   SET value = value + (COALESCE(NEW.category, '') = '') - (COALESCE(OLD.category, '') = '')
+                 WHERE name = 'pending';
+            END
+        ''')
+
+    def _init_search(self, cursor: sqlite3.Cursor):
+        """
+        Índices de texto completo (FTS5) sobre as descrições, em modo external content:
+        o texto não é duplicado, os índices apontam para transactions.id e são mantidos por triggers.
+        - transactions_fts: palavras sem acentos ('cafe' encontra 'CAFÉ'), para a Busca.
+        - transactions_trgm: trigramas, atende `LIKE '%termo%'` das regras (prévia de impacto).
+        """
+        self._create_description_index(
+            cursor, "transactions_fts", "unicode61 remove_diacritics 2", trigger_prefix="trg_fts"
+        )
+        # detail=none: só a presença do trigrama é gravada (suficiente para LIKE, índice menor)
+        self._create_description_index(
+            cursor, "transactions_trgm", "trigram", trigger_prefix="trg_trgm", detail="none"
+        )
+
+    def _create_description_index(
+        self, cursor: sqlite3.Cursor, table: str, tokenize: str, trigger_prefix: str, detail: str = "full"
+    ):
+        """Cria (uma vez) um índice FTS5 external content de `description` e seus triggers."""
+        exists = cursor.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (table,)).fetchone()
+        try:
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5(
+                    description,
+                    content = 'transactions',
+                    content_rowid = 'id',
+                    tokenize = '{tokenize}',
+                    detail = '{detail}'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            # SQLite compilado sem FTS5 (ou sem o tokenizador): consultas usam LIKE como alternativa
+            logger.warning(f"Índice {table} indisponível ({e}). Busca textual sem índice.")
+            return
+
+        if not exists:
+            # Primeira criação (banco já populado): indexa o histórico existente
+            cursor.execute(f"INSERT INTO {table} ({table}) VALUES ('rebuild')")
+
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {trigger_prefix}_insert AFTER INSERT ON transactions
+            BEGIN
+                INSERT INTO {table} (rowid, description) VALUES (NEW.id, NEW.description);
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {trigger_prefix}_delete AFTER DELETE ON transactions
+            BEGIN
+                INSERT INTO {table} ({table}, rowid, description) VALUES ('delete', OLD.id, OLD.description);
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {trigger_prefix}_update AFTER UPDATE OF description ON transactions
+            BEGIN
+                INSERT INTO {table} ({table}, rowid, description) VALUES ('delete', OLD.id, OLD.description);
+                INSERT INTO {table} (rowid, description) VALUES (NEW.id, NEW.description);
+            END
+        ''')
+
+    def _init_journal(self, cursor: sqlite3.Cursor):
+        """
+        Diário de mudanças de classificação (estado antigo e novo da linha), mantido por triggers.
+        Alimenta o re-treino incremental das sugestões de categoria: só linhas com categoria
+        (antes ou depois) entram no diário.
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS category_journal (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                old_category TEXT,
+                old_description TEXT,
+                old_amount REAL,
+                old_source TEXT,
+                new_category TEXT,
+                new_description TEXT,
+                new_amount REAL,
+                new_source TEXT
+            )
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_journal_insert AFTER INSERT ON transactions
+            WHEN COALESCE(NEW.category, '') <> ''
+            BEGIN
+                INSERT INTO category_journal (new_category, new_description, new_amount, new_source)
+                VALUES (NEW.category, NEW.description, NEW.amount, NEW.source);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_journal_delete AFTER DELETE ON transactions
+            WHEN COALESCE(OLD.category, '') <> ''
+            BEGIN
+                INSERT INTO category_journal (old_category, old_description, old_amount, old_source)
+                VALUES (OLD.category, OLD.description, OLD.amount, OLD.source);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_journal_update AFTER UPDATE OF category, description, amount ON transactions
+            WHEN (COALESCE(OLD.category, '') <> '' OR COALESCE(NEW.category, '') <> '')
+             AND (OLD.category IS NOT NEW.category OR OLD.description IS NOT NEW.description
+                  OR OLD.amount IS NOT NEW.amount)
+            BEGIN
+                INSERT INTO category_journal (
+                    old_category, old_description, old_amount, old_source,
+                    new_category, new_description, new_amount, new_source
+                )
+                VALUES (
+                    NULLIF(OLD.category, ''), OLD.description, OLD.amount, OLD.source,
+                    NULLIF(NEW.category, ''), NEW.description, NEW.amount, NEW.source
+                );
+            END
+        ''')
+
+    def _init_partitions(self, cursor: sqlite3.Cursor):
+        """
+        Versão de cada mês ('AAAA-MM') de transações, incrementada por triggers a cada mudança.
+        A exportação colunar (ExportService) reescreve só os meses cuja versão mudou.
+        """
+        exists = cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'partition_versions'").fetchone()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS partition_versions (
+                month TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        ''')
+        if not exists:
+            # Semeadura única (bancos já populados): uma varredura do índice de datas
+            cursor.execute('''
+                INSERT INTO partition_versions (month, version)
+                SELECT DISTINCT substr(date, 1, 7), 1 FROM transactions
+            ''')
+
+        bump = '''
+                INSERT INTO partition_versions (month, version) VALUES (substr({row}.date, 1, 7), 1)
+                ON CONFLICT (month) DO UPDATE SET version = version + 1;'''
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_partitions_insert AFTER INSERT ON transactions
+            BEGIN{bump.format(row="NEW")}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_partitions_delete AFTER DELETE ON transactions
+            BEGIN{bump.format(row="OLD")}
+            END
+        ''')
+        # Mudança de data entre meses invalida os dois meses
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_partitions_update AFTER UPDATE ON transactions
+            WHEN OLD.date IS NOT NEW.date OR OLD.description IS NOT NEW.description
+              OR OLD.amount IS NOT NEW.amount OR OLD.source IS NOT NEW.source
+              OR OLD.category IS NOT NEW.category OR OLD.is_manual IS NOT NEW.is_manual
+            BEGIN{bump.format(row="NEW")}
+                INSERT INTO partition_versions (month, version)
+                SELECT substr(OLD.date, 1, 7), 1 WHERE substr(OLD.date, 1, 7) <> substr(NEW.date, 1, 7)
+                ON CONFLICT (month) DO UPDATE SET version = version + 1;
+            END
+        ''')
+
+    def _init_budgets(self, cursor: sqlite3.Cursor):
+        """
+        Orçamentos por categoria e o realizado por mês x categoria, mantido por triggers.
+        O confronto orçado x realizado de um mês lê uma linha por categoria, sem varrer transações.
+        `budgets.month = '*'` vale para todos os meses; um mês específico ('AAAA-MM') sobrepõe.
+        `budget_actuals` cobre o banco quente (anos do acervo são somados direto do acervo).
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS budgets (
+                category TEXT NOT NULL,
+                month TEXT NOT NULL DEFAULT '*',
+                amount REAL NOT NULL,
+                PRIMARY KEY (category, month)
+            )
+        ''')
+
+        exists = cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'budget_actuals'").fetchone()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS budget_actuals (
+                month TEXT NOT NULL,
+                category TEXT NOT NULL,
+                amount REAL NOT NULL DEFAULT 0,
+                rows INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (month, category)
+            ) WITHOUT ROWID
+        ''')
+        if not exists:
+            # Semeadura única a partir do histórico existente
+            cursor.execute('''
+                INSERT INTO budget_actuals (month, category, amount, rows)
+                SELECT substr(date, 1, 7), COALESCE(category, ''), SUM(amount), COUNT(*)
+                FROM transactions GROUP BY 1, 2
+            ''')
+
+        add = '''
+                INSERT INTO budget_actuals (month, category, amount, rows)
+                VALUES (substr(NEW.date, 1, 7), COALESCE(NEW.category, ''), NEW.amount, 1)
+                ON CONFLICT (month, category) DO UPDATE SET amount = amount + excluded.amount, rows = rows + 1;'''
+        remove = '''
+                UPDATE budget_actuals SET amount = amount - OLD.amount, rows = rows - 1
+                 WHERE month = substr(OLD.date, 1, 7) AND category = COALESCE(OLD.category, '');
+                DELETE FROM budget_actuals
+                 WHERE month = substr(OLD.date, 1, 7) AND category = COALESCE(OLD.category, '') AND rows <= 0;'''
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_actuals_insert AFTER INSERT ON transactions
+            BEGIN{add}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_actuals_delete AFTER DELETE ON transactions
+            BEGIN{remove}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_actuals_update AFTER UPDATE OF date, amount, category ON transactions
+            WHEN OLD.date IS NOT NEW.date OR OLD.amount IS NOT NEW.amount
+              OR COALESCE(OLD.category, '') <> COALESCE(NEW.category, '')
+            BEGIN{remove}{add}
+            END
+        ''')
+
+    def _init_categories(self, cursor: sqlite3.Cursor):
+        """
+        Hierarquia de categorias (ex: Moradia > Aluguel) em tabela de fechamento:
+        `category_closure` guarda todo par ancestral -> descendente com a distância, então a
+        subárvore de um nó é um único join indexado (sem CTE recursiva nem comparação de texto).
+        Mantida por triggers ao inserir, mover (parent_id) ou excluir categorias; toda categoria
+        que entra no realizado mensal ganha um nó raiz automaticamente.
+        """
+        exists = cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'categories'").fetchone()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS categories (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT UNIQUE NOT NULL,
+                parent_id INTEGER REFERENCES categories(id)
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS category_closure (
+                ancestor INTEGER NOT NULL,
+                descendant INTEGER NOT NULL,
+                depth INTEGER NOT NULL,
+                PRIMARY KEY (ancestor, descendant)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_closure_descendant ON category_closure(descendant, depth)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_categories_parent ON categories(parent_id)")
+
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_categories_insert AFTER INSERT ON categories
+            BEGIN
+                INSERT INTO category_closure (ancestor, descendant, depth)
+                SELECT NEW.id, NEW.id, 0
+                UNION ALL
+                SELECT ancestor, NEW.id, depth + 1 FROM category_closure WHERE descendant = NEW.parent_id;
+            END
+        ''')
+        # Mover para dentro da própria subárvore criaria um ciclo
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_categories_cycle BEFORE UPDATE OF parent_id ON categories
+            WHEN NEW.parent_id IS NOT NULL AND EXISTS (
+                SELECT 1 FROM category_closure WHERE ancestor = NEW.id AND descendant = NEW.parent_id
+            )
+            BEGIN
+                SELECT RAISE(ABORT, 'Uma categoria não pode ficar dentro de si mesma.');
+            END
+        ''')
+        # Move a subárvore: corta os ancestrais antigos e liga aos do novo pai
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_categories_move AFTER UPDATE OF parent_id ON categories
+            WHEN OLD.parent_id IS NOT NEW.parent_id
+            BEGIN
+                DELETE FROM category_closure
+                 WHERE descendant IN (SELECT descendant FROM category_closure WHERE ancestor = NEW.id)
+                   AND ancestor IN (SELECT ancestor FROM category_closure WHERE descendant = NEW.id AND ancestor <> NEW.id);
+                INSERT INTO category_closure (ancestor, descendant, depth)
+                SELECT sup.ancestor, sub.descendant, sup.depth + sub.depth + 1
+                FROM category_closure sup, category_closure sub
+                WHERE sup.descendant = NEW.parent_id AND sub.ancestor = NEW.id;
+            END
+        ''')
+        # Excluir um nó sobe os filhos para o avô
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_categories_before_delete BEFORE DELETE ON categories
+            BEGIN
+                UPDATE categories SET parent_id = OLD.parent_id WHERE parent_id = OLD.id;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_categories_delete AFTER DELETE ON categories
+            BEGIN
+                DELETE FROM category_closure WHERE ancestor = OLD.id OR descendant = OLD.id;
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_categories_from_actuals AFTER INSERT ON budget_actuals
+            WHEN NEW.category NOT IN ('', '{CATEGORY_IGNORE}')
+            BEGIN
+                INSERT OR IGNORE INTO categories (name) VALUES (NEW.category);
+            END
+        ''')
+
+        if not exists:
+            # Semeadura única: toda categoria em uso vira raiz (a hierarquia é montada pelo usuário)
+            cursor.execute('''
+                INSERT OR IGNORE INTO categories (name)
+                SELECT name FROM (
+                    SELECT category AS name FROM budget_actuals
+                    UNION SELECT target_category FROM classification_rules
+                    UNION SELECT category FROM budgets
+                ) WHERE name NOT IN ('', ?) ORDER BY name
+            ''', (CATEGORY_IGNORE,))
+
 # Instância global para ser importada pelos Services
-db_instance = DatabaseConnection()
\ No newline at end of file
+db_instance = DatabaseConnection()
@@ -0,0 +1,344 @@
+"""
+Instrumentação das conexões SQLite.
+
+`DatabaseConnection.get_connection()` entrega conexões `InstrumentedConnection`, cujos
+cursores medem cada comando (execução + leitura das linhas), contam linhas e registram
+o ponto do código que o disparou. O `monitor` (um por processo, compartilhado pelas páginas
+do Streamlit) mantém:
+    - um buffer circular com os comandos mais recentes;
+    - o agregado por comando normalizado (chamadas, tempo total/máximo, linhas, origens);
+    - o log dos comandos lentos, com o `EXPLAIN QUERY PLAN` correspondente.
+"""
+import logging
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = 250.0   # Acima disso o comando é logado com o plano de execução
+RING_SIZE = 500         # Comandos recentes mantidos em memória
+MAX_CALL_SITES = 5      # Origens distintas guardadas por comando agregado
+
+_PROJECT_ROOT = str(Path(__file__).resolve().parents[2])
+_THIS_FILE = str(Path(__file__).resolve())
+
+# Normalização para agregação: espaços, listas IN (?, ?, ...) e literais embutidos
+_SPACES = re.compile(r"\s+")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT", "REPLACE")
+
+def normalize_sql(sql: str) -> str:
+    """Forma canônica do comando: mesmos comandos com valores diferentes caem na mesma linha."""
+    text = _SPACES.sub(" ", sql).strip()
+    text = _STRING_LITERAL.sub("?", text)
+    text = _NUMBER_LITERAL.sub("?", text)
+    return _PLACEHOLDER_LIST.sub("(?, …)", text)
+
+def _call_site() -> str:
+    """Primeiro quadro da pilha dentro do projeto (fora deste módulo): 'arquivo:linha (função)'."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_PROJECT_ROOT) and filename != _THIS_FILE:
+            relative = filename[len(_PROJECT_ROOT):].lstrip("\\/")
+            return f"{relative}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return "?"
+
+@dataclass
+class StatementRecord:
+    """Um comando executado. Atualizado em lugar enquanto as linhas são lidas."""
+    sql: str
+    kind: str                  # execute, executemany, executescript, commit
+    call_site: str
+    started_at: float          # time.time() do início
+    elapsed_ms: float = 0.0    # Execução + leitura das linhas
+    rows: int = 0              # Linhas lidas (SELECT) ou afetadas (DML)
+    error: Optional[str] = None
+    plan: Optional[str] = None
+    finished: bool = False
+    key: str = ""              # Comando normalizado (chave do agregado)
+
+@dataclass
+class _Aggregate:
+    calls: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    rows: int = 0
+    errors: int = 0
+    call_sites: Dict[str, int] = field(default_factory=dict)
+
+class SqlMonitor:
+    """Coletor de métricas dos comandos SQL (thread-safe; o Streamlit roda cada sessão numa thread)."""
+
+    def __init__(self, slow_ms: float = SLOW_QUERY_MS, capacity: int = RING_SIZE):
+        self.enabled = True
+        self.slow_ms = slow_ms
+        self._lock = threading.Lock()
+        self._recent: deque = deque(maxlen=capacity)
+        self._slow: deque = deque(maxlen=50)
+        self._aggregates: Dict[str, _Aggregate] = {}
+        self._since = time.time()
+
+    def configure(self, enabled: Optional[bool] = None, slow_ms: Optional[float] = None):
+        """Liga/desliga a instrumentação (vale para as próximas conexões) e ajusta o limiar de lentidão."""
+        if enabled is not None:
+            self.enabled = enabled
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+
+    def reset(self):
+        """Descarta o histórico e os agregados."""
+        with self._lock:
+            self._recent.clear()
+            self._slow.clear()
+            self._aggregates.clear()
+            self._since = time.time()
+
+    # --- COLETA ---
+
+    def start(self, sql: str, kind: str, call_site: str, elapsed_ms: float, rows: int,
+              error: Optional[str] = None) -> StatementRecord:
+        record = StatementRecord(
+            sql=sql, kind=kind, call_site=call_site, started_at=time.time() - elapsed_ms / 1000,
+            elapsed_ms=elapsed_ms, rows=rows, error=error, key=normalize_sql(sql)
+        )
+        with self._lock:
+            self._recent.append(record)
+            agg = self._aggregates.setdefault(record.key, _Aggregate())
+            agg.calls += 1
+            agg.total_ms += elapsed_ms
+            agg.rows += rows
+            agg.errors += error is not None
+            agg.call_sites[call_site] = agg.call_sites.get(call_site, 0) + 1
+            if len(agg.call_sites) > MAX_CALL_SITES:
+                del agg.call_sites[min(agg.call_sites, key=agg.call_sites.get)]
+        return record
+
+    def add(self, record: StatementRecord, elapsed_ms: float, rows: int):
+        """Tempo e linhas de uma leitura (fetch) adicionados ao comando em andamento."""
+        record.elapsed_ms += elapsed_ms
+        record.rows += rows
+        with self._lock:
+            agg = self._aggregates.get(record.key)
+            if agg is not None:
+                agg.total_ms += elapsed_ms
+                agg.rows += rows
+
+    def finish(self, record: StatementRecord, conn: Optional[sqlite3.Connection], params=None):
+        """Fecha o comando: atualiza o máximo e, se lento, registra o plano de execução."""
+        if record.finished:
+            return
+        record.finished = True
+        with self._lock:
+            agg = self._aggregates.get(record.key)
+            if agg is not None:
+                agg.max_ms = max(agg.max_ms, record.elapsed_ms)
+
+        if record.elapsed_ms < self.slow_ms:
+            return
+        record.plan = self._explain(conn, record.sql, params) if conn is not None else None
+        with self._lock:
+            self._slow.append(record)
+        logger.warning(
+            f"SQL lento ({record.elapsed_ms:.0f} ms, {record.rows} linhas) em {record.call_site}: "
+            f"{record.key[:300]}" + (f"\nPlano:\n{record.plan}" if record.plan else "")
+        )
+
+    def _explain(self, conn: sqlite3.Connection, sql: str, params) -> Optional[str]:
+        """EXPLAIN QUERY PLAN em cursor comum (não instrumentado); None se não se aplica."""
+        if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+            return None
+        try:
+            rows = sqlite3.Cursor(conn).execute(f"EXPLAIN QUERY PLAN {sql}", params or ()).fetchall()
+        except sqlite3.Error:
+            return None
+        # (id, parent, notused, detail): indentação pela profundidade na árvore
+        depth = {0: -1}
+        lines = []
+        for node, parent, _, detail in rows:
+            depth[node] = depth.get(parent, -1) + 1
+            lines.append("  " * depth[node] + detail)
+        return "\n".join(lines)
+
+    # --- CONSULTA ---
+
+    @property
+    def since(self) -> float:
+        return self._since
+
+    def recent(self, limit: Optional[int] = None) -> List[StatementRecord]:
+        """Comandos mais recentes primeiro."""
+        with self._lock:
+            records = list(self._recent)
+        records.reverse()
+        return records[:limit] if limit else records
+
+    def slow(self) -> List[StatementRecord]:
+        """Comandos lentos (com plano), mais recentes primeiro."""
+        with self._lock:
+            records = list(self._slow)
+        records.reverse()
+        return records
+
+    def report(self) -> List[dict]:
+        """Agregado por comando normalizado, do maior tempo total para o menor."""
+        with self._lock:
+            items = [(sql, _Aggregate(a.calls, a.total_ms, a.max_ms, a.rows, a.errors, dict(a.call_sites)))
+                     for sql, a in self._aggregates.items()]
+        rows = [{
+            "sql": sql,
+            "calls": a.calls,
+            "total_ms": round(a.total_ms, 2),
+            "mean_ms": round(a.total_ms / a.calls, 2) if a.calls else 0.0,
+            "max_ms": round(a.max_ms, 2),
+            "rows": a.rows,
+            "errors": a.errors,
+            "call_sites": ", ".join(sorted(a.call_sites, key=a.call_sites.get, reverse=True)),
+        } for sql, a in items]
+        return sorted(rows, key=lambda r: r["total_ms"], reverse=True)
+
+monitor = SqlMonitor()
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Cursor que mede execução e leitura. O comando fica "aberto" até as linhas acabarem,
+    o cursor ser reutilizado, fechado ou descartado; só então o limiar de lentidão é avaliado.
+    """
+    _record: Optional[StatementRecord] = None
+    _params = None
+
+    def _run(self, kind: str, method, sql: str, *args):
+        self._finish()
+        site = _call_site()
+        error = None
+        started = time.perf_counter()
+        try:
+            return method(sql, *args)
+        except sqlite3.Error as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            # DML: rowcount = linhas afetadas; SELECT: -1 (contadas na leitura)
+            rows = max(self.rowcount, 0) if error is None else 0
+            self._record = monitor.start(sql, kind, site, elapsed, rows, error)
+            if error is not None or self.description is None:
+                self._finish()
+
+    def execute(self, sql, parameters=()):
+        self._params = parameters
+        return self._run("execute", super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._params = None  # Sequência pode ser um gerador: sem parâmetros para o EXPLAIN
+        return self._run("executemany", super().executemany, sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        self._params = None
+        return self._run("executescript", super().executescript, sql_script)
+
+    def _fetched(self, started: float, rows: int, exhausted: bool):
+        if self._record is not None:
+            monitor.add(self._record, (time.perf_counter() - started) * 1000, rows)
+            if exhausted:
+                self._finish()
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(started, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows), True)
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(started, 0, True)
+            raise
+        self._fetched(started, 1, False)
+        return row
+
+    def _finish(self):
+        record, self._record = self._record, None
+        if record is not None:
+            try:
+                conn = self.connection
+            except sqlite3.ProgrammingError:
+                conn = None
+            monitor.finish(record, conn, self._params)
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # `conn.execute(...).fetchone()` descarta o cursor sem esgotar as linhas
+        if self._record is not None:
+            self._finish()
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Conexão cujos cursores (inclusive os de conn.execute e do pandas) são instrumentados."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    # Os atalhos do sqlite3 criam o cursor internamente, sem passar por cursor()
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def commit(self):
+        if not self.in_transaction:
+            return super().commit()
+        return self._timed_commit(super().commit)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # `with conn:` confirma sem chamar commit() em Python
+        if exc_type is not None or not self.in_transaction:
+            return super().__exit__(exc_type, exc_value, traceback)
+        return self._timed_commit(super().__exit__, exc_type, exc_value, traceback)
+
+    def _timed_commit(self, method, *args):
+        site = _call_site()
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            # Commit = fsync: no arquivo do Drive costuma ser o passo mais caro
+            record = monitor.start("COMMIT", "commit", site, (time.perf_counter() - started) * 1000, 0)
+            monitor.finish(record, None)
+
+def connect(path, **kwargs) -> sqlite3.Connection:
+    """sqlite3.connect com instrumentação quando o monitor está ligado."""
+    if monitor.enabled:
+        kwargs.setdefault("factory", InstrumentedConnection)
+    return sqlite3.connect(path, **kwargs)
@@ -0,0 +1,260 @@
+"""
+Coordenador de escritas: uma única thread dona da conexão de escrita do processo.
+
+Os serviços não escrevem mais em conexões próprias: entregam um job (função que recebe a
+conexão) com `writer.submit(job)` e recebem um Future, ou `writer.run(job)` para esperar o
+resultado. A thread esvazia a fila em lotes: os jobs acumulados enquanto o commit anterior
+acontecia entram numa mesma transação (group commit), cada um no seu SAVEPOINT. Um job que
+falha desfaz só o próprio savepoint; os demais seguem. Os Futures só são resolvidos depois do
+COMMIT, então quem recebe o resultado sabe que a escrita está no disco.
+
+Regras para jobs:
+- Não chamar commit()/rollback(): a transação é do coordenador (exceções desfazem o job).
+- Sem ATTACH/VACUUM/BEGIN: operações que controlam a própria transação usam `exclusive=True`
+  (o job roda sozinho, fora de transação, e confirma o que abrir).
+- Um job pode disparar outro (writer.run/submit): o interno roda na hora, num SAVEPOINT da
+  transação corrente. `run` devolve o resultado direto (esperar o COMMIT travaria a thread);
+  o Future segue a regra geral e só é resolvido com o job externo, depois do COMMIT.
+
+Leituras continuam em conexões comuns (`db_instance.get_connection()`), em paralelo.
+Outros processos (CLI, outra instância do Streamlit) têm o próprio coordenador; entre eles
+vale o busy_timeout.
+"""
+import atexit
+import logging
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, List, Optional, TypeVar
+from src.database.connection import BUSY_TIMEOUT_S, DRIVE_PATH, db_instance
+from src.database.instrumentation import connect
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+MAX_GROUP = 64  # Jobs por transação (limita quanto trabalho um erro de COMMIT descarta)
+
+@dataclass
+class _Job:
+    func: Callable[[sqlite3.Connection], object]
+    future: Future = field(default_factory=Future)
+    exclusive: bool = False
+    label: str = ""
+
+class WriteCoordinator:
+    """Fila de escritas do processo, atendida por uma única thread (criada no primeiro uso)."""
+
+    def __init__(self, max_group: int = MAX_GROUP):
+        self.max_group = max_group
+        self._queue: "queue.Queue[Optional[_Job]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_key: Optional[tuple] = None
+        self.stats = {"jobs": 0, "commits": 0, "failed": 0, "largest_group": 0}
+        self._nested: List[tuple] = []  # (job, resultado) internos do job em execução
+
+    # --- API ---
+
+    def submit(self, func: Callable[[sqlite3.Connection], T], exclusive: bool = False) -> "Future[T]":
+        """Enfileira `func(conn)` e devolve o Future do resultado (resolvido após o COMMIT)."""
+        job = _Job(func, exclusive=exclusive, label=getattr(func, "__qualname__", repr(func)))
+        if threading.current_thread() is self._thread:
+            # Job disparado de dentro de outro job (ex: create_rule -> reclassificação):
+            # roda já, na transação corrente, em vez de esperar na fila (deadlock)
+            try:
+                self._run_nested(job)
+            except Exception:
+                pass  # Já registrada no Future
+            return job.future
+        self._ensure_thread()
+        self._queue.put(job)
+        return job.future
+
+    def run(self, func: Callable[[sqlite3.Connection], T], exclusive: bool = False,
+            timeout: Optional[float] = None) -> T:
+        """Enfileira e espera: devolve o resultado do job ou relança a exceção dele."""
+        if threading.current_thread() is self._thread:
+            return self._run_nested(_Job(func, exclusive=exclusive, label=getattr(func, "__qualname__", repr(func))))
+        return self.submit(func, exclusive=exclusive).result(timeout)
+
+    def close(self, timeout: Optional[float] = 10.0):
+        """Processa o que já está na fila e encerra a thread (chamado também no atexit)."""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._queue.put(None)
+        thread.join(timeout)
+        with self._lock:
+            self._thread = None
+
+    # --- THREAD ---
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="finance-writer", daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        try:
+            while True:
+                job = self._queue.get()
+                if job is None:
+                    return
+                if job.exclusive:
+                    self._run_exclusive(job)
+                    continue
+
+                # Group commit: junta o que já estiver na fila, sem esperar por mais
+                group: List[_Job] = [job]
+                stop = False
+                while len(group) < self.max_group:
+                    try:
+                        nxt = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if nxt is None:
+                        stop = True
+                        break
+                    if nxt.exclusive:
+                        self._run_group(group)
+                        group = []
+                        self._run_exclusive(nxt)
+                        continue
+                    group.append(nxt)
+                if group:
+                    self._run_group(group)
+                if stop:
+                    return
+        finally:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Conexão de escrita; reaberta a cada `db_instance.configure` (CLI, benchmarks, cópias)."""
+        path = db_instance.db_path
+        key = (path, db_instance.epoch)
+        if self._conn is None or self._conn_key != key:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = connect(path, timeout=BUSY_TIMEOUT_S, check_same_thread=False)
+            self._conn.execute(f"PRAGMA journal_mode = {self._journal_mode(path)}")
+            self._conn_key = key
+        return self._conn
+
+    @staticmethod
+    def _journal_mode(path: Path) -> str:
+        """
+        WAL (leitores não esperam o commit) em disco local. No Drive fica o journal padrão:
+        o WAL depende de memória compartilhada (-shm), que não é segura em pasta sincronizada.
+        """
+        return "DELETE" if DRIVE_PATH in path.parents else "WAL"
+
+    def _run_group(self, group: List[_Job]):
+        done = []
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            for i, job in enumerate(group):
+                savepoint = f"job_{i}"
+                conn.execute(f"SAVEPOINT {savepoint}")
+                self._nested = []
+                try:
+                    result = job.func(conn)
+                except Exception as e:
+                    conn.execute(f"ROLLBACK TO {savepoint}")
+                    conn.execute(f"RELEASE {savepoint}")
+                    job.future.set_exception(e)
+                    self._fail_nested(e)
+                    self.stats["failed"] += 1
+                    logger.debug(f"Job de escrita desfeito ({job.label}): {e}")
+                    continue
+                conn.execute(f"RELEASE {savepoint}")
+                done.append((job, result))
+                done.extend(self._nested)
+                self._nested = []
+            conn.commit()
+        except BaseException as e:
+            # Falha da transação inteira (lock, disco, commit): nenhum job do grupo foi gravado
+            if self._conn is not None and self._conn.in_transaction:
+                self._conn.rollback()
+            self._fail_nested(e)
+            pending = [job for job in group if not job.future.done()]
+            for job in pending:
+                job.future.set_exception(e)
+            for job, _ in done:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            self.stats["failed"] += len(pending)
+            logger.warning(f"Grupo de {len(group)} escrita(s) desfeito: {e}")
+            return
+
+        self.stats["jobs"] += len(group)
+        self.stats["commits"] += 1
+        self.stats["largest_group"] = max(self.stats["largest_group"], len(group))
+        for job, result in done:
+            job.future.set_result(result)
+
+    def _run_exclusive(self, job: _Job):
+        """Job sozinho e fora de transação (ATTACH, VACUUM, transação própria)."""
+        self._nested = []
+        try:
+            conn = self._connection()
+            result = job.func(conn)
+            if conn.in_transaction:
+                conn.commit()
+        except Exception as e:
+            if self._conn is not None and self._conn.in_transaction:
+                self._conn.rollback()
+            job.future.set_exception(e)
+            self._fail_nested(e)
+            self.stats["failed"] += 1
+            return
+        self.stats["jobs"] += 1
+        self.stats["commits"] += 1
+        job.future.set_result(result)
+        for nested, nested_result in self._nested:
+            nested.future.set_result(nested_result)
+        self._nested = []
+
+    def _run_nested(self, job: _Job):
+        """
+        Roda `job` dentro do job corrente, num SAVEPOINT próprio, e devolve o resultado.
+        Em caso de erro, desfaz só o savepoint, registra a exceção no Future e a relança.
+        Em caso de sucesso, o Future fica pendente até o job externo ser confirmado.
+        """
+        conn = self._conn
+        savepoint = f"nested_{id(job)}"
+        inner = len(self._nested)
+        conn.execute(f"SAVEPOINT {savepoint}")
+        try:
+            result = job.func(conn)
+        except Exception as e:
+            conn.execute(f"ROLLBACK TO {savepoint}")
+            conn.execute(f"RELEASE {savepoint}")
+            job.future.set_exception(e)
+            self._fail_nested(e, inner)
+            raise
+        conn.execute(f"RELEASE {savepoint}")
+        self._nested.append((job, result))
+        return result
+
+    def _fail_nested(self, error: BaseException, start: int = 0):
+        """Jobs internos (a partir de `start`) desfeitos junto com o job que os disparou."""
+        for job, _ in self._nested[start:]:
+            if not job.future.done():
+                job.future.set_exception(error)
+        del self._nested[start:]
+
+# Instância global do processo (a thread só nasce na primeira escrita)
+writer = WriteCoordinator()
+atexit.register(writer.close)
@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional
+import numpy as np
+
+# Tipos de tabela de amortização suportados
+SCHEDULE_PRICE = "PRICE"  # Parcela fixa
+SCHEDULE_SAC = "SAC"      # Amortização constante
+
+# Efeito de uma amortização extraordinária
+PREPAY_REDUCE_TERM = "PRAZO"          # Mantém a parcela, encurta o contrato
+PREPAY_REDUCE_INSTALLMENT = "PARCELA" # Mantém o prazo, reduz as parcelas
+
+def due_dates(first_due_date: date, idx: np.ndarray) -> np.ndarray:
+    """
+    Datas de vencimento (datetime64[D]) das parcelas de índice `idx` (0 = primeira).
+    Mesma regra do plano original (somar relativedelta(months=1) à parcela anterior): o dia é
+    limitado ao fim do mês e o corte se propaga (31/01 -> 28/02 -> 28/03), o que mantém as
+    datas, e portanto as chaves, das parcelas já gravadas.
+    """
+    idx = np.asarray(idx, dtype=np.int64)
+    if not len(idx):
+        return np.array([], dtype="datetime64[D]")
+    months = np.datetime64(first_due_date, "M") + np.arange(int(idx.max()) + 1)
+    month_start = months.astype("datetime64[D]")
+    days_in_month = ((months + 1).astype("datetime64[D]") - month_start).astype(int)
+    day = np.minimum.accumulate(np.minimum(first_due_date.day, days_in_month))
+    return month_start[idx] + (day[idx] - 1)
+
+@dataclass
+class Loan:
+    """
+    Contrato de empréstimo/financiamento armazenado de forma compacta.
+    As parcelas não são gravadas no banco: o LoanService as expande sob demanda.
+
+    Campos:
+        name (str): Nome do credor/contrato (ex: 'Financiamento Imóvel').
+        principal (float): Valor financiado (saldo devedor inicial, positivo).
+        monthly_rate (float): Taxa de juros mensal em fração (ex: 0.01 = 1% a.m.).
+        term (int): Quantidade total de parcelas.
+        first_due_date (date): Vencimento da primeira parcela.
+        schedule_type (str): 'PRICE' (parcela fixa) ou 'SAC' (amortização constante).
+        category (str): Categoria aplicada às parcelas projetadas.
+        id (Optional[int]): Chave do contrato no banco.
+    """
+    name: str
+    principal: float
+    monthly_rate: float
+    term: int
+    first_due_date: date
+    schedule_type: str = SCHEDULE_PRICE
+    category: str = "Empréstimos"
+    id: Optional[int] = None
+
+    @property
+    def last_due_date(self) -> date:
+        """Vencimento da última parcela (mesma regra de `due_dates`)."""
+        return due_dates(self.first_due_date, [self.term - 1])[0].item()
+
+    def to_dict(self) -> dict:
+        """Serializa para uso em Dataframes e Interfaces."""
+        return {
+            "Contrato": self.name,
+            "Tipo": self.schedule_type,
+            "Valor Financiado": self.principal,
+            "Taxa Mensal (%)": self.monthly_rate * 100,
+            "Parcelas": self.term,
+            "Primeiro Vencimento": self.first_due_date,
+            "Último Vencimento": self.last_due_date,
+        }
+
+@dataclass
+class Prepayment:
+    """
+    Amortização extraordinária (cenário de simulação).
+
+    Campos:
+        installment (int): Número da parcela (1 = primeira) após a qual o valor é abatido.
+        amount (float): Valor abatido do saldo devedor.
+        mode (str): 'PRAZO' (reduz prazo) ou 'PARCELA' (reduz valor das parcelas).
+    """
+    installment: int
+    amount: float
+    mode: str = PREPAY_REDUCE_TERM
@@ -1,11 +1,22 @@
 from dataclasses import dataclass
 from datetime import date
-from typing import Optional
+from typing import Optional, Union
 
-@dataclass
+def transaction_key(hash_id: Union[str, int]) -> int:
+    """
+    Chave primária inteira (64 bits com sinal) a partir do hash_id.
+    Usa os 8 primeiros bytes do md5: aceita o hex legado (32 caracteres), o hex curto
+    exposto pelo banco (16 caracteres) ou a própria chave inteira.
+    """
+    if not isinstance(hash_id, str):
+        return int(hash_id)
+    return int.from_bytes(bytes.fromhex(hash_id[:16]), "big", signed=True)
+
+@dataclass(slots=True)
 class Transaction:
     """
     Entidade núcleo do sistema. Representa qualquer movimentação financeira.
+    Usa __slots__ (sem __dict__ por instância); para lotes grandes, ver TransactionBatch.
     
     Campos:
         date (date): A data de competência ou vencimento.
@@ -15,7 +26,9 @@ class Transaction:
         source (str): A origem da informação (ex: 'Extrato BB', 'Manual', 'CSV').
         category (Optional[str]): A classificação analítica (ex: 'Moradia', 'Lazer').
         is_manual (bool): Trava de segurança. Se True, a classificação nunca será sobrescrita.
-        hash_id (Optional[str]): Assinatura única para evitar duplicatas no banco.
+        hash_id (Optional[str]): Assinatura única para evitar duplicatas no banco
+                                 (md5 hex, ou o hex curto lido do banco; a chave gravada
+                                 é `transaction_key(hash_id)`).
     """
     date: date
     description: str
@@ -35,13 +48,17 @@ class Transaction:
         """Retorna True se é uma saída não paga no passado (conceito simplificado)."""
         return self.date < date.today() and self.amount < 0
 
-    def to_dict(self) -> dict:
-        """Serializa para uso em Dataframes e Interfaces."""
+    def to_dict(self, today: Optional[date] = None) -> dict:
+        """
+        Serializa para uso em Dataframes e Interfaces.
+        Em listas, informe `today` uma vez para não consultar o relógio a cada item.
+        """
+        today = today or date.today()
         return {
             "Data": self.date,
             "Descrição": self.description,
             "Valor": self.amount,
             "Fonte": self.source,
             "Categoria": self.category,
-            "Status Tempo": "Futuro" if self.is_future else "Realizado"
+            "Status Tempo": "Futuro" if self.date > today else "Realizado"
         }
\ No newline at end of file
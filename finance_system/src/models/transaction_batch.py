@@ -0,0 +1,279 @@
+import hashlib
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+import numpy as np
+from src.models.transaction import Transaction, transaction_key
+
+HASH_WIDTH = 16  # Bytes do digest md5
+KEY_WIDTH = 8    # Bytes do digest usados na chave primária inteira (transactions.id)
+
+def md5_digests(raw_strings: Iterable[str]) -> np.ndarray:
+    """Digests md5 brutos de cada string, como matriz (n, 16) de uint8 (largura fixa)."""
+    joined = b"".join(hashlib.md5(s.encode()).digest() for s in raw_strings)
+    return np.frombuffer(joined, dtype=np.uint8).reshape(-1, HASH_WIDTH)
+
+def _signatures(dates: np.ndarray, amounts: np.ndarray, descriptions: Sequence[str]) -> List[str]:
+    """Texto base da assinatura de cada linha: Data + Valor (2 casas) + Descrição."""
+    iso = np.datetime_as_string(dates, unit="D").tolist()
+    return [f"{d}{a:.2f}{s.strip()}" for d, a, s in zip(iso, amounts.tolist(), descriptions)]
+
+def transaction_digests(
+    dates: np.ndarray,
+    amounts: np.ndarray,
+    descriptions: Sequence[str],
+    seen: Optional[Dict[str, int]] = None,
+) -> np.ndarray:
+    """
+    Assinatura de deduplicação: md5 de Data + Valor (2 casas) + Descrição (mesmo hash_id legado).
+    Linhas idênticas no mesmo lote (ex: duas compras iguais no mesmo dia) recebem índice de
+    ocorrência: a primeira mantém a assinatura legada, a k-ésima repetição usa o sufixo '#k'.
+    Reimportar o mesmo arquivo gera as mesmas assinaturas (a ordem das linhas é a mesma).
+    `seen` semeia a contagem com as ocorrências já lidas do mesmo arquivo (leitura incremental).
+    """
+    seen = dict(seen or {})
+
+    def keyed(raw: str) -> str:
+        k = seen.get(raw, 0)
+        seen[raw] = k + 1
+        return raw if k == 0 else f"{raw}#{k}"
+
+    return md5_digests(keyed(raw) for raw in _signatures(dates, amounts, descriptions))
+
+def _transaction_digest(t: Transaction) -> Optional[np.ndarray]:
+    """
+    Digest de um `Transaction` avulso. O hex legado (32 caracteres) é usado como está; com
+    apenas a chave (hex curto do banco ou inteiro), o digest é recalculado dos campos e os
+    8 primeiros bytes recebem a chave informada, que identifica a linha já gravada.
+    """
+    if t.hash_id is None:
+        return None
+    if isinstance(t.hash_id, str) and len(t.hash_id) == HASH_WIDTH * 2:
+        return np.frombuffer(bytes.fromhex(t.hash_id), dtype=np.uint8)
+    digest = transaction_digests(np.array([t.date], dtype="datetime64[D]"), np.array([t.amount]), [t.description])
+    digest = digest.ravel().copy()
+    digest[:KEY_WIDTH] = np.frombuffer(transaction_key(t.hash_id).to_bytes(KEY_WIDTH, "big", signed=True), dtype=np.uint8)
+    return digest
+
+def source_kinds(sources: Sequence[str]) -> np.ndarray:
+    """Tipo de origem (mesma leitura da tela de Classificação): 0 conta, 1 cartão, 2 contrato, 3 outros."""
+    lower = np.char.lower(np.asarray(sources, dtype=str))
+    kinds = np.full(len(lower), 3, dtype=np.int64)
+    for kind, tokens in enumerate((("csv",), ("card", "txt"), ("contrato",))):
+        for token in tokens:
+            kinds[(kinds == 3) & (np.char.find(lower, token) >= 0)] = kind
+    return kinds
+
+class TransactionBatch:
+    """
+    Lote colunar de transações (uma coluna NumPy por campo, em vez de um objeto por linha).
+    Percorre o caminho parser -> importador -> gravação sem materializar `Transaction`.
+
+    Colunas:
+        dates (datetime64[D]): Datas de competência/vencimento.
+        descriptions (ndarray[object]): Descrições legíveis.
+        amounts (float64): Valores (negativo = saída).
+        source_codes (int32) + sources (List[str]): Origem codificada em dicionário.
+        categories (ndarray[object]): Categoria ou None (pendente).
+        is_manual (bool): Trava de classificação manual.
+        hashes (uint8 [n, 16]): Digest md5 bruto, largura fixa.
+
+    A chave gravada no banco (`keys`) são os 8 primeiros bytes do digest como int64.
+    """
+
+    def __init__(
+        self,
+        dates: np.ndarray,
+        descriptions: np.ndarray,
+        amounts: np.ndarray,
+        source_codes: np.ndarray,
+        sources: List[str],
+        categories: np.ndarray,
+        is_manual: np.ndarray,
+        hashes: np.ndarray,
+    ):
+        self.dates = dates
+        self.descriptions = descriptions
+        self.amounts = amounts
+        self.source_codes = source_codes
+        self.sources = sources
+        self.categories = categories
+        self.is_manual = is_manual
+        self.hashes = hashes
+
+    # --- CONSTRUÇÃO ---
+
+    @classmethod
+    def from_columns(
+        cls,
+        dates,
+        descriptions: Sequence[str],
+        amounts,
+        source: str,
+        category: Optional[str] = None,
+        is_manual: bool = False,
+        hashes: Optional[np.ndarray] = None,
+    ) -> "TransactionBatch":
+        """Monta um lote de origem única (ex: um arquivo). Calcula os hashes se não informados."""
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        amounts = np.asarray(amounts, dtype=np.float64)
+        descriptions = np.asarray(descriptions, dtype=object)
+        n = len(dates)
+        if hashes is None:
+            hashes = transaction_digests(dates, amounts, descriptions)
+        return cls(
+            dates=dates,
+            descriptions=descriptions,
+            amounts=amounts,
+            source_codes=np.zeros(n, dtype=np.int32),
+            sources=[source],
+            categories=np.full(n, category, dtype=object),
+            is_manual=np.full(n, is_manual, dtype=bool),
+            hashes=hashes.reshape(-1, HASH_WIDTH),
+        )
+
+    @classmethod
+    def empty(cls) -> "TransactionBatch":
+        return cls.from_columns([], [], [], source="")
+
+    @classmethod
+    def from_transactions(cls, transactions: List[Transaction]) -> "TransactionBatch":
+        """Converte a lista de objetos (caminho legado) para o formato colunar."""
+        batches = [
+            cls.from_columns(
+                [t.date], [t.description], [t.amount], t.source, t.category, t.is_manual,
+                hashes=_transaction_digest(t)
+            )
+            for t in transactions
+        ]
+        return cls.concat(batches)
+
+    def continuing(self, prior: "TransactionBatch") -> "TransactionBatch":
+        """
+        Recalcula as assinaturas como continuação de `prior` (linhas já lidas do mesmo arquivo):
+        o índice de ocorrência segue a contagem do arquivo inteiro, e não só deste trecho.
+        """
+        seen: Dict[str, int] = {}
+        for raw in _signatures(prior.dates, prior.amounts, prior.descriptions):
+            seen[raw] = seen.get(raw, 0) + 1
+        hashes = transaction_digests(self.dates, self.amounts, self.descriptions, seen=seen)
+        return TransactionBatch(
+            dates=self.dates,
+            descriptions=self.descriptions,
+            amounts=self.amounts,
+            source_codes=self.source_codes,
+            sources=self.sources,
+            categories=self.categories,
+            is_manual=self.is_manual,
+            hashes=hashes,
+        )
+
+    @classmethod
+    def concat(cls, batches: List["TransactionBatch"]) -> "TransactionBatch":
+        """Concatena lotes, unificando os dicionários de origem."""
+        batches = [b for b in batches if len(b)]
+        if not batches:
+            return cls.empty()
+        if len(batches) == 1:
+            return batches[0]
+
+        index = {}
+        codes = []
+        for b in batches:
+            remap = np.array([index.setdefault(s, len(index)) for s in b.sources], dtype=np.int32)
+            codes.append(remap[b.source_codes])
+        sources = list(index)
+
+        return cls(
+            dates=np.concatenate([b.dates for b in batches]),
+            descriptions=np.concatenate([b.descriptions for b in batches]),
+            amounts=np.concatenate([b.amounts for b in batches]),
+            source_codes=np.concatenate(codes),
+            sources=sources,
+            categories=np.concatenate([b.categories for b in batches]),
+            is_manual=np.concatenate([b.is_manual for b in batches]),
+            hashes=np.concatenate([b.hashes for b in batches]),
+        )
+
+    # --- ACESSO ---
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def filter(self, mask: np.ndarray) -> "TransactionBatch":
+        """Subconjunto por máscara booleana (ou índices)."""
+        return TransactionBatch(
+            dates=self.dates[mask],
+            descriptions=self.descriptions[mask],
+            amounts=self.amounts[mask],
+            source_codes=self.source_codes[mask],
+            sources=self.sources,
+            categories=self.categories[mask],
+            is_manual=self.is_manual[mask],
+            hashes=self.hashes[mask],
+        )
+
+    @property
+    def hash_ids(self) -> List[str]:
+        """Hashes em hexadecimal (formato legado de hash_id)."""
+        hexed = self.hashes.tobytes().hex()
+        width = HASH_WIDTH * 2
+        return [hexed[i:i + width] for i in range(0, len(hexed), width)]
+
+    @property
+    def keys(self) -> np.ndarray:
+        """Chaves primárias (int64): 8 primeiros bytes do digest, big-endian com sinal."""
+        prefix = np.ascontiguousarray(self.hashes[:, :KEY_WIDTH])
+        return prefix.view(">i8").ravel().astype(np.int64)
+
+    def source_labels(self) -> np.ndarray:
+        """Origem de cada linha, decodificada do dicionário."""
+        return np.asarray(self.sources, dtype=object)[self.source_codes]
+
+    def is_future(self, today: Optional[date] = None) -> np.ndarray:
+        """Máscara de projeções futuras (data de referência avaliada uma única vez)."""
+        return self.dates > np.datetime64(today or date.today(), "D")
+
+    def is_past_due(self, today: Optional[date] = None) -> np.ndarray:
+        """Máscara de saídas no passado (conceito simplificado, como em Transaction)."""
+        return (self.dates < np.datetime64(today or date.today(), "D")) & (self.amounts < 0)
+
+    # --- CONVERSÃO ---
+
+    def to_frame(self):
+        """
+        DataFrame com as colunas do banco. Arrays numéricos são repassados sem cópia e a
+        origem vira Categorical apontando para os mesmos códigos do dicionário.
+        """
+        import pandas as pd
+
+        return pd.DataFrame({
+            "hash_id": self.hash_ids,
+            "date": self.dates,
+            "description": self.descriptions,
+            "amount": self.amounts,
+            "source": pd.Categorical.from_codes(self.source_codes, categories=self.sources, validate=False),
+            "category": self.categories,
+            "is_manual": self.is_manual,
+        }, copy=False)
+
+    def to_records(self) -> Iterator[tuple]:
+        """Tuplas na ordem de INSERT (id, date, description, amount, source, category, is_manual)."""
+        return zip(
+            self.keys.tolist(),
+            np.datetime_as_string(self.dates, unit="D").tolist(),
+            self.descriptions.tolist(),
+            self.amounts.tolist(),
+            self.source_labels().tolist(),
+            self.categories.tolist(),
+            self.is_manual.tolist(),
+        )
+
+    def to_transactions(self) -> List[Transaction]:
+        """Materializa objetos `Transaction` (caminho legado / interfaces pontuais)."""
+        return [
+            Transaction(
+                date=date.fromisoformat(d), description=desc, amount=amount, source=source,
+                category=category, is_manual=manual, hash_id=hash_id
+            )
+            for hash_id, (_, d, desc, amount, source, category, manual) in zip(self.hash_ids, self.to_records())
+        ]
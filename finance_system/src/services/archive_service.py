@@ -0,0 +1,254 @@
+import sqlite3
+from datetime import date
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Set
+from src.database.connection import db_instance
+from src.database.writer import writer
+from src.utils.profiling import profiled
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+_COLUMNS = "id, date, description, amount, source, category, is_manual"
+
+def attached_archives(conn: sqlite3.Connection) -> List[str]:
+    """Esquemas do acervo anexados nesta conexão (ex: ['archive_2021'])."""
+    return [row[1] for row in conn.execute("PRAGMA database_list") if row[1].startswith("archive_")]
+
+def archived_keys(conn: sqlite3.Connection, keys: Iterable[int]) -> Set[int]:
+    """Chaves (transactions.id) que já existem nos anos do acervo anexados à conexão."""
+    schemas = attached_archives(conn)
+    keys = list(keys)
+    found = set()
+    for schema in schemas:
+        # Lotes abaixo do limite de variáveis do SQLite
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            found.update(row[0] for row in conn.execute(
+                f"SELECT id FROM {schema}.transactions WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            ))
+    return found
+
+def archived_categories(conn: sqlite3.Connection, categories: Iterable[str]) -> Dict[int, List[str]]:
+    """
+    Anos do acervo em que alguma de `categories` aparece: {ano: [categorias]}.
+    Anexa um arquivo por vez só durante a consulta (conexão fora de transação: job exclusivo).
+    """
+    categories = list(categories)
+    marks = ",".join("?" * len(categories))
+    found = {}
+    for year, relative in conn.execute("SELECT year, path FROM archive_catalog ORDER BY year").fetchall():
+        path = db_instance.db_path.parent / relative
+        if not path.exists():
+            # ATTACH criaria um arquivo vazio e o ano pareceria não usar a categoria
+            raise sqlite3.OperationalError(f"Arquivo do acervo não encontrado: {path}")
+        conn.execute("ATTACH DATABASE ? AS cold", (str(path),))
+        try:
+            names = [row[0] for row in conn.execute(
+                f"SELECT DISTINCT category FROM cold.transactions WHERE category IN ({marks})", categories
+            )]
+        finally:
+            conn.execute("DETACH DATABASE cold")
+        if names:
+            found[int(year)] = sorted(names)
+    return found
+
+def archived_descriptions(conn: sqlite3.Connection, descriptions: Iterable[str], start, end) -> Set[str]:
+    """
+    Quais de `descriptions` aparecem no acervo fora do período [start, end].
+    Anexa um arquivo por vez (sem o limite de bancos anexados); anos contidos no período são pulados.
+    """
+    descriptions = list(descriptions)
+    found = set()
+    rows = conn.execute(
+        "SELECT year, path FROM archive_catalog WHERE NOT (min_date >= ? AND max_date <= ?) ORDER BY year",
+        (str(start), str(end))
+    ).fetchall()
+    for year, relative in rows:
+        path = db_instance.db_path.parent / relative
+        if not path.exists():
+            # ATTACH criaria um arquivo vazio e a recorrência no ano passaria despercebida
+            raise sqlite3.OperationalError(f"Arquivo do acervo não encontrado: {path}")
+        conn.execute("ATTACH DATABASE ? AS cold", (str(path),))
+        try:
+            for i in range(0, len(descriptions), 500):
+                chunk = descriptions[i:i + 500]
+                found.update(row[0] for row in conn.execute(f"""
+                    SELECT DISTINCT description FROM cold.transactions
+                    WHERE description IN ({','.join('?' * len(chunk))}) AND date NOT BETWEEN ? AND ?
+                """, [*chunk, str(start), str(end)]))
+        finally:
+            conn.execute("DETACH DATABASE cold")
+    return found
+
+class ArchiveService:
+    """
+    Acervo em camadas: anos encerrados saem do banco quente (finance_abs.db) para um arquivo
+    SQLite por ano em `archive/`, registrado em `archive_catalog`.
+    Esses arquivos quase nunca mudam, então a sincronização do Drive só move o banco quente,
+    que fica pequeno. Leituras históricas anexam o acervo via `get_connection(archive=...)`;
+    escritas vão sempre para o banco quente.
+    """
+
+    def list_archives(self) -> "pd.DataFrame":
+        """Anos arquivados com linhas, período, soma dos valores e tamanho do arquivo."""
+        import pandas as pd
+
+        conn = db_instance.get_connection()
+        try:
+            df = pd.read_sql_query('''
+                SELECT year, path, rows, min_date, max_date, total_amount, archived_at
+                FROM archive_catalog ORDER BY year
+            ''', conn)
+        finally:
+            conn.close()
+        base = db_instance.db_path.parent
+        df["size_bytes"] = [
+            (base / p).stat().st_size if (base / p).exists() else None for p in df["path"]
+        ]
+        return df
+
+    def archivable_years(self) -> "pd.DataFrame":
+        """Anos encerrados ainda no banco quente: linhas e pendências (pendências bloqueiam o arquivamento)."""
+        import pandas as pd
+
+        conn = db_instance.get_connection()
+        try:
+            return pd.read_sql_query('''
+                SELECT CAST(substr(date, 1, 4) AS INTEGER) AS year,
+                       COUNT(*) AS rows,
+                       SUM(COALESCE(category, '') = '') AS pending
+                FROM transactions
+                WHERE date < ?
+                GROUP BY year ORDER BY year
+            ''', conn, params=(f"{date.today().year}-01-01",))
+        finally:
+            conn.close()
+
+    @profiled
+    def archive_year(self, year: int, force: bool = False, vacuum: bool = True) -> dict:
+        """
+        Move as transações de `year` para archive/<banco>_<ano>.db.
+        Cópia (INSERT OR IGNORE, funde com um arquivo já existente), conferência e remoção do
+        banco quente numa única transação. `vacuum=True` compacta o banco quente em seguida
+        (é o que de fato reduz o arquivo sincronizado).
+        Anos com pendências exigem `force=True`: no acervo não há classificação.
+        Roda como job exclusivo do coordenador de escritas (ATTACH/VACUUM fora de transação).
+        """
+        year = int(year)
+        if year >= date.today().year:
+            raise ValueError("Só anos encerrados podem ser arquivados.")
+
+        start, end = f"{year}-01-01", f"{year}-12-31"
+        relative = Path(db_instance.archive_dir.name) / f"{db_instance.db_path.stem}_{year}.db"
+        path = db_instance.db_path.parent / relative
+
+        def move(conn):
+            rows, pending = conn.execute('''
+                SELECT COUNT(*), COALESCE(SUM(COALESCE(category, '') = ''), 0)
+                FROM transactions WHERE date BETWEEN ? AND ?
+            ''', (start, end)).fetchone()
+            if pending and not force:
+                raise ValueError(f"{year} ainda tem {pending} pendência(s). Classifique antes ou use force.")
+
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._init_archive_file(path)
+
+            conn.execute("ATTACH DATABASE ? AS cold", (str(path),))
+            try:
+                self._move_rows(conn, year, start, end, relative)
+            finally:
+                conn.execute("DETACH DATABASE cold")
+            if vacuum:
+                conn.execute("VACUUM")
+            return rows, pending
+
+        rows, pending = writer.run(move, exclusive=True)
+        return {"year": year, "moved": rows, "pending": pending, "path": str(path)}
+
+    def _move_rows(self, conn: sqlite3.Connection, year: int, start: str, end: str, relative: Path):
+        """Cópia para `cold`, conferência e remoção do banco quente, numa única transação."""
+        with conn:
+            conn.execute(f'''
+                INSERT OR IGNORE INTO cold.transactions ({_COLUMNS})
+                SELECT {_COLUMNS} FROM main.transactions WHERE date BETWEEN ? AND ?
+            ''', (start, end))
+            missing = conn.execute('''
+                SELECT COUNT(*) FROM main.transactions t
+                WHERE t.date BETWEEN ? AND ?
+                  AND NOT EXISTS (SELECT 1 FROM cold.transactions c WHERE c.id = t.id)
+            ''', (start, end)).fetchone()[0]
+            if missing:
+                raise sqlite3.IntegrityError(f"{missing} transação(ões) não chegaram ao acervo de {year}.")
+
+            conn.execute("DELETE FROM main.transactions WHERE date BETWEEN ? AND ?", (start, end))
+            conn.execute('''
+                INSERT OR REPLACE INTO archive_catalog (year, path, rows, min_date, max_date, total_amount)
+                SELECT ?, ?, COUNT(*), MIN(date), MAX(date), SUM(amount) FROM cold.transactions
+            ''', (year, relative.as_posix()))
+
+    @profiled
+    def restore_year(self, year: int) -> dict:
+        """
+        Traz um ano de volta ao banco quente (ex: para reclassificar) e apaga o arquivo do acervo.
+        Linhas cujas chaves já existem no banco quente não são sobrescritas; se alguma ficar de
+        fora, o arquivo é mantido ao lado com o sufixo `.restaurado` (`kept`) em vez de apagado.
+        """
+        year = int(year)
+        conn = db_instance.get_connection()
+        try:
+            row = conn.execute("SELECT path FROM archive_catalog WHERE year = ?", (year,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            raise ValueError(f"{year} não está arquivado.")
+        path = db_instance.db_path.parent / row[0]
+        if not path.exists():
+            # ATTACH criaria um arquivo vazio e o ano sairia do catálogo sem nenhuma linha
+            raise ValueError(f"Arquivo do acervo não encontrado: {path}")
+
+        def restore(conn):
+            conn.execute("ATTACH DATABASE ? AS cold", (str(path),))
+            try:
+                with conn:
+                    archived = conn.execute("SELECT COUNT(*) FROM cold.transactions").fetchone()[0]
+                    restored = conn.execute(f'''
+                        INSERT OR IGNORE INTO main.transactions ({_COLUMNS})
+                        SELECT {_COLUMNS} FROM cold.transactions
+                    ''').rowcount
+                    conn.execute("DELETE FROM archive_catalog WHERE year = ?", (year,))
+            finally:
+                conn.execute("DETACH DATABASE cold")
+            return archived, restored
+
+        archived, restored = writer.run(restore, exclusive=True)
+        kept = None
+        if restored == archived:
+            path.unlink(missing_ok=True)
+        else:
+            # Fora do nome original: um novo arquivamento do ano não funde essas linhas de volta
+            kept = path.with_name(f"{path.stem}.restaurado{path.suffix}")
+            path.replace(kept)
+            kept = str(kept)
+        return {"year": year, "restored": restored, "archived": archived, "kept": kept}
+
+    def _init_archive_file(self, path: Path):
+        """Schema do arquivo anual: mesma tabela (sem FTS/triggers) e índice de datas."""
+        conn = sqlite3.connect(path)
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS transactions (
+                    id INTEGER PRIMARY KEY,
+                    date DATE NOT NULL,
+                    description TEXT NOT NULL,
+                    amount REAL NOT NULL,
+                    source TEXT,
+                    category TEXT,
+                    is_manual BOOLEAN DEFAULT 0,
+                    hash_id TEXT GENERATED ALWAYS AS (printf('%016x', id)) VIRTUAL
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date)")
+            conn.commit()
+        finally:
+            conn.close()
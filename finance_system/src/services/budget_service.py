@@ -0,0 +1,156 @@
+import calendar
+from datetime import date
+from typing import TYPE_CHECKING, List, Optional, Tuple
+from src.database.connection import db_instance
+from src.database.writer import writer
+from src.utils.profiling import profiled
+from src.services.category_service import subtree_sql
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+ALL_MONTHS = "*"        # Orçamento padrão (vale para todos os meses sem valor específico)
+ALERT_THRESHOLD = 0.9   # Alerta a partir de 90% do orçamento consumido
+
+# Orçamento efetivo do mês: o específico, senão o padrão
+_EFFECTIVE_BUDGETS = '''
+    SELECT category, amount FROM budgets WHERE month = :month
+    UNION ALL
+    SELECT category, amount FROM budgets d
+    WHERE month = '*' AND NOT EXISTS (
+        SELECT 1 FROM budgets o WHERE o.category = d.category AND o.month = :month
+    )
+'''
+
+class BudgetService:
+    """
+    Orçado x realizado por categoria e mês.
+    O realizado vem de `budget_actuals`, mantido por triggers a cada importação,
+    reclassificação ou exclusão: consultar um mês custa uma linha por categoria orçada.
+    O orçamento de uma categoria com subcategorias cobre a subárvore inteira (Moradia inclui Aluguel).
+    """
+
+    def list_budgets(self) -> "pd.DataFrame":
+        """Orçamentos cadastrados (category, month, amount); month '*' = todos os meses."""
+        import pandas as pd
+
+        conn = db_instance.get_connection()
+        try:
+            return pd.read_sql_query(
+                "SELECT category, month, amount FROM budgets ORDER BY category, month = '*' DESC, month", conn
+            )
+        finally:
+            conn.close()
+
+    def set_budget(self, category: str, amount: float, month: Optional[str] = None):
+        """Grava o limite mensal de gastos (valor positivo) da categoria; `month` None = todos os meses."""
+        self.apply_budget_changes(upserts=[(category, month or ALL_MONTHS, amount)])
+
+    def delete_budget(self, category: str, month: Optional[str] = None):
+        self.apply_budget_changes(deleted=[(category, month or ALL_MONTHS)])
+
+    def apply_budget_changes(
+        self,
+        upserts: Optional[List[Tuple[str, str, float]]] = None,
+        deleted: Optional[List[Tuple[str, str]]] = None,
+    ) -> dict:
+        """
+        Aplica um lote de edições numa única transação:
+        upserts = [(categoria, mês ou '*', valor)], deleted = [(categoria, mês ou '*')].
+        """
+        upserts, deleted = upserts or [], deleted or []
+        rows = []
+        for category, month, amount in upserts:
+            category, month = str(category or "").strip(), str(month or ALL_MONTHS).strip()
+            if not category:
+                raise ValueError("A categoria do orçamento é obrigatória.")
+            if month != ALL_MONTHS and not _is_month(month):
+                raise ValueError(f"Mês inválido: '{month}' (use AAAA-MM ou '*').")
+            if amount is None or float(amount) < 0:
+                raise ValueError(f"Valor inválido para '{category}': informe um limite positivo.")
+            rows.append((category, month, float(amount)))
+
+        def apply(conn):
+            conn.executemany(
+                "DELETE FROM budgets WHERE category = ? AND month = ?",
+                [(c, m or ALL_MONTHS) for c, m in deleted]
+            )
+            conn.executemany("INSERT OR REPLACE INTO budgets (category, month, amount) VALUES (?, ?, ?)", rows)
+
+        writer.run(apply)
+        return {"saved": len(rows), "deleted": len(deleted)}
+
+    @profiled
+    def budget_vs_actual(self, month: Optional[str] = None, today: Optional[date] = None) -> "pd.DataFrame":
+        """
+        Confronto do mês ('AAAA-MM', padrão: mês atual) para as categorias orçadas:
+        budget, spent (saídas líquidas de estornos), remaining, used (fração consumida),
+        projected (no mês corrente: gasto no ritmo atual até o fim do mês) e status
+        ('ok', 'alerta' a partir de 90%, 'estourado' acima de 100%, 'ritmo' se a projeção estoura).
+        """
+        import pandas as pd
+
+        today = today or date.today()
+        month = month or today.strftime("%Y-%m")
+        conn = db_instance.get_connection()
+        try:
+            archived = conn.execute(
+                "SELECT 1 FROM archive_catalog WHERE year = ?", (int(month[:4]),)
+            ).fetchone() is not None
+        finally:
+            conn.close()
+
+        if archived:
+            # Ano no acervo: soma direto da view de união (o rollup cobre só o banco quente)
+            first, last = _month_bounds(month)
+            conn = db_instance.get_connection(archive=(first, last))
+            actuals = subtree_sql(f'''
+                SELECT COALESCE(category, '') AS category, SUM(amount) AS amount FROM transactions
+                WHERE date BETWEEN '{first}' AND '{last}' GROUP BY 1
+            ''')
+        else:
+            conn = db_instance.get_connection()
+            actuals = subtree_sql("SELECT category, amount FROM budget_actuals WHERE month = :month")
+        try:
+            df = pd.read_sql_query(f'''
+                SELECT b.category, b.amount AS budget, COALESCE(-a.amount, 0) AS spent
+                FROM ({_EFFECTIVE_BUDGETS}) b
+                LEFT JOIN ({actuals}) a ON a.category = b.category
+                ORDER BY b.category
+            ''', conn, params={"month": month})
+        finally:
+            conn.close()
+
+        df["spent"] = df["spent"].round(2)
+        df["remaining"] = (df["budget"] - df["spent"]).round(2)
+        df["used"] = (df["spent"] / df["budget"].where(df["budget"] > 0)).fillna(0.0)
+
+        # Mês corrente: extrapola o gasto pelo ritmo dos dias já decorridos
+        if month == today.strftime("%Y-%m"):
+            elapsed = today.day / calendar.monthrange(today.year, today.month)[1]
+            df["projected"] = (df["spent"] / elapsed).round(2)
+        else:
+            df["projected"] = df["spent"]
+
+        df["status"] = "ok"
+        df.loc[df["projected"] > df["budget"], "status"] = "ritmo"
+        df.loc[df["used"] >= ALERT_THRESHOLD, "status"] = "alerta"
+        df.loc[df["spent"] > df["budget"], "status"] = "estourado"
+        return df
+
+    @profiled
+    def alerts(self, month: Optional[str] = None, today: Optional[date] = None) -> "pd.DataFrame":
+        """Só as categorias fora do 'ok' no mês, das mais comprometidas para as menos."""
+        df = self.budget_vs_actual(month, today)
+        return df[df["status"] != "ok"].sort_values("used", ascending=False, ignore_index=True)
+
+def _is_month(value: str) -> bool:
+    try:
+        date.fromisoformat(f"{value}-01")
+    except ValueError:
+        return False
+    return len(value) == 7
+
+def _month_bounds(month: str) -> Tuple[str, str]:
+    year, mon = int(month[:4]), int(month[5:7])
+    return f"{month}-01", f"{month}-{calendar.monthrange(year, mon)[1]:02d}"
@@ -1,7 +1,33 @@
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from src.database.connection import db_instance
+from src.database.writer import writer
+from src.utils.profiling import profiled
+from src.models.transaction import transaction_key
+from src.services.category_service import merge_hierarchy
+from src.services.archive_service import archived_categories
 import re
-import pandas as pd
+
+# Maiúsculas apenas em ASCII, como o LIKE do SQLite ('é' e 'É' continuam diferentes)
+_ASCII_UPPER = str.maketrans("abcdefghijklmnopqrstuvwxyz", "ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+
+# Prévia de regra
+RECENT_ROWS = 2000     # Transações mais recentes lidas para amostra, sobreposições e frequência do termo
+OVERLAP_WINDOW = 1000  # Termo raro (poucas linhas entre as recentes): linhas atingidas buscadas pelo índice
+DENSE_SHARE = 0.05     # A partir de 5% das linhas, varrer a tabela sai mais barato que o índice
+
+def _count_like_matches(term: str, descriptions: List[Tuple[str, int]]) -> int:
+    """
+    Soma os pesos das descrições em que `description LIKE '%term%'` seria verdadeiro.
+    `descriptions` já vem em maiúsculas ASCII (_ASCII_UPPER). Busca de substring em Python;
+    termos com curingas do LIKE (% e _) viram regex.
+    """
+    needle = term.translate(_ASCII_UPPER)
+    if "%" in needle or "_" in needle:
+        regex = re.compile(".*".join(
+            ".".join(re.escape(piece) for piece in chunk.split("_")) for chunk in needle.split("%")
+        ), re.DOTALL)
+        return sum(n for desc, n in descriptions if regex.search(desc))
+    return sum(n for desc, n in descriptions if needle in desc)
 
 class CategorizerService:
     """
@@ -9,16 +35,20 @@ class CategorizerService:
     Responsável por aplicar regras de negócios para classificar transações.
     """
 
+    @profiled
     def get_pending_count(self) -> int:
         """Retorna quantas transações ainda não têm categoria."""
         conn = db_instance.get_connection()
         try:
             cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM transactions WHERE category IS NULL OR category = ''")
-            return cursor.fetchone()[0]
+            # Contador mantido por trigger (ver DatabaseConnection._init_counters)
+            cursor.execute("SELECT value FROM system_counters WHERE name = 'pending'")
+            row = cursor.fetchone()
+            return row[0] if row else 0
         finally:
             conn.close()
 
+    @profiled
     def get_pending_transactions(self):
         """Busca todas as transações pendentes para a interface."""
         conn = db_instance.get_connection()
@@ -32,54 +62,69 @@ class CategorizerService:
         finally:
             conn.close()
 
-    def run_auto_classification(self) -> int:
+    @profiled
+    def run_auto_classification(self, hash_ids: Optional[List] = None) -> int:
         """
         Aplica todas as regras conhecidas nas transações pendentes.
+        Se `hash_ids` for informado (hex ou chave inteira), restringe às transações indicadas
+        (ex: recém-importadas).
         Retorna o número de transações classificadas nesta execução.
         """
-        conn = db_instance.get_connection()
+        return writer.run(lambda conn: self._classify(conn, hash_ids))
+
+    def _classify(self, conn, hash_ids: Optional[List]) -> int:
+        """Corpo de run_auto_classification, executado na conexão do coordenador de escritas."""
         updated_count = 0
-        
-        try:
-            # Garante que a tabela de regras existe
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS classification_rules (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    match_term TEXT UNIQUE NOT NULL,
-                    target_category TEXT NOT NULL
-                )
-            ''')
 
-            # 1. Busca Regras
-            rules = conn.execute("SELECT match_term, target_category FROM classification_rules").fetchall()
-            if not rules:
+        # Garante que a tabela de regras existe
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS classification_rules (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                match_term TEXT UNIQUE NOT NULL,
+                target_category TEXT NOT NULL
+            )
+        ''')
+
+        # 1. Busca Regras
+        rules = conn.execute("SELECT match_term, target_category FROM classification_rules").fetchall()
+        if not rules:
+            return 0
+
+        scope = ""
+        if hash_ids is not None:
+            if not hash_ids:
                 return 0
+            # Escopo em tabela temporária: cada regra visita só as linhas novas (busca pela PK)
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS classification_scope (id INTEGER PRIMARY KEY)")
+            conn.execute("DELETE FROM temp.classification_scope")
+            conn.executemany(
+                "INSERT OR IGNORE INTO temp.classification_scope (id) VALUES (?)",
+                [(transaction_key(h),) for h in hash_ids]
+            )
+            scope = "AND id IN (SELECT id FROM temp.classification_scope)"
 
-            # 2. Aplica Regras (SQL LIKE)
-            # Apenas em transações que NÃO são manuais E estão sem categoria
-            for term, category in rules:
-                # O termo '%term%' busca a palavra em qualquer lugar da descrição
-                cursor = conn.execute('''
-                    UPDATE transactions 
-                    SET category = ? 
-                    WHERE description LIKE ? 
-                      AND (category IS NULL OR category = '') 
-                      AND is_manual = 0
-                ''', (category, f'%{term}%'))
-                updated_count += cursor.rowcount
-            
-            conn.commit()
-            return updated_count
-        finally:
-            conn.close()
+        # 2. Aplica Regras (SQL LIKE)
+        # Apenas em transações que NÃO são manuais E estão sem categoria
+        for term, category in rules:
+            # O termo '%term%' busca a palavra em qualquer lugar da descrição
+            cursor = conn.execute(f'''
+                UPDATE transactions 
+                SET category = ? 
+                WHERE description LIKE ? 
+                  AND (category IS NULL OR category = '') 
+                  AND is_manual = 0
+                  {scope}
+            ''', (category, f'%{term}%'))
+            updated_count += cursor.rowcount
+
+        return updated_count
 
     def create_rule(self, term: str, category: str) -> bool:
         """
         Ensina uma nova regra ao sistema.
         Ex: term='UBER', category='Transporte'
         """
-        conn = db_instance.get_connection()
-        try:
+        def save(conn):
             # Garante tabela antes de inserir
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS classification_rules (
@@ -94,32 +139,121 @@ class CategorizerService:
                 INSERT OR REPLACE INTO classification_rules (match_term, target_category)
                 VALUES (?, ?)
             ''', (term, category))
-            conn.commit()
-            
-            # Roda classificação imediatamente para aplicar o novo conhecimento
-            self.run_auto_classification()
+
+            # Roda classificação imediatamente para aplicar o novo conhecimento (mesma transação)
+            self._classify(conn, None)
+
+        try:
+            writer.run(save)
             return True
         except Exception as e:
             print(f"Erro ao criar regra: {e}")
             return False
-        finally:
-            conn.close()
 
-    def manual_update(self, hash_id: str, category: str):
+    @profiled
+    def preview_rule_impact(self, term: str, sample_size: int = 10) -> dict:
         """
-        Classificação manual pontual (Trava de Segurança).
+        Prévia do que `create_rule(term, ...)` atingiria, sem gravar nada.
+        As contagens saem de uma única agregação sobre os candidatos do índice de trigramas
+        (transactions_trgm, que confere o `LIKE '%termo%'` das regras: resultado idêntico).
+        Termos com menos de 3 caracteres não têm trigrama e termos frequentes sairiam mais caros
+        pelo índice: ambos varrem a tabela.
+
+        Retorna: total, pending (seriam classificadas agora), classified, manual,
+        by_category, sample e overlaps (regras existentes que casam as mesmas linhas;
+        elas rodam antes da nova e têm precedência nas pendentes), além de `replaces`
+        (categoria da regra de mesmo termo que seria substituída). Amostra e sobreposições
+        vêm só das linhas atingidas mais recentes (`overlap_rows` = quantas foram conferidas).
         """
+        import pandas as pd
+
+        term = term.strip()
+        pattern = f"%{term}%"
+        result = {
+            "term": term, "total": 0, "pending": 0, "classified": 0, "manual": 0, "replaces": None,
+            "by_category": pd.DataFrame(columns=["Categoria", "Linhas"]),
+            "sample": pd.DataFrame(columns=["date", "description", "amount", "category"]),
+            "overlaps": pd.DataFrame(columns=["Regra", "Categoria", "Linhas em comum"]),
+            "overlap_rows": 0,
+        }
+        if not term:
+            return result
+
         conn = db_instance.get_connection()
         try:
-            conn.execute('''
-                UPDATE transactions 
-                SET category = ?, is_manual = 1 
-                WHERE hash_id = ?
-            ''', (category, hash_id))
-            conn.commit()
+            # Linhas atingidas entre as RECENT_ROWS mais recentes (leitura limitada pelo índice de data):
+            # amostra, sobreposições e estimativa da frequência do termo
+            recent = pd.read_sql_query('''
+                SELECT id, date, description, amount, category FROM (
+                    SELECT id, date, description, amount, category FROM transactions
+                    ORDER BY date DESC, id DESC LIMIT :n
+                ) WHERE description LIKE :p
+                ORDER BY date DESC, id DESC
+            ''', conn, params={"p": pattern, "n": RECENT_ROWS})
+
+            indexed = len(term) >= 3 and len(recent) < DENSE_SHARE * RECENT_ROWS and conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'transactions_trgm'"
+            ).fetchone() is not None
+            source = (
+                "transactions_trgm JOIN transactions t ON t.id = transactions_trgm.rowid "
+                "WHERE transactions_trgm.description LIKE :p"
+            ) if indexed else "transactions t NOT INDEXED WHERE t.description LIKE :p"
+
+            # Uma passada só com contagens por categoria (nenhum texto volta para o Python)
+            groups = conn.execute(f'''
+                SELECT COALESCE(NULLIF(t.category, ''), '(Pendente)'), COUNT(*),
+                       SUM(COALESCE(t.category, '') = '' AND t.is_manual = 0),
+                       SUM(COALESCE(t.category, '') <> ''),
+                       SUM(t.is_manual = 1)
+                FROM {source} GROUP BY 1 ORDER BY 2 DESC
+            ''', {"p": pattern}).fetchall()
+            for column, key in enumerate(("total", "pending", "classified", "manual"), start=1):
+                result[key] = sum(g[column] for g in groups)
+            result["by_category"] = pd.DataFrame([g[:2] for g in groups], columns=["Categoria", "Linhas"])
+
+            if len(recent) < min(result["total"], sample_size):
+                # Termo raro entre as recentes: as mais recentes saem dos candidatos (poucos)
+                recent = pd.read_sql_query(f'''
+                    SELECT t.id, t.date, t.description, t.amount, t.category FROM {source}
+                    ORDER BY t.date DESC, t.id DESC LIMIT :n
+                ''', conn, params={"p": pattern, "n": OVERLAP_WINDOW})
+            result["sample"] = recent.drop(columns="id").head(sample_size)
+            result["overlap_rows"] = len(recent)
+
+            descs = [
+                (desc.translate(_ASCII_UPPER), n) for desc, n in recent["description"].value_counts().items()
+            ]
+            rules = conn.execute(
+                "SELECT match_term, target_category FROM classification_rules WHERE match_term <> ?", (term,)
+            ).fetchall()
+            overlaps = [
+                (rule_term, category, shared)
+                for rule_term, category in rules
+                if (shared := _count_like_matches(rule_term, descs))
+            ]
+            result["overlaps"] = pd.DataFrame(
+                sorted(overlaps, key=lambda o: -o[2]), columns=["Regra", "Categoria", "Linhas em comum"]
+            )
+
+            same = conn.execute(
+                "SELECT target_category FROM classification_rules WHERE match_term = ?", (term,)
+            ).fetchone()
+            result["replaces"] = same[0] if same else None
+            return result
         finally:
             conn.close()
+
+    def manual_update(self, hash_id: str, category: str):
+        """
+        Classificação manual pontual (Trava de Segurança).
+        """
+        writer.run(lambda conn: conn.execute('''
+            UPDATE transactions 
+            SET category = ?, is_manual = 1 
+            WHERE id = ?
+        ''', (category, transaction_key(hash_id))))
             
+    @profiled
     def get_rules(self):
         """Retorna todas as regras cadastradas."""
         conn = db_instance.get_connection()
@@ -137,12 +271,71 @@ class CategorizerService:
         finally:
             conn.close()
 
-    def delete_rule(self, match_term: str):
+    @profiled
+    def list_rules(self, text: str = "", category: Optional[str] = None, page: int = 1, page_size: int = 50):
+        """
+        Regras filtradas e paginadas no SQL (não carrega a tabela inteira na tela).
+        `text` filtra termo ou categoria (contém); retorna (DataFrame id/match_term/target_category, total).
+        """
+        import pandas as pd
+
+        where, params = [], []
+        if text.strip():
+            where.append("(match_term LIKE ? OR target_category LIKE ?)")
+            params += [f"%{text.strip()}%"] * 2
+        if category:
+            where.append("target_category = ?")
+            params.append(category)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+
         conn = db_instance.get_connection()
-        conn.execute("DELETE FROM classification_rules WHERE match_term = ?", (match_term,))
-        conn.commit()
-        conn.close()
+        try:
+            total = conn.execute(f"SELECT COUNT(*) FROM classification_rules {clause}", params).fetchone()[0]
+            rules = pd.read_sql_query(f'''
+                SELECT id, match_term, target_category FROM classification_rules {clause}
+                ORDER BY match_term
+                LIMIT ? OFFSET ?
+            ''', conn, params=params + [page_size, max(page - 1, 0) * page_size])
+            return rules, total
+        finally:
+            conn.close()
+
+    def apply_rule_changes(
+        self,
+        created: Optional[List[Tuple[str, str]]] = None,
+        updated: Optional[List[Tuple[int, str, str]]] = None,
+        deleted: Optional[List[int]] = None,
+    ) -> dict:
+        """
+        Aplica um lote de edições de regras numa única transação (tudo ou nada):
+        created = [(termo, categoria)], updated = [(id, termo, categoria)], deleted = [id].
+        Termo repetido em `updated` gera sqlite3.IntegrityError e nada é gravado.
+        Depois do lote, as pendências são reclassificadas uma única vez.
+        """
+        created, updated, deleted = created or [], updated or [], deleted or []
+        for term, category in created + [(t, c) for _, t, c in updated]:
+            if not str(term or "").strip() or not str(category or "").strip():
+                raise ValueError("Termo e categoria são obrigatórios em todas as regras.")
 
+        def apply(conn):
+            conn.executemany("DELETE FROM classification_rules WHERE id = ?", [(i,) for i in deleted])
+            conn.executemany(
+                "UPDATE classification_rules SET match_term = ?, target_category = ? WHERE id = ?",
+                [(t.strip(), c.strip(), i) for i, t, c in updated]
+            )
+            conn.executemany('''
+                INSERT OR REPLACE INTO classification_rules (match_term, target_category)
+                VALUES (?, ?)
+            ''', [(t.strip(), c.strip()) for t, c in created])
+            return self._classify(conn, None) if created or updated else 0
+
+        classified = writer.run(apply)
+        return {"created": len(created), "updated": len(updated), "deleted": len(deleted), "classified": classified}
+
+    def delete_rule(self, match_term: str):
+        writer.run(lambda conn: conn.execute("DELETE FROM classification_rules WHERE match_term = ?", (match_term,)))
+
+    @profiled
     def get_unique_categories(self):
         """
         Retorna uma lista única de todas as categorias já utilizadas no sistema.
@@ -162,7 +355,92 @@ class CategorizerService:
             return pd.read_sql_query(query, conn)
         finally:
             conn.close()
-    
+
+    @profiled
+    def get_category_usage(self):
+        """Categorias em uso com a quantidade de transações e de regras de cada uma."""
+        conn = db_instance.get_connection()
+        try:
+            import pandas as pd
+            return pd.read_sql_query('''
+                SELECT Categoria, SUM(tx) AS Transações, SUM(rules) AS Regras
+                FROM (
+                    SELECT category AS Categoria, COUNT(*) AS tx, 0 AS rules
+                    FROM transactions WHERE COALESCE(category, '') <> '' GROUP BY category
+                    UNION ALL
+                    SELECT target_category, 0, COUNT(*) FROM classification_rules GROUP BY target_category
+                )
+                GROUP BY Categoria
+                ORDER BY Categoria
+            ''', conn)
+        finally:
+            conn.close()
+
+    def merge_categories(self, sources: List[str], target: str) -> dict:
+        """
+        Une as categorias `sources` em `target` (transações, regras, orçamentos e hierarquia)
+        numa única transação, com um UPDATE por tabela em vez de uma chamada por linha.
+        Contadores, diário de classificação e realizado mensal são atualizados pelos triggers;
+        os orçamentos das origens são somados ao do destino e as subcategorias delas passam
+        para o destino.
+        O acervo é somente leitura: se alguma origem aparece em anos arquivados, nada é alterado
+        (ValueError) e esses anos precisam ser restaurados antes; senão tendências e orçamentos
+        dividiriam a mesma categoria em duas séries.
+        Retorna {'transactions': n, 'rules': n, 'budgets': n}.
+        """
+        target = target.strip()
+        sources = [s for s in dict.fromkeys(sources) if s and s != target]
+        if not target:
+            raise ValueError("A categoria de destino não pode ser vazia.")
+        if not sources:
+            return {"transactions": 0, "rules": 0, "budgets": 0}
+
+        placeholders = ",".join("?" * len(sources))
+
+        def merge(conn):
+            archived = archived_categories(conn, sources)
+            if archived:
+                used = ", ".join(f"{year} ({', '.join(names)})" for year, names in archived.items())
+                raise ValueError(
+                    f"Categoria usada em anos arquivados: {used}. O acervo não é alterado; "
+                    "restaure esses anos antes de renomear ou unir, para o histórico não ficar dividido."
+                )
+            with conn:
+                return apply(conn)
+
+        def apply(conn):
+            merge_hierarchy(conn, sources, target)
+            tx = conn.execute(
+                f"UPDATE transactions SET category = ? WHERE category IN ({placeholders})",
+                [target] + sources
+            ).rowcount
+            rules = conn.execute(
+                f"UPDATE classification_rules SET target_category = ? WHERE target_category IN ({placeholders})",
+                [target] + sources
+            ).rowcount
+            # Orçamento unido = soma dos orçamentos efetivos (específico do mês, senão o padrão)
+            # de cada categoria, para o padrão '*' e para cada mês com valor específico
+            every = ",".join("?" * (len(sources) + 1))
+            budgets = conn.execute(f'''
+                INSERT OR REPLACE INTO budgets (category, month, amount)
+                SELECT ?, m.month, SUM(COALESCE(o.amount, d.amount, 0))
+                FROM (SELECT DISTINCT month FROM budgets WHERE category IN ({every})) m
+                CROSS JOIN (SELECT DISTINCT category FROM budgets WHERE category IN ({every})) c
+                LEFT JOIN budgets o ON o.category = c.category AND o.month = m.month
+                LEFT JOIN budgets d ON d.category = c.category AND d.month = '*'
+                GROUP BY m.month
+            ''', [target] + [target] + sources + [target] + sources).rowcount
+            conn.execute(f"DELETE FROM budgets WHERE category IN ({placeholders})", sources)
+            return {"transactions": tx, "rules": rules, "budgets": budgets}
+
+        # Exclusivo: a conferência do acervo usa ATTACH, que não roda dentro de transação
+        return writer.run(merge, exclusive=True)
+
+    def rename_category(self, old: str, new: str) -> dict:
+        """Renomeia uma categoria (se `new` já existir, equivale a unir; mesmas regras de merge_categories)."""
+        return self.merge_categories([old], new)
+
+    @profiled
     def detect_installment(self, description: str) -> tuple:
         """
         Tenta identificar padrão de parcelamento.
@@ -192,31 +470,26 @@ class CategorizerService:
         """
         Unifica valor, altera descrição E JÁ APLICA A CATEGORIA (Atomic Update).
         """
-        conn = db_instance.get_connection()
-        try:
-            full_value = amount * total_parc
-            new_desc = f"{clean_desc} (Total {total_parc}x)"
-            
-            # Se a categoria foi informada, já atualiza ela junto
-            # Se não, mantém NULL (caso antigo)
-            sql = '''
-                UPDATE transactions 
-                SET amount = ?, description = ?, is_manual = 1
-            '''
-            params = [full_value, new_desc]
-            
-            if category:
-                sql += ", category = ?"
-                params.append(category)
-                
-            sql += " WHERE hash_id = ?"
-            params.append(hash_id)
-            
-            conn.execute(sql, params)
-            conn.commit()
-            return True, full_value, new_desc
-        finally:
-            conn.close()
+        full_value = amount * total_parc
+        new_desc = f"{clean_desc} (Total {total_parc}x)"
+        
+        # Se a categoria foi informada, já atualiza ela junto
+        # Se não, mantém NULL (caso antigo)
+        sql = '''
+            UPDATE transactions 
+            SET amount = ?, description = ?, is_manual = 1
+        '''
+        params = [full_value, new_desc]
+        
+        if category:
+            sql += ", category = ?"
+            params.append(category)
+        
+        sql += " WHERE id = ?"
+        params.append(transaction_key(hash_id))
+        
+        writer.run(lambda conn: conn.execute(sql, params))
+        return True, full_value, new_desc
 
     def unify_installments_batch(df):
         """
@@ -231,6 +504,8 @@ class CategorizerService:
         para evitar duplicidade.
         """
         
+        import pandas as pd
+
         # 1. Preparação: Extração segura de dados de parcelamento
         # Regex captura padrões como "01/10", "1/10", "01 / 10"
         regex_pattern = r'(\d{1,2})\s*/\s*(\d{1,2})'
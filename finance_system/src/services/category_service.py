@@ -0,0 +1,224 @@
+import sqlite3
+from typing import TYPE_CHECKING, Iterable, List, Optional
+from src.database.connection import db_instance
+from src.database.writer import writer
+from src.utils.profiling import profiled
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+PATH_SEPARATOR = " > "
+
+def subtree_sql(source: str) -> str:
+    """
+    Rollup por subárvore sobre `source` (subconsulta com colunas category e amount): uma linha
+    por categoria com a soma dela e de todas as descendentes, num único join pela tabela de
+    fechamento. Categorias fora da hierarquia contam só para si mesmas.
+    """
+    return f'''
+        SELECT COALESCE(anc.name, s.category) AS category, SUM(s.amount) AS amount
+        FROM ({source}) s
+        LEFT JOIN categories d ON d.name = s.category
+        LEFT JOIN category_closure cc ON cc.descendant = d.id
+        LEFT JOIN categories anc ON anc.id = cc.ancestor
+        GROUP BY 1
+    '''
+
+class CategoryService:
+    """
+    Hierarquia de categorias (ex: Moradia > Aluguel, Condomínio, Energia).
+    As transações continuam guardando o nome da categoria; a árvore fica em `categories` e
+    `category_closure` (pares ancestral -> descendente mantidos por triggers), então totais
+    de subárvore são um join, e não buscas por texto.
+    """
+
+    @profiled
+    def tree(self) -> "pd.DataFrame":
+        """
+        Árvore em pré-ordem (pais antes dos filhos, irmãos em ordem alfabética):
+        id, name, parent, depth, children (filhos diretos) e path ('Moradia > Aluguel').
+        """
+        import pandas as pd
+
+        conn = db_instance.get_connection()
+        try:
+            df = pd.read_sql_query('''
+                SELECT c.id, c.name, p.name AS parent,
+                       (SELECT MAX(depth) FROM category_closure WHERE descendant = c.id) AS depth,
+                       (SELECT COUNT(*) FROM categories k WHERE k.parent_id = c.id) AS children
+                FROM categories c
+                LEFT JOIN categories p ON p.id = c.parent_id
+            ''', conn)
+        finally:
+            conn.close()
+        return _preorder(df)
+
+    def closure(self) -> "pd.DataFrame":
+        """Pares (ancestor, descendant, depth) por nome, incluindo cada categoria com ela mesma."""
+        import pandas as pd
+
+        conn = db_instance.get_connection()
+        try:
+            return pd.read_sql_query('''
+                SELECT a.name AS ancestor, d.name AS descendant, cc.depth
+                FROM category_closure cc
+                JOIN categories a ON a.id = cc.ancestor
+                JOIN categories d ON d.id = cc.descendant
+            ''', conn)
+        finally:
+            conn.close()
+
+    def descendants(self, name: str, include_self: bool = True) -> List[str]:
+        """Nomes da subárvore de `name` (a própria categoria, se fora da hierarquia)."""
+        conn = db_instance.get_connection()
+        try:
+            rows = conn.execute('''
+                SELECT d.name FROM categories a
+                JOIN category_closure cc ON cc.ancestor = a.id
+                JOIN categories d ON d.id = cc.descendant
+                WHERE a.name = ? AND cc.depth >= ?
+                ORDER BY cc.depth, d.name
+            ''', (name, 0 if include_self else 1)).fetchall()
+        finally:
+            conn.close()
+        if not rows and include_self:
+            return [name]
+        return [r[0] for r in rows]
+
+    @profiled
+    def rollup(self, totals: "pd.Series") -> "pd.DataFrame":
+        """
+        Soma valores por categoria (`totals`: índice = nome) na árvore, sem nova consulta às
+        transações: colunas da árvore + own (valor da própria categoria) e total (subárvore).
+        Categorias fora da hierarquia entram como raízes.
+        """
+        import pandas as pd
+
+        tree = self.tree()
+        totals = totals.groupby(level=0).sum()
+        missing = totals.index.difference(tree["name"])
+        if len(missing):
+            extra = pd.DataFrame({"id": None, "name": missing, "parent": None, "depth": 0, "children": 0})
+            tree = _preorder(pd.concat([tree.drop(columns="path"), extra], ignore_index=True))
+
+        pairs = self.closure()
+        pairs = pd.concat([pairs, pd.DataFrame({"ancestor": missing, "descendant": missing, "depth": 0})])
+        sums = (pairs.merge(totals.rename("amount"), left_on="descendant", right_index=True)
+                .groupby("ancestor")["amount"].sum())
+        tree["own"] = tree["name"].map(totals).fillna(0.0)
+        tree["total"] = tree["name"].map(sums).fillna(0.0)
+        return tree
+
+    @profiled
+    def subtree_totals(self, start_month: Optional[str] = None, end_month: Optional[str] = None) -> "pd.DataFrame":
+        """
+        Totais (category, amount) de cada categoria com suas descendentes nos meses
+        'AAAA-MM' do intervalo, lidos do realizado mensal (banco quente).
+        """
+        import pandas as pd
+
+        conn = db_instance.get_connection()
+        try:
+            return pd.read_sql_query(subtree_sql('''
+                SELECT category, amount FROM budget_actuals
+                WHERE month BETWEEN :start AND :end
+            '''), conn, params={"start": start_month or "0000-00", "end": end_month or "9999-99"})
+        finally:
+            conn.close()
+
+    def create_category(self, name: str, parent: Optional[str] = None):
+        """Cria a categoria (sem transações ainda) como raiz ou dentro de `parent`."""
+        name = (name or "").strip()
+        if not name:
+            raise ValueError("O nome da categoria não pode ser vazio.")
+
+        def create(conn):
+            if conn.execute("SELECT 1 FROM categories WHERE name = ?", (name,)).fetchone():
+                raise ValueError(f"A categoria '{name}' já existe.")
+            conn.execute(
+                "INSERT INTO categories (name, parent_id) VALUES (?, ?)", (name, _node_id(conn, parent))
+            )
+
+        writer.run(create)
+
+    def move_category(self, name: str, parent: Optional[str] = None):
+        """Coloca `name` (com toda a subárvore) dentro de `parent`; None = raiz."""
+        if not (name or "").strip():
+            raise ValueError("Escolha a categoria.")
+
+        def move(conn):
+            node = _node_id(conn, name)
+            parent_id = _node_id(conn, parent)
+            if parent_id is not None and conn.execute(
+                "SELECT 1 FROM category_closure WHERE ancestor = ? AND descendant = ?", (node, parent_id)
+            ).fetchone():
+                raise ValueError(f"'{parent}' está dentro de '{name}': mover criaria um ciclo.")
+            conn.execute("UPDATE categories SET parent_id = ? WHERE id = ?", (parent_id, node))
+
+        writer.run(move)
+
+    @staticmethod
+    def visible(tree: "pd.DataFrame", expanded: Iterable[str]) -> "pd.Series":
+        """Máscara das linhas visíveis: raízes e filhos de nós expandidos (com o caminho todo aberto)."""
+        expanded = set(expanded)
+        shown = {}
+        for name, parent in zip(tree["name"], tree["parent"]):
+            shown[name] = not isinstance(parent, str) or (shown.get(parent, False) and parent in expanded)
+        return tree["name"].map(shown).astype(bool)
+
+def merge_hierarchy(conn: sqlite3.Connection, sources: List[str], target: str):
+    """
+    Une os nós `sources` em `target` (dentro de um job de escrita): o destino novo herda o pai
+    da primeira origem, os filhos das origens passam para o destino e as origens saem da árvore.
+    """
+    placeholders = ",".join("?" * len(sources))
+    ids = dict(conn.execute(f"SELECT name, id FROM categories WHERE name IN ({placeholders})", sources))
+    source_ids = [ids[s] for s in sources if s in ids]
+    if not source_ids:
+        return
+    target_row = conn.execute("SELECT id FROM categories WHERE name = ?", (target,)).fetchone()
+    if target_row is not None:
+        target_id = target_row[0]
+    else:
+        target_id = conn.execute(
+            "INSERT INTO categories (name, parent_id) SELECT ?, parent_id FROM categories WHERE id = ?",
+            (target, source_ids[0])
+        ).lastrowid
+
+    marks = ",".join("?" * len(source_ids))
+    # Destino dentro de uma origem: sobe para o lugar da origem mais externa que o contém
+    outer = conn.execute(f'''
+        SELECT c.parent_id FROM category_closure cc JOIN categories c ON c.id = cc.ancestor
+        WHERE cc.descendant = ? AND cc.ancestor IN ({marks})
+        ORDER BY cc.depth DESC LIMIT 1
+    ''', [target_id] + source_ids).fetchone()
+    if outer is not None:
+        conn.execute("UPDATE categories SET parent_id = ? WHERE id = ?", (outer[0], target_id))
+    conn.execute(
+        f"UPDATE categories SET parent_id = ? WHERE parent_id IN ({marks}) AND id <> ? AND id NOT IN ({marks})",
+        [target_id] + source_ids + [target_id] + source_ids
+    )
+    conn.execute(f"DELETE FROM categories WHERE id IN ({marks})", source_ids)
+
+def _node_id(conn: sqlite3.Connection, name: Optional[str]) -> Optional[int]:
+    """Id do nó `name` (criado como raiz se a categoria ainda não estiver na árvore); None = raiz."""
+    name = (name or "").strip()
+    if not name:
+        return None
+    conn.execute("INSERT OR IGNORE INTO categories (name) VALUES (?)", (name,))
+    return conn.execute("SELECT id FROM categories WHERE name = ?", (name,)).fetchone()[0]
+
+def _preorder(df: "pd.DataFrame") -> "pd.DataFrame":
+    """Ordena a árvore em pré-ordem e calcula o caminho completo de cada nó."""
+    parents = dict(zip(df["name"], df["parent"]))
+    paths = {}
+
+    def path(name):
+        if name not in paths:
+            parent = parents.get(name)
+            paths[name] = path(parent) + [name] if isinstance(parent, str) else [name]
+        return paths[name]
+
+    keys = [tuple(p.casefold() for p in path(n)) for n in df["name"]]
+    df = df.assign(path=[PATH_SEPARATOR.join(path(n)) for n in df["name"]], _key=keys)
+    return df.sort_values("_key").drop(columns="_key").reset_index(drop=True)
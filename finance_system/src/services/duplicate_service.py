@@ -0,0 +1,159 @@
+from datetime import date
+from typing import TYPE_CHECKING, Optional, Set
+import numpy as np
+from src.database.connection import db_instance
+from src.database.writer import writer
+from src.utils.profiling import profiled
+from src.models.transaction_batch import source_kinds
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+CATEGORY_IGNORE = "⛔ IGNORADO"  # Mesma constante das telas de Classificação e Dashboard
+
+# Maiúsculas apenas em ASCII; dígitos descartados (horários, parcelas e códigos variam entre extratos)
+_NORMALIZE = str.maketrans("abcdefghijklmnopqrstuvwxyz0123456789", "ABCDEFGHIJKLMNOPQRSTUVWXYZ" + " " * 10)
+
+def _trigrams(text: str) -> Set[str]:
+    normalized = " ".join(str(text).translate(_NORMALIZE).split())
+    padded = f" {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def description_similarity(a: str, b: str) -> float:
+    """
+    Sobreposição de trigramas (|A ∩ B| / min(|A|, |B|)), de 0 a 1.
+    Usa o menor conjunto como base: 'BONNAPAN' contra 'BONNAPAN BRASILIA BR' pontua alto.
+    """
+    ta, tb = _trigrams(a), _trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / min(len(ta), len(tb))
+
+class DuplicateService:
+    """
+    Detecção de quase-duplicatas entre contas (ex: compra no cartão que aparece na fatura TXT
+    e no extrato CSV com descrição diferente e data deslocada).
+    Ordena por (valor em centavos, data) e varre uma janela de dias: O(n log n) + pares candidatos.
+    """
+
+    @profiled
+    def find_candidates(
+        self,
+        window_days: int = 2,
+        min_similarity: float = 0.3,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        cross_source: bool = True,
+    ) -> "pd.DataFrame":
+        """
+        Pares (a, b) com o mesmo valor e datas a até `window_days` dias, pontuados pela
+        similaridade das descrições e pela distância em dias.
+        `cross_source=True` só compara tipos de origem diferentes (conta x cartão), pois
+        repetições na mesma origem são mantidas pelo índice de ocorrência do hash.
+        Pares já revisados (duplicate_links) e linhas ignoradas ficam de fora.
+        """
+        import pandas as pd
+
+        where, params = ["COALESCE(category, '') <> ?"], [CATEGORY_IGNORE]
+        if start_date:
+            where.append("date >= ?")
+            params.append(str(start_date))
+        if end_date:
+            where.append("date <= ?")
+            params.append(str(end_date))
+
+        conn = db_instance.get_connection()
+        try:
+            rows = pd.read_sql_query(f'''
+                SELECT id, date, description, amount, source FROM transactions
+                WHERE {' AND '.join(where)}
+            ''', conn, params=params)
+            reviewed = set(conn.execute("SELECT id_a, id_b FROM duplicate_links").fetchall())
+        finally:
+            conn.close()
+
+        columns = [
+            "id_a", "id_b", "date_a", "date_b", "description_a", "description_b",
+            "amount", "source_a", "source_b", "days_apart", "similarity", "score",
+        ]
+        if len(rows) < 2:
+            return pd.DataFrame(columns=columns)
+
+        # 1. Ordenação por (centavos, dia)
+        cents = np.round(rows["amount"].to_numpy() * 100).astype(np.int64)
+        days = pd.to_datetime(rows["date"]).to_numpy().astype("datetime64[D]").astype(np.int64)
+        order = np.lexsort((days, cents))
+        c, d = cents[order], days[order]
+
+        # 2. Varredura: compara cada linha com a j-ésima seguinte enquanto o valor for igual e a
+        # distância couber na janela (ordenado, a primeira falha encerra a linha)
+        left, right = [], []
+        active = np.arange(len(order) - 1)
+        step = 1
+        while len(active):
+            nxt = active + step
+            inside = nxt < len(order)
+            active, nxt = active[inside], nxt[inside]
+            ok = (c[nxt] == c[active]) & (d[nxt] - d[active] <= window_days)
+            active, nxt = active[ok], nxt[ok]
+            left.append(order[active])
+            right.append(order[nxt])
+            step += 1
+
+        a_idx = np.concatenate(left) if left else np.zeros(0, np.int64)
+        b_idx = np.concatenate(right) if right else np.zeros(0, np.int64)
+        if cross_source:
+            kinds = source_kinds(rows["source"].tolist())
+            keep = kinds[a_idx] != kinds[b_idx]
+            a_idx, b_idx = a_idx[keep], b_idx[keep]
+
+        if not len(a_idx):
+            return pd.DataFrame(columns=columns)
+
+        # 3. Pontuação só dos pares candidatos
+        a_rows = rows.iloc[a_idx].reset_index(drop=True)
+        b_rows = rows.iloc[b_idx].reset_index(drop=True)
+        pairs = pd.DataFrame({
+            "id_a": a_rows["id"], "id_b": b_rows["id"],
+            "date_a": a_rows["date"], "date_b": b_rows["date"],
+            "description_a": a_rows["description"], "description_b": b_rows["description"],
+            "amount": a_rows["amount"],
+            "source_a": a_rows["source"], "source_b": b_rows["source"],
+            "days_apart": np.abs(days[b_idx] - days[a_idx]),
+        })
+        pending = np.fromiter(
+            ((a, b) not in reviewed and (b, a) not in reviewed for a, b in zip(pairs["id_a"], pairs["id_b"])),
+            bool, len(pairs)
+        )
+        pairs = pairs.loc[pending]
+        similarity = np.fromiter(
+            (description_similarity(a, b) for a, b in zip(pairs["description_a"], pairs["description_b"])),
+            float, len(pairs)
+        )
+        pairs = pairs.assign(
+            similarity=similarity,
+            score=0.6 * similarity + 0.4 * (1 - pairs["days_apart"].to_numpy() / (window_days + 1)),
+        )
+        pairs = pairs.loc[pairs["similarity"].to_numpy() >= min_similarity]
+        return pairs.sort_values("score", ascending=False, ignore_index=True)[columns]
+
+    def confirm(self, keep_id: int, drop_id: int, score: Optional[float] = None):
+        """Registra o par como duplicata e ignora a cópia (`drop_id`) com trava manual."""
+        def confirm(conn):
+            conn.execute('''
+                INSERT OR REPLACE INTO duplicate_links (id_a, id_b, status, score)
+                VALUES (?, ?, 'confirmed', ?)
+            ''', (keep_id, drop_id, score))
+            conn.execute(
+                "UPDATE transactions SET category = ?, is_manual = 1 WHERE id = ?",
+                (CATEGORY_IGNORE, drop_id)
+            )
+
+        writer.run(confirm)
+
+    def dismiss(self, id_a: int, id_b: int, score: Optional[float] = None):
+        """Marca o par como falso positivo (não volta a ser sugerido)."""
+        writer.run(lambda conn: conn.execute('''
+            INSERT OR REPLACE INTO duplicate_links (id_a, id_b, status, score)
+            VALUES (?, ?, 'dismissed', ?)
+        ''', (id_a, id_b, score)))
@@ -0,0 +1,284 @@
+import importlib.util
+import json
+import logging
+import os
+import shutil
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional
+from src.database.connection import db_instance
+from src.database.instrumentation import connect
+from src.utils.profiling import profiled
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = Path("data") / "exports"  # Local (fora do Drive): os arquivos são regeneráveis
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Ordem de preferência. feather (Arrow IPC sem compressão) é lido por memory-map sem cópia;
+# parquet é menor e lido por qualquer ferramenta; npy (uma matriz por coluna) não depende do pyarrow.
+FORMATS = ("feather", "parquet", "npy")
+EXPORT_COLUMNS = ["id", "date", "description", "amount", "source", "category", "is_manual"]
+
+def available_formats() -> List[str]:
+    """Formatos utilizáveis neste ambiente (feather/parquet exigem pyarrow)."""
+    if importlib.util.find_spec("pyarrow") is None:
+        return ["npy"]
+    return list(FORMATS)
+
+class ExportService:
+    """
+    Exportação colunar das transações, particionada por mês (data/exports/<banco>/AAAA-MM.*).
+
+    Cada mês tem uma versão em `partition_versions`, incrementada por triggers a cada
+    INSERT/UPDATE/DELETE. O manifest guarda a versão e as linhas exportadas de cada partição;
+    a exportação incremental só reescreve os meses em que algo mudou. Inclui o acervo, lido
+    um arquivo anual por vez (sem o limite de bancos anexados do SQLite).
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root) if root else EXPORT_DIR / db_instance.db_path.stem
+
+    # --- MANIFEST ---
+
+    def manifest(self) -> Optional[dict]:
+        """Manifest da última exportação (None se nunca exportado ou de outro banco)."""
+        path = self.root / MANIFEST_NAME
+        if not path.exists():
+            return None
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Manifest ilegível em {path} ({e}). Será regerado.")
+            return None
+        if data.get("manifest_version") != MANIFEST_VERSION or data.get("db") != str(db_instance.db_path):
+            return None
+        return data
+
+    def _write_manifest(self, data: dict):
+        """Grava o manifest de forma atômica (leitores nunca veem um arquivo pela metade)."""
+        tmp = self.root / f"{MANIFEST_NAME}.tmp"
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp, self.root / MANIFEST_NAME)
+
+    def stale_months(self, start=None, end=None) -> List[str]:
+        """
+        Meses do período cuja versão no banco difere da exportada (ou ainda não exportados).
+        Consulta só `partition_versions` (uma linha por mês): barato para checar a cada rerun.
+        """
+        manifest = self.manifest()
+        seen = manifest["versions"] if manifest else {}
+        where, params = [], []
+        if start is not None:
+            where.append("month >= ?")
+            params.append(str(start)[:7])
+        if end is not None:
+            where.append("month <= ?")
+            params.append(str(end)[:7])
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+
+        conn = db_instance.get_connection()
+        try:
+            versions = conn.execute(f"SELECT month, version FROM partition_versions {clause}", params).fetchall()
+        finally:
+            conn.close()
+        return sorted(month for month, version in versions if seen.get(month) != version)
+
+    # --- EXPORTAÇÃO ---
+
+    @profiled
+    def export(self, fmt: Optional[str] = None, full: bool = False) -> dict:
+        """
+        Exporta os meses alterados desde a última exportação (`full=True` reescreve tudo).
+        `fmt` None mantém o formato anterior ou usa o primeiro disponível; trocar de formato
+        reescreve todas as partições. O banco quente é lido numa única transação (fotografia
+        consistente); os arquivos do acervo só mudam em jobs exclusivos de arquivar/restaurar.
+        """
+        import pandas as pd
+
+        formats = available_formats()
+        manifest = self.manifest()
+        fmt = fmt or (manifest["format"] if manifest and manifest["format"] in formats else formats[0])
+        if fmt not in formats:
+            raise ValueError(f"Formato '{fmt}' indisponível (instale pyarrow). Disponíveis: {', '.join(formats)}.")
+        if manifest is None or manifest["format"] != fmt:
+            full = True
+        exported: Dict[str, dict] = {} if full else dict(manifest["partitions"])
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        conn = db_instance.get_connection()
+        archives: List[sqlite3.Connection] = []
+        cold: Dict[str, sqlite3.Connection] = {}  # Mês -> conexão do arquivo anual que o contém
+        try:
+            conn.execute("BEGIN")
+            versions = dict(conn.execute("SELECT month, version FROM partition_versions"))
+            hot = dict(conn.execute("SELECT substr(date, 1, 7), COUNT(*) FROM main.transactions GROUP BY 1"))
+            counts = dict(hot)
+            # Acervo: cada ano num arquivo próprio, aberto somente leitura (meses sem versão registrada
+            # são detectados pela contagem de linhas)
+            for year, relative in conn.execute("SELECT year, path FROM archive_catalog ORDER BY year").fetchall():
+                path = db_instance.db_path.parent / relative
+                if not path.exists():
+                    raise sqlite3.OperationalError(f"Arquivo do acervo não encontrado: {path}")
+                archive = connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+                archives.append(archive)
+                for month, rows in archive.execute("SELECT substr(date, 1, 7), COUNT(*) FROM transactions GROUP BY 1"):
+                    counts[month] = counts.get(month, 0) + rows
+                    cold[month] = archive
+
+            written = []
+            for month, rows in sorted(counts.items()):
+                version = versions.get(month, 0)
+                previous = exported.get(month)
+                if previous and previous["version"] == version and previous["rows"] == rows:
+                    continue
+                sources = ([conn] if month in hot else []) + ([cold[month]] if month in cold else [])
+                df = pd.concat([self._read_month(source, month) for source in sources], ignore_index=True)
+                if len(sources) > 1:
+                    df = df.sort_values(["date", "id"], ignore_index=True)
+                exported[month] = {
+                    "file": self._write_partition(df, month, fmt),
+                    "version": version,
+                    "rows": len(df),
+                    "amount": round(float(df["amount"].sum()), 2),
+                }
+                written.append(month)
+        finally:
+            for archive in archives:
+                archive.close()
+            conn.rollback()
+            conn.close()
+
+        removed = sorted(set(exported) - set(counts))
+        for month in removed:
+            self._remove(exported.pop(month)["file"])
+        if manifest and manifest["format"] != fmt:
+            for entry in manifest["partitions"].values():
+                self._remove(entry["file"])
+
+        self._write_manifest({
+            "manifest_version": MANIFEST_VERSION,
+            "db": str(db_instance.db_path),
+            "format": fmt,
+            "columns": EXPORT_COLUMNS,
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+            "partitions": dict(sorted(exported.items())),
+            # Versões lidas nesta exportação (inclusive de meses que ficaram vazios)
+            "versions": versions,
+        })
+        return {
+            "format": fmt,
+            "path": str(self.root),
+            "partitions": len(exported),
+            "written": written,
+            "removed": removed,
+            "rows": sum(e["rows"] for e in exported.values()),
+        }
+
+    @staticmethod
+    def _read_month(conn: sqlite3.Connection, month: str) -> "pd.DataFrame":
+        """Linhas de um mês (AAAA-MM) da tabela `transactions` da conexão, ordenadas por data e id."""
+        import pandas as pd
+
+        return pd.read_sql_query(f'''
+            SELECT {", ".join(EXPORT_COLUMNS)} FROM transactions
+            WHERE date BETWEEN ? AND ? ORDER BY date, id
+        ''', conn, params=(f"{month}-01", f"{month}-31"))
+
+    def _write_partition(self, df: "pd.DataFrame", month: str, fmt: str) -> str:
+        """Grava um mês num arquivo temporário e o troca pelo anterior. Retorna o nome relativo."""
+        import numpy as np
+        import pandas as pd
+
+        df = df.assign(
+            date=pd.to_datetime(df["date"]).astype("datetime64[ms]"),
+            source=df["source"].fillna(""),
+            category=df["category"].fillna(""),
+            is_manual=df["is_manual"].fillna(0).astype(bool),
+        )
+        name = f"{month}.{fmt}"
+        target, tmp = self.root / name, self.root / f"{name}.tmp"
+        self._remove(tmp.name)
+
+        if fmt == "feather":
+            import pyarrow.feather as feather
+            # Sem compressão: a leitura com memory_map usa as páginas do arquivo direto
+            feather.write_feather(df, tmp, compression="uncompressed")
+        elif fmt == "parquet":
+            df.to_parquet(tmp, index=False)
+        else:
+            # Uma .npy por coluna; texto em largura fixa (dtype 'U') para permitir mmap
+            tmp.mkdir()
+            for column in EXPORT_COLUMNS:
+                values = df[column].to_numpy()
+                if values.dtype == object:
+                    values = values.astype(str)
+                np.save(tmp / f"{column}.npy", values)
+
+        self._remove(name)
+        os.replace(tmp, target)
+        return name
+
+    def _remove(self, name: str):
+        path = self.root / name
+        if path.is_dir():
+            shutil.rmtree(path)
+        else:
+            path.unlink(missing_ok=True)
+
+    # --- LEITURA ---
+
+    @profiled
+    def load_snapshot(self, start=None, end=None, columns: Optional[List[str]] = None) -> "pd.DataFrame":
+        """
+        Lê as partições do período por memory-map (sem consultar o banco).
+        `date` volta como datetime64; as demais colunas com os tipos exportados.
+        Não confere a validade: ver `stale_months`.
+        """
+        import pandas as pd
+
+        manifest = self.manifest()
+        if manifest is None:
+            raise FileNotFoundError(f"Nenhuma exportação em {self.root}. Execute a exportação primeiro.")
+        columns = list(columns or EXPORT_COLUMNS)
+        wanted = columns if "date" in columns else columns + ["date"]
+        first, last = (str(start)[:7] if start else None), (str(end)[:7] if end else None)
+        months = [
+            m for m in manifest["partitions"]
+            if (first is None or m >= first) and (last is None or m <= last)
+        ]
+
+        fmt = manifest["format"]
+        if not months:
+            df = pd.DataFrame({c: pd.Series(dtype="datetime64[ms]" if c == "date" else None) for c in wanted})
+        elif fmt == "npy":
+            df = pd.concat([self._read_npy(manifest["partitions"][m]["file"], wanted) for m in months],
+                           ignore_index=True)
+        else:
+            import pyarrow as pa
+            if fmt == "feather":
+                import pyarrow.feather as feather
+                read = lambda p: feather.read_table(p, columns=wanted, memory_map=True)
+            else:
+                import pyarrow.parquet as pq
+                read = lambda p: pq.read_table(p, columns=wanted, memory_map=True)
+            df = pa.concat_tables([read(self.root / manifest["partitions"][m]["file"]) for m in months]).to_pandas()
+
+        # Partições são mensais: recorta os dias das pontas
+        if start is not None:
+            df = df[df["date"] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df["date"] <= pd.Timestamp(end)]
+        return df[columns].reset_index(drop=True)
+
+    def _read_npy(self, name: str, columns: List[str]) -> "pd.DataFrame":
+        import numpy as np
+        import pandas as pd
+
+        folder = self.root / name
+        return pd.DataFrame({c: np.load(folder / f"{c}.npy", mmap_mode="r") for c in columns})
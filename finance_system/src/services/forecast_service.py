@@ -0,0 +1,231 @@
+import re
+import threading
+import warnings
+from collections import OrderedDict
+from datetime import date
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+import numpy as np
+from src.database.connection import db_instance
+from src.utils.profiling import profiled
+from src.services.loan_service import LOAN_SOURCE, LoanService
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+CATEGORY_IGNORE = "⛔ IGNORADO"
+
+HISTORY_MONTHS = 36      # Janela de histórico (3 anos: base da sazonalidade anual)
+RECENT_MONTHS = 6        # Janela de detecção de recorrentes
+RECURRING_MIN_MONTHS = 5 # Presença mínima na janela recente (5 de 6 meses)
+RECURRING_MAX_CV = 0.25  # Variação máxima dos valores (desvio / média) para ser "estável"
+SEASONAL_MIN_YEARS = 2   # Mesmo mês do calendário em pelo menos 2 anos
+VARIABLE_MONTHS = 12     # Média dos gastos avulsos (nem recorrentes nem sazonais)
+CACHE_SIZE = 16          # Previsões guardadas (chave: banco, versão dos dados e parâmetros)
+
+_CACHE: "OrderedDict[tuple, Dict[str, pd.DataFrame]]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+_NOISE = re.compile(r"[\d\W_]+")
+
+def _normalize(descriptions: "pd.Series") -> "pd.Series":
+    """
+    Descrição sem números e pontuação (parcelas, datas e códigos variam a cada mês).
+    Aplicado às descrições distintas com o `re` do Python: o motor de regex do pandas com
+    strings Arrow trata acentos como pontuação.
+    """
+    mapping = {d: _NOISE.sub(" ", d.upper()).strip() for d in descriptions.unique()}
+    return descriptions.map(mapping)
+
+def data_version(conn) -> Tuple[int, int]:
+    """
+    Versão dos dados que a previsão lê: soma das versões mensais de transações
+    (partition_versions, só cresce) e o contador de alterações em contratos.
+    """
+    tx = conn.execute("SELECT COALESCE(SUM(version), 0) FROM partition_versions").fetchone()[0]
+    row = conn.execute("SELECT value FROM system_counters WHERE name = 'loans_version'").fetchone()
+    return tx, row[0] if row else 0
+
+class ForecastService:
+    """
+    Projeção mensal de caixa (entradas, saídas e saldo acumulado) para os próximos meses.
+
+    Componentes, todos calculados sobre matrizes descrição x mês do histórico:
+    - Recorrentes: descrições presentes em quase todos os meses recentes com valor estável
+      (projetadas pela mediana).
+    - Sazonais: descrições que aparecem no mesmo mês do calendário em anos diferentes
+      (IPVA, IPTU, matrícula), projetadas nesse mês pela média dos anos.
+    - Variáveis: média mensal do restante (gastos avulsos) nos últimos 12 meses.
+    - Compromissos: parcelas dos contratos e lançamentos futuros já gravados
+      (LoanService.project_liabilities).
+
+    O resultado fica em cache por versão dos dados: sem importações ou edições,
+    a próxima rerun devolve a mesma previsão sem consultar o histórico.
+    """
+
+    @profiled
+    def forecast(self, horizon_months: int = 24, opening_balance: float = 0.0,
+                 as_of: Optional[date] = None) -> Dict[str, "pd.DataFrame"]:
+        """
+        Projeção a partir do mês seguinte a `as_of` (padrão: hoje).
+        Retorna {'monthly': month, recurring, seasonal, variable, commitments, inflows,
+        outflows, net, balance; 'recurring': itens recorrentes detectados; 'seasonal': idem}.
+        """
+        as_of = as_of or date.today()
+        conn = db_instance.get_connection()
+        try:
+            version = data_version(conn)
+        finally:
+            conn.close()
+
+        key = (str(db_instance.db_path), version, str(np.datetime64(as_of, "M")), horizon_months)
+        with _CACHE_LOCK:
+            cached = _CACHE.get(key)
+            if cached is not None:
+                _CACHE.move_to_end(key)
+        if cached is None:
+            cached = self._compute(horizon_months, as_of)
+            with _CACHE_LOCK:
+                _CACHE[key] = cached
+                while len(_CACHE) > CACHE_SIZE:
+                    _CACHE.popitem(last=False)
+
+        # Saldo inicial não entra na chave: só desloca o acumulado
+        monthly = cached["monthly"].copy()
+        monthly["balance"] = opening_balance + monthly["net"].cumsum()
+        return {"monthly": monthly, "recurring": cached["recurring"].copy(), "seasonal": cached["seasonal"].copy()}
+
+    def _compute(self, horizon_months: int, as_of: date) -> Dict[str, "pd.DataFrame"]:
+        import pandas as pd
+
+        current = np.datetime64(as_of, "M")
+        hist_start = current - HISTORY_MONTHS
+        months_ahead = current + 1 + np.arange(horizon_months)
+
+        history = self._load_history(hist_start, current)
+        # Matriz densa descrição x mês (meses completos antes do atual)
+        keys, codes = np.unique(history["key"].to_numpy(dtype=str), return_inverse=True) \
+            if len(history) else (np.array([], dtype=str), np.array([], dtype=np.int64))
+        col = (history["month"].to_numpy(dtype="datetime64[M]") - hist_start).astype(np.int64)
+        values = np.zeros((len(keys), HISTORY_MONTHS))
+        np.add.at(values, (codes, col), history["amount"].to_numpy(dtype=np.float64))
+        present = values != 0
+
+        # --- Recorrentes ---
+        recent = values[:, -RECENT_MONTHS:]
+        recent_present = present[:, -RECENT_MONTHS:]
+        with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+            # Linhas sem presença recente viram NaN (descartadas pelos filtros abaixo)
+            warnings.simplefilter("ignore", RuntimeWarning)
+            masked = np.where(recent_present, recent, np.nan)
+            median = np.nanmedian(masked, axis=1) if len(keys) else np.zeros(0)
+            cv = np.nanstd(masked, axis=1) / np.abs(np.nanmean(masked, axis=1)) if len(keys) else np.zeros(0)
+        signs = np.where(recent_present, np.sign(recent), 0).sum(axis=1)
+        same_sign = np.abs(signs) == recent_present.sum(axis=1)  # Só entradas ou só saídas
+        recurring = (
+            (recent_present.sum(axis=1) >= RECURRING_MIN_MONTHS)
+            & recent_present[:, -2:].any(axis=1)  # Ainda ativo (visto nos 2 últimos meses)
+            & (np.nan_to_num(cv, nan=np.inf) <= RECURRING_MAX_CV)
+            & same_sign
+        )
+        recurring_monthly = np.where(recurring, np.nan_to_num(median), 0.0)
+
+        # --- Sazonais: anos x meses do calendário (colunas alinhadas a janeiro) ---
+        years = HISTORY_MONTHS // 12
+        shift = int(hist_start.astype(np.int64) % 12)  # Mês do calendário da primeira coluna
+        cube = np.roll(values[:, :years * 12], shift, axis=1).reshape(len(keys), years, 12)
+        cube_present = cube != 0
+        seen_years = cube_present.sum(axis=1)
+        seasonal_cells = (
+            (seen_years >= SEASONAL_MIN_YEARS)
+            & ~recurring[:, None]
+            & (present.sum(axis=1) <= 2 * years)[:, None]  # Anual, não apenas frequente
+        )
+        with np.errstate(invalid="ignore", divide="ignore"):
+            seasonal_mean = np.where(seasonal_cells, cube.sum(axis=1) / np.maximum(seen_years, 1), 0.0)
+
+        # --- Variáveis: o que sobra nos últimos 12 meses (sem recorrentes e sazonais) ---
+        is_seasonal = seasonal_cells.any(axis=1)
+        residual = values[~recurring & ~is_seasonal, -VARIABLE_MONTHS:]
+        variable_in = residual.clip(min=0).sum(axis=0).mean() if residual.size else 0.0
+        variable_out = residual.clip(max=0).sum(axis=0).mean() if residual.size else 0.0
+
+        # --- Projeção mês a mês ---
+        calendar = (months_ahead.astype(np.int64) % 12)
+        rec_in = recurring_monthly.clip(min=0).sum()
+        rec_out = recurring_monthly.clip(max=0).sum()
+        seasonal_by_cm = seasonal_mean.sum(axis=0)  # 12 valores (jan..dez)
+        seasonal = seasonal_by_cm[calendar]
+        commitments = self._commitments(as_of, current, horizon_months)
+
+        inflows = rec_in + variable_in + seasonal.clip(min=0)
+        outflows = rec_out + variable_out + seasonal.clip(max=0) - commitments
+        monthly = pd.DataFrame({
+            "month": months_ahead.astype(str),
+            "recurring": np.round(rec_in + rec_out, 2),
+            "seasonal": np.round(seasonal, 2),
+            "variable": np.round(variable_in + variable_out, 2),
+            "commitments": np.round(-commitments, 2),
+            "inflows": np.round(inflows, 2),
+            "outflows": np.round(outflows, 2),
+            "net": np.round(inflows + outflows, 2),
+        })
+
+        labels = history.sort_values("month").drop_duplicates("key", keep="last").set_index("key")
+        recurring_df = pd.DataFrame({
+            "description": keys[recurring],
+            "category": labels["category"].reindex(keys[recurring]).to_numpy(),
+            "monthly_amount": np.round(recurring_monthly[recurring], 2),
+            "months_seen": recent_present[recurring].sum(axis=1),
+            "variation": np.round(cv[recurring], 3),
+        }).sort_values("monthly_amount", ignore_index=True)
+
+        rows, cms = np.nonzero(seasonal_cells)
+        seasonal_df = pd.DataFrame({
+            "description": keys[rows],
+            "category": labels["category"].reindex(keys[rows]).to_numpy(),
+            "calendar_month": cms + 1,
+            "amount": np.round(seasonal_mean[rows, cms], 2),
+            "years_seen": seen_years[rows, cms],
+        }).sort_values(["calendar_month", "amount"], ignore_index=True)
+
+        return {"monthly": monthly, "recurring": recurring_df, "seasonal": seasonal_df}
+
+    def _load_history(self, hist_start: np.datetime64, current: np.datetime64) -> "pd.DataFrame":
+        """
+        Somas por descrição e mês no histórico (acervo incluído), sem ignorados e sem parcelas
+        de contratos (que entram pelo componente de compromissos).
+        """
+        import pandas as pd
+
+        first_day = str(hist_start.astype("datetime64[D]"))
+        last_day = str(current.astype("datetime64[D]") - 1)
+        conn = db_instance.get_connection(archive=(first_day, last_day))
+        try:
+            df = pd.read_sql_query('''
+                SELECT description, substr(date, 1, 7) AS month, SUM(amount) AS amount, MAX(category) AS category
+                FROM transactions
+                WHERE date BETWEEN ? AND ?
+                  AND COALESCE(category, '') <> ?
+                  AND COALESCE(source, '') <> ?
+                GROUP BY description, month
+            ''', conn, params=(first_day, last_day, CATEGORY_IGNORE, LOAN_SOURCE))
+        finally:
+            conn.close()
+        df["key"] = _normalize(df["description"])
+        df = df[df["key"] != ""]
+        return df.groupby(["key", "month"], as_index=False, sort=False).agg(
+            amount=("amount", "sum"), category=("category", "last")
+        )
+
+    def _commitments(self, as_of: date, current: np.datetime64, horizon_months: int) -> np.ndarray:
+        """Compromissos (valores positivos devidos) por mês projetado, alinhados ao horizonte."""
+        last_day_current = ((current + 1).astype("datetime64[D]") - 1).item()
+        liabilities = LoanService().project_liabilities(start_date=last_day_current, horizon_months=horizon_months)
+        months = (current + 1 + np.arange(horizon_months)).astype(str)
+        out = np.zeros(horizon_months)
+        if not liabilities.empty:
+            index = {m: i for i, m in enumerate(months)}
+            for month, amount in zip(liabilities["month"], liabilities["amount"]):
+                if month in index:
+                    out[index[month]] += amount
+        return out
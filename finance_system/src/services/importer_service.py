@@ -1,7 +1,41 @@
-from typing import List
-from src.models.transaction import Transaction
+import io
+from typing import TYPE_CHECKING, Iterable, Tuple
+from src.models.transaction import transaction_key
 from src.database.connection import db_instance
-from src.utils.parsers import parse_bb_csv, parse_sisbb_txt
+from src.database.writer import writer
+from src.utils.profiling import profiled
+from src.services.archive_service import archived_keys
+
+if TYPE_CHECKING:
+    from src.models.transaction_batch import TransactionBatch
+
+SUPPORTED_EXTENSIONS = ('.csv', '.txt')
+
+def _parse_payload(filename: str, data: bytes) -> Tuple[str, "TransactionBatch", str]:
+    """
+    Interpreta o conteúdo bruto de um arquivo conforme a extensão.
+    Função de módulo (e não método) para poder rodar em processos paralelos.
+    Retorna: (filename, lote de transações, mensagem de erro ou '').
+    """
+    # NumPy e os parsers só são carregados na primeira importação (orçamento de import da página)
+    from src.models.transaction_batch import TransactionBatch
+    from src.utils.parsers import parse_bb_csv, parse_sisbb_txt
+
+    try:
+        buffer = io.BytesIO(data)
+        lower = filename.lower()
+        batch = TransactionBatch.empty()
+
+        if lower.endswith('.csv'):
+            batch = parse_bb_csv(buffer, filename)
+        elif lower.endswith('.txt'):
+            batch = parse_sisbb_txt(buffer, filename)
+
+        if not len(batch):
+            return filename, batch, f"{filename}: Nenhum dado identificado."
+        return filename, batch, ""
+    except Exception as e:
+        return filename, TransactionBatch.empty(), f"{filename}: Erro crítico - {str(e)}"
 
 class ImporterService:
     """
@@ -9,127 +43,149 @@ class ImporterService:
     Recebe arquivos brutos e devolve estatísticas de importação.
     """
 
-    def process_files(self, uploaded_files) -> dict:
+    def process_files(self, uploaded_files, dry_run: bool = False, workers: int = 1) -> dict:
         """
-        Processa lista de arquivos e salva no banco.
+        Processa lista de arquivos (objetos com .name e .getvalue(), ex: UploadedFile) e salva no banco.
         Retorna dicionário com resumo da operação.
         """
-        stats = {"read": 0, "saved": 0, "errors": []}
-        all_transactions = []
+        payloads = [(file.name, file.getvalue()) for file in uploaded_files]
+        return self.process_payloads(payloads, dry_run=dry_run, workers=workers)
+
+    @profiled
+    def process_payloads(self, payloads: Iterable[Tuple[str, bytes]], dry_run: bool = False, workers: int = 1) -> dict:
+        """
+        Núcleo da importação, independente do Streamlit (usado também pela CLI).
+        `workers` > 1 distribui o parsing dos arquivos entre processos.
+        Em `dry_run`, nada é gravado: `saved` informa quantas transações seriam novas.
+        """
+        from src.models.transaction_batch import TransactionBatch
+
+        payloads = list(payloads)
+        stats = {"files": len(payloads), "read": 0, "saved": 0, "errors": [], "dry_run": dry_run}
 
         # 1. Parsing
-        for file in uploaded_files:
-            try:
-                filename = file.name.lower()
-                file_transactions = []
-
-                if filename.endswith('.csv'):
-                    file_transactions = parse_bb_csv(file, file.name)
-                elif filename.endswith('.txt'):
-                    file_transactions = parse_sisbb_txt(file, file.name)
-                
-                if file_transactions:
-                    all_transactions.extend(file_transactions)
-                    stats["read"] += len(file_transactions)
-                else:
-                    stats["errors"].append(f"{file.name}: Nenhum dado identificado.")
-                    
-            except Exception as e:
-                stats["errors"].append(f"{file.name}: Erro crítico - {str(e)}")
+        names = [name for name, _ in payloads]
+        contents = [data for _, data in payloads]
+        if workers > 1 and len(payloads) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_parse_payload, names, contents))
+        else:
+            results = list(map(_parse_payload, names, contents))
+
+        stats["errors"] = [error for _, _, error in results if error]
+        batch = TransactionBatch.concat([file_batch for _, file_batch, _ in results])
+        stats["read"] = len(batch)
 
         # 2. Persistência
-        if all_transactions:
-            saved_count = self._save_batch(all_transactions)
-            stats["saved"] = saved_count
+        if len(batch):
+            if dry_run:
+                stats["saved"] = self._count_new(batch)
+            else:
+                stats["saved"] = self._save_batch(batch)
 
         return stats
 
-    def _save_batch(self, transactions: List[Transaction]) -> int:
-        """Insere transações no banco ignorando duplicatas (INSERT OR IGNORE)."""
-        conn = db_instance.get_connection()
-        count = 0
+    def _save_batch(self, batch: "TransactionBatch") -> int:
+        """
+        Insere o lote no banco ignorando duplicatas (INSERT OR IGNORE em lote).
+        Linhas de anos arquivados que já estão no acervo também são descartadas
+        (conferidas numa conexão de leitura; a gravação vai pelo coordenador de escritas).
+        """
+        records = batch.to_records()
+        conn = db_instance.get_connection(archive=self._period(batch))
+        try:
+            known = archived_keys(conn, batch.keys.tolist())
+        finally:
+            conn.close()
+        if known:
+            records = [r for r in records if r[0] not in known]
+
+        def insert(conn):
+            # Hash collision = Transação já existe: não entra na contagem
+            return conn.executemany('''
+                INSERT OR IGNORE INTO main.transactions (id, date, description, amount, source, category, is_manual)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', records).rowcount
+
+        return writer.run(insert)
+
+    def _count_new(self, batch: "TransactionBatch") -> int:
+        """Quantas transações (chaves distintas) ainda não existem no banco nem no acervo."""
+        keys = list(set(batch.keys.tolist()))
+        conn = db_instance.get_connection(archive=self._period(batch))
         try:
-            for t in transactions:
-                try:
-                    conn.execute('''
-                        INSERT INTO transactions (hash_id, date, description, amount, source, category, is_manual)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                    ''', (t.hash_id, t.date, t.description, t.amount, t.source, t.category, t.is_manual))
-                    count += 1
-                except Exception:
-                    # Hash collision = Transação já existe. Ignora silenciosamente.
-                    continue
-            conn.commit()
+            existing = 0
+            # Lotes abaixo do limite de variáveis do SQLite
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                existing += conn.execute(
+                    f"SELECT COUNT(*) FROM transactions WHERE id IN ({placeholders})", chunk
+                ).fetchone()[0]
+            return len(keys) - existing
         finally:
             conn.close()
-        return count
 
+    @staticmethod
+    def _period(batch: "TransactionBatch") -> tuple:
+        """(primeira, última) data do lote: só os anos do acervo nesse período são anexados."""
+        return str(batch.dates.min()), str(batch.dates.max())
+
+    @profiled
     def preview_vacation_mode(self, start_date, end_date):
         """
         Simula a lógica de Férias:
         Busca transações no período e separa o que é Recorrente (protegido) do que é Pontual (férias).
+        Candidatas só do banco quente (o acervo é somente leitura); a recorrência considera também
+        os anos arquivados, consultados um arquivo por vez.
         """
+        import pandas as pd
+        from src.services.archive_service import archived_descriptions
+
+        start, end = str(start_date), str(end_date)
         conn = db_instance.get_connection()
         try:
             # 1. Busca candidatos dentro da janela
             # Ignora o que já for 'Férias' ou 'Ignorado'
-            candidates = pd.read_sql_query(f"""
-                SELECT * FROM transactions 
-                WHERE date BETWEEN '{start_date}' AND '{end_date}'
+            candidates = pd.read_sql_query("""
+                SELECT hash_id, date, description, amount, category FROM main.transactions
+                WHERE date BETWEEN ? AND ?
                 AND (category != 'Férias' OR category IS NULL)
                 AND (category != '⛔ IGNORADO' OR category IS NULL)
-            """, conn)
-            
-            to_update = []
-            protected = []
-            
-            cursor = conn.cursor()
-            
-            for _, row in candidates.iterrows():
-                desc = row['description']
-                
-                # 2. O Teste de Recorrência
-                # Verifica se esta descrição aparece FORA da janela temporal selecionada
-                # (Isso indica que é uma conta mensal comum, como Escola ou Aluguel)
-                cursor.execute(f"""
-                    SELECT count(*) FROM transactions 
-                    WHERE description = ? 
-                    AND date NOT BETWEEN '{start_date}' AND '{end_date}'
-                """, (desc,))
-                
-                count_outside = cursor.fetchone()[0]
-                
-                item = {
-                    "hash_id": row['hash_id'],
-                    "Data": row['date'],
-                    "Descrição": desc,
-                    "Valor": row['amount'],
-                    "Categoria Atual": row['category']
-                }
-                
-                if count_outside > 0:
-                    # É recorrente (Existe fora das férias) -> Protege
-                    protected.append(item)
-                else:
-                    # É exclusivo deste período -> Vira Férias
-                    to_update.append(item)
-                    
-            return pd.DataFrame(to_update), pd.DataFrame(protected)
-            
+            """, conn, params=(start, end))
+
+            # 2. O Teste de Recorrência
+            # Descrições que aparecem FORA da janela temporal selecionada
+            # (Isso indica que é uma conta mensal comum, como Escola ou Aluguel)
+            descriptions = candidates["description"].unique().tolist()
+            recurring = set()
+            for i in range(0, len(descriptions), 500):
+                chunk = descriptions[i:i + 500]
+                recurring.update(row[0] for row in conn.execute(f"""
+                    SELECT DISTINCT description FROM main.transactions
+                    WHERE description IN ({','.join('?' * len(chunk))}) AND date NOT BETWEEN ? AND ?
+                """, [*chunk, start, end]))
+            recurring |= archived_descriptions(conn, set(descriptions) - recurring, start, end)
         finally:
             conn.close()
 
+        items = pd.DataFrame({
+            "hash_id": candidates["hash_id"],
+            "Data": candidates["date"],
+            "Descrição": candidates["description"],
+            "Valor": candidates["amount"],
+            "Categoria Atual": candidates["category"],
+        })
+        # É recorrente (Existe fora das férias) -> Protege; exclusivo deste período -> Vira Férias
+        is_recurring = candidates["description"].isin(recurring)
+        return items[~is_recurring].reset_index(drop=True), items[is_recurring].reset_index(drop=True)
+
     def apply_vacation_batch(self, hash_ids: list):
-        """Aplica a categoria 'Férias' em lote para os IDs validados."""
-        conn = db_instance.get_connection()
-        try:
-            cursor = conn.cursor()
-            # Otimização: Executa updates em lote
-            cursor.executemany(
-                "UPDATE transactions SET category = 'Férias', is_manual = 1 WHERE hash_id = ?",
-                [(h,) for h in hash_ids]
-            )
-            conn.commit()
-            return cursor.rowcount
-        finally:
-            conn.close()
\ No newline at end of file
+        """Aplica a categoria 'Férias' em lote para os IDs validados (hash_id hex ou chave inteira)."""
+        keys = [(transaction_key(h),) for h in hash_ids]
+        # Otimização: Executa updates em lote
+        return writer.run(lambda conn: conn.executemany(
+            "UPDATE transactions SET category = 'Férias', is_manual = 1 WHERE id = ?", keys
+        ).rowcount)
\ No newline at end of file
@@ -1,9 +1,57 @@
-import hashlib
-from typing import List
+import math
+from typing import TYPE_CHECKING, Dict, List, Optional, Union
 from datetime import date
-from dateutil.relativedelta import relativedelta
+import numpy as np
+from src.models.loan import Loan, Prepayment, SCHEDULE_SAC, PREPAY_REDUCE_INSTALLMENT, due_dates
 from src.models.transaction import Transaction
+from src.models.transaction_batch import TransactionBatch, md5_digests
 from src.database.connection import db_instance
+from src.database.writer import writer
+from src.utils.profiling import profiled
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+LOAN_SOURCE = "Contrato Manual"
+
+def _price_payment(balance: float, rate: float, periods: int) -> float:
+    """Parcela fixa da Tabela Price (fórmula fechada)."""
+    if rate == 0:
+        return balance / periods
+    return balance * rate / (1 - (1 + rate) ** -periods)
+
+def _payment_amounts(loan: Loan, idx: np.ndarray) -> np.ndarray:
+    """Valor (positivo) das parcelas de índice `idx` por fórmula fechada (Price ou SAC)."""
+    p, r, n = loan.principal, loan.monthly_rate, loan.term
+    if loan.schedule_type == SCHEDULE_SAC:
+        amortization = p / n
+        return amortization + r * (p - amortization * idx)
+    return np.full(idx.shape, _price_payment(p, r, n))
+
+def _balance_path(balance: float, rate: float, steps: np.ndarray, payment: float, sac: bool) -> np.ndarray:
+    """
+    Saldo devedor após `steps` pagamentos, a partir de `balance` (fórmulas fechadas):
+        SAC:   B_j = B_0 - A*j                                  (payment = amortização A)
+        Price: B_j = B_0*(1+r)^j - PMT*((1+r)^j - 1)/r          (payment = parcela PMT)
+    """
+    if sac:
+        path = balance - payment * steps
+    elif rate == 0:
+        path = balance - payment * steps
+    else:
+        growth = (1 + rate) ** steps
+        path = balance * growth - payment * (growth - 1) / rate
+    # Resíduos de ponto flutuante e a última parcela "estourada" ao encurtar prazo
+    path[path < 1e-6] = 0.0
+    return path
+
+def _remaining_periods(balance: float, rate: float, payment: float, sac: bool) -> int:
+    """Quantidade de parcelas necessárias para quitar `balance` mantendo a parcela/amortização."""
+    if balance <= 0:
+        return 0
+    if sac or rate == 0:
+        return math.ceil(balance / payment - 1e-9)
+    return math.ceil(-math.log(1 - rate * balance / payment) / math.log(1 + rate) - 1e-9)
 
 class LoanService:
     """
@@ -11,67 +59,276 @@ class LoanService:
     Transforma parâmetros manuais em projeções de fluxo de caixa.
     """
 
+    def schedule_arrays(self, loan: Loan, prepayments: Optional[List[Prepayment]] = None) -> Dict[str, np.ndarray]:
+        """
+        Tabela de amortização completa (Price ou SAC) em arrays NumPy.
+        Cada trecho entre amortizações extraordinárias é calculado por fórmula fechada;
+        o único laço percorre os eventos de amortização, nunca os meses.
+
+        Retorna: installment, date, payment, interest, amortization, extra, balance.
+        """
+        r = loan.monthly_rate
+        sac = loan.schedule_type == SCHEDULE_SAC
+        events = sorted(
+            (p for p in (prepayments or []) if 1 <= p.installment < loan.term and p.amount > 0),
+            key=lambda p: p.installment
+        )
+
+        balance = float(loan.principal)
+        term_end = loan.term
+        # Price: parcela fixa | SAC: amortização constante
+        step_value = balance / term_end if sac else _price_payment(balance, r, term_end)
+
+        opening, closing, extras = [], [], []
+        done = 0
+        for event in events + [None]:
+            stop = min(event.installment, term_end) if event else term_end
+            if stop > done:
+                path = _balance_path(balance, r, np.arange(stop - done + 1), step_value, sac)
+                opening.append(path[:-1])
+                closing.append(path[1:])
+                extras.append(np.zeros(stop - done))
+                balance = path[-1]
+                done = stop
+
+            if event is None or balance <= 0:
+                break
+
+            # Abate o valor extra logo após a parcela do evento
+            paid = min(event.amount, balance)
+            extras[-1][-1] += paid
+            closing[-1][-1] -= paid
+            balance -= paid
+
+            if event.mode == PREPAY_REDUCE_INSTALLMENT:
+                remaining = term_end - done
+                step_value = balance / remaining if sac else _price_payment(balance, r, remaining)
+            else:
+                term_end = done + _remaining_periods(balance, r, step_value, sac)
+
+        before = np.concatenate(opening)
+        after_installment = np.concatenate(closing) + np.concatenate(extras)
+        extra = np.concatenate(extras)
+
+        # Encerra o cronograma quando o saldo zera (prazo reduzido)
+        active = before > 0
+        before, after_installment, extra = before[active], after_installment[active], extra[active]
+
+        idx = np.arange(len(before))
+        interest = before * r
+        amortization = before - after_installment
+        return {
+            "installment": idx + 1,
+            "date": due_dates(loan.first_due_date, idx),
+            "payment": interest + amortization,
+            "interest": interest,
+            "amortization": amortization,
+            "extra": extra,
+            "balance": after_installment - extra,
+        }
+
+    @profiled
+    def build_schedule(self, loan: Loan, prepayments: Optional[List[Prepayment]] = None) -> "pd.DataFrame":
+        """Tabela de amortização (ver `schedule_arrays`) como DataFrame para a interface."""
+        import pandas as pd
+        return pd.DataFrame(self.schedule_arrays(loan, prepayments), copy=False)
+
     def generate_plan(
         self, 
         contract_name: str, 
         amount: float, 
         first_due_date: date, 
         installments: int
-    ) -> List[Transaction]:
+    ) -> TransactionBatch:
         """
         Simula o plano de pagamentos futuro (Preview).
-        Não salva no banco, apenas gera os objetos em memória.
+        Não salva no banco, apenas gera o lote colunar em memória.
         """
-        plan = []
         monthly_cost = -abs(amount) # Garante sinal negativo (Saída)
-        current_date = first_due_date
-
-        for i in range(installments):
-            # Ex: "Financ. Carro (01/48)"
-            desc = f"{contract_name} ({i+1:02d}/{installments})"
-            
-            # Hash Determinístico: Garante que se você gerar de novo, 
-            # o ID será o mesmo, evitando duplicidade se clicar 2x em salvar.
-            unique_string = f"{current_date}{monthly_cost}{desc}"
-            hash_id = hashlib.md5(unique_string.encode()).hexdigest()
-
-            t = Transaction(
-                date=current_date,
-                description=desc,
-                amount=monthly_cost,
-                source="Contrato Manual",
-                category="Empréstimos", # Auto-categorização
-                is_manual=True,         # Protege contra reclassificação
-                hash_id=hash_id
+        # Vencimentos calculados de uma vez (datetime64[M]), sem avançar mês a mês
+        dates = due_dates(first_due_date, np.arange(installments))
+
+        # Ex: "Financ. Carro (01/48)"
+        descriptions = [f"{contract_name} ({i+1:02d}/{installments})" for i in range(installments)]
+
+        # Hash Determinístico: Garante que se você gerar de novo, 
+        # o ID será o mesmo, evitando duplicidade se clicar 2x em salvar.
+        iso_dates = np.datetime_as_string(dates, unit="D").tolist()
+        hashes = md5_digests(f"{d}{monthly_cost}{desc}" for d, desc in zip(iso_dates, descriptions))
+
+        return TransactionBatch.from_columns(
+            dates=dates,
+            descriptions=descriptions,
+            amounts=np.full(installments, monthly_cost),
+            source=LOAN_SOURCE,
+            category="Empréstimos", # Auto-categorização
+            is_manual=True,         # Protege contra reclassificação
+            hashes=hashes
+        )
+
+    def save_plan(self, plan: Union[TransactionBatch, List[Transaction]]) -> int:
+        """
+        Persiste o plano (lote colunar ou lista legada de transações) no banco de dados.
+        Retorna a quantidade de novos registros inseridos (hashes já existentes são ignorados).
+        """
+        if not isinstance(plan, TransactionBatch):
+            plan = TransactionBatch.from_transactions(plan)
+
+        records = plan.to_records()
+        return writer.run(lambda conn: conn.executemany('''
+            INSERT OR IGNORE INTO transactions (id, date, description, amount, source, category, is_manual)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', records).rowcount)
+
+    def save_loan(self, loan: Loan) -> int:
+        """
+        Grava (ou atualiza, se já tiver id) um contrato.
+        Editar um contrato altera uma única linha, sem reescrever parcelas.
+        """
+        params = (
+            loan.name, loan.principal, loan.monthly_rate, loan.term,
+            loan.first_due_date, loan.schedule_type, loan.category
+        )
+
+        def save(conn):
+            if loan.id is None:
+                return conn.execute('''
+                    INSERT INTO loans (name, principal, monthly_rate, term, first_due_date, schedule_type, category)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', params).lastrowid
+            conn.execute('''
+                UPDATE loans
+                SET name = ?, principal = ?, monthly_rate = ?, term = ?,
+                    first_due_date = ?, schedule_type = ?, category = ?
+                WHERE id = ?
+            ''', params + (loan.id,))
+            return loan.id
+
+        # O id só é atribuído depois do COMMIT (job desfeito não deixa id fantasma)
+        loan.id = writer.run(save)
+        return loan.id
+
+    @profiled
+    def list_loans(self) -> List[Loan]:
+        """Retorna todos os contratos cadastrados."""
+        conn = db_instance.get_connection()
+        try:
+            rows = conn.execute('''
+                SELECT id, name, principal, monthly_rate, term, first_due_date, schedule_type, category
+                FROM loans ORDER BY first_due_date
+            ''').fetchall()
+        finally:
+            conn.close()
+
+        return [
+            Loan(
+                id=row[0], name=row[1], principal=row[2], monthly_rate=row[3], term=row[4],
+                first_due_date=date.fromisoformat(str(row[5])), schedule_type=row[6], category=row[7]
             )
-            plan.append(t)
-            
-            # Avança mês a mês (inteligente com anos bissextos etc)
-            current_date = current_date + relativedelta(months=1)
-            
-        return plan
-
-    def save_plan(self, transactions: List[Transaction]) -> int:
+            for row in rows
+        ]
+
+    def delete_loan(self, loan_id: int):
+        """Remove um contrato (e, consequentemente, todas as suas parcelas projetadas)."""
+        writer.run(lambda conn: conn.execute("DELETE FROM loans WHERE id = ?", (loan_id,)))
+
+    @profiled
+    def expand_installments(
+        self,
+        start_date: date,
+        end_date: date,
+        loans: Optional[List[Loan]] = None
+    ) -> "pd.DataFrame":
+        """
+        Expande as parcelas dos contratos apenas dentro da janela [start_date, end_date].
+        Cálculo vetorizado por contrato: nenhuma parcela fora da janela é gerada.
+        Se `loans` não for informado, usa os contratos do banco.
+        """
+        import pandas as pd
+
+        if loans is None:
+            loans = self.list_loans()
+
+        start_d = np.datetime64(start_date, "D")
+        end_d = np.datetime64(end_date, "D")
+        start_m = np.datetime64(start_date, "M")
+        end_m = np.datetime64(end_date, "M")
+
+        parts = []
+        for loan in loans:
+            first_m = np.datetime64(loan.first_due_date, "M")
+            lo = max(0, int((start_m - first_m).astype(int)))
+            hi = min(loan.term - 1, int((end_m - first_m).astype(int)))
+            if hi < lo:
+                continue
+
+            idx = np.arange(lo, hi + 1)
+            dates = due_dates(loan.first_due_date, idx)
+
+            # Meses das bordas podem ter vencimentos fora da janela exata
+            inside = (dates >= start_d) & (dates <= end_d)
+            idx, dates = idx[inside], dates[inside]
+            if not len(idx):
+                continue
+
+            parts.append(pd.DataFrame({
+                "loan_id": loan.id,
+                "installment": idx + 1,
+                "date": dates,
+                "description": [f"{loan.name} ({k + 1:02d}/{loan.term})" for k in idx],
+                "amount": -np.round(_payment_amounts(loan, idx), 2),
+                "source": LOAN_SOURCE,
+                "category": loan.category,
+            }))
+
+        if not parts:
+            return pd.DataFrame(columns=["loan_id", "installment", "date", "description", "amount", "source", "category"])
+        return pd.concat(parts, ignore_index=True)
+
+    @profiled
+    def project_liabilities(
+        self,
+        start_date: Optional[date] = None,
+        horizon_months: int = 120,
+        by_source: bool = False
+    ) -> "pd.DataFrame":
         """
-        Persiste a lista de transações no banco de dados.
-        Retorna a quantidade de novos registros inseridos.
+        Projeção mensal dos compromissos futuros (a partir do dia seguinte a `start_date`).
+        Soma as saídas futuras gravadas (agregação direta do índice parcial de saídas)
+        com as parcelas projetadas dos contratos, expandidas apenas dentro do horizonte.
+
+        Retorna colunas: month ('AAAA-MM'), [origin], amount (valor positivo devido).
         """
+        import pandas as pd
+
+        start_date = start_date or date.today()
+        first_day = np.datetime64(start_date, "D") + 1
+        end_month = np.datetime64(start_date, "M") + horizon_months
+        last_day = (end_month + 1).astype("datetime64[D]") - 1
+
         conn = db_instance.get_connection()
-        saved_count = 0
-        
         try:
-            for t in transactions:
-                try:
-                    conn.execute('''
-                        INSERT INTO transactions (hash_id, date, description, amount, source, category, is_manual)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                    ''', (t.hash_id, t.date, t.description, t.amount, t.source, t.category, t.is_manual))
-                    saved_count += 1
-                except Exception:
-                    # Se der erro (provavelmente hash duplicado), apenas ignora este item
-                    continue
-            conn.commit()
+            stored = conn.execute('''
+                SELECT substr(date, 1, 7) AS month, source, -SUM(amount)
+                FROM transactions
+                WHERE date >= ? AND date <= ? AND amount < 0
+                GROUP BY month, source
+            ''', (str(first_day), str(last_day))).fetchall()
         finally:
             conn.close()
-            
-        return saved_count
\ No newline at end of file
+
+        frames = [pd.DataFrame(stored, columns=["month", "origin", "amount"])]
+
+        loans = self.list_loans()
+        installments = self.expand_installments(first_day.item(), last_day.item(), loans=loans)
+        if not installments.empty:
+            names = {loan.id: loan.name for loan in loans}
+            frames.append(pd.DataFrame({
+                "month": installments["date"].values.astype("datetime64[M]").astype(str),
+                "origin": installments["loan_id"].map(names).values,
+                "amount": -installments["amount"].values,
+            }))
+
+        projection = pd.concat(frames, ignore_index=True)
+        keys = ["month", "origin"] if by_source else ["month"]
+        return projection.groupby(keys, as_index=False)["amount"].sum().sort_values(keys, ignore_index=True)
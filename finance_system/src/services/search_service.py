@@ -0,0 +1,154 @@
+import re
+import sqlite3
+from datetime import date
+from typing import TYPE_CHECKING, List, Optional, Tuple
+from src.database.connection import db_instance
+from src.utils.profiling import profiled
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Trechos entre aspas viram frase exata; o restante, palavras soltas
+_PHRASE = re.compile(r'"([^"]*)"')
+
+# Acima deste número de resultados o bm25 (que pontua todos) é trocado pela ordem de data
+RANK_LIMIT = 5000
+
+def build_match_query(text: str) -> str:
+    """
+    Converte o texto digitado em expressão FTS5 segura.
+    - Palavras soltas casam por prefixo e são combinadas com AND: `ube 2023` -> "ube"* AND "2023"*
+    - Palavras de uma letra casam só a palavra inteira (`p` -> "p"): o prefixo de uma letra
+      expande para boa parte do vocabulário e custaria uma varredura do índice inteiro
+    - Trechos entre aspas casam como frase exata: `"pix env"` -> "pix env"
+    Operadores/sintaxe FTS5 do usuário são neutralizados (tudo vira string entre aspas).
+    """
+    terms = []
+    for phrase in _PHRASE.findall(text):
+        if phrase.strip():
+            terms.append(f'"{phrase.strip()}"')
+    for word in _PHRASE.sub(" ", text).split():
+        word = word.replace('"', "").rstrip("*")
+        if len(word) > 1:
+            terms.append(f'"{word}"*')
+        elif word:
+            terms.append(f'"{word}"')
+    return " AND ".join(terms)
+
+class SearchService:
+    """
+    Busca textual no histórico de transações.
+    Usa o índice FTS5 `transactions_fts` (ranking bm25) combinado com filtros de
+    data, valor e categoria, com paginação no próprio SQL.
+    """
+
+    @profiled
+    def search(
+        self,
+        text: str = "",
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        categories: Optional[List[str]] = None,
+        pending: bool = False,
+        order: str = "relevance",
+        page: int = 1,
+        page_size: int = 50,
+    ) -> Tuple["pd.DataFrame", int]:
+        """
+        Retorna (página de resultados, total de resultados).
+        `categories` filtra por categoria; `pending=True` inclui as sem categoria.
+        `order`: 'relevance' (bm25, só com texto e até RANK_LIMIT resultados) ou 'date'
+        (mais recentes primeiro).
+        """
+        import pandas as pd
+
+        where, params = [], []
+        match = build_match_query(text)
+        if start_date:
+            where.append("t.date >= ?")
+            params.append(str(start_date))
+        if end_date:
+            where.append("t.date <= ?")
+            params.append(str(end_date))
+        by_date = len(where)  # Filtros atendidos só pelo índice de data (data, id)
+        if min_amount is not None:
+            where.append("t.amount >= ?")
+            params.append(min_amount)
+        if max_amount is not None:
+            where.append("t.amount <= ?")
+            params.append(max_amount)
+        if categories or pending:
+            options = []
+            if categories:
+                options.append(f"t.category IN ({','.join('?' * len(categories))})")
+                params.extend(categories)
+            if pending:
+                options.append("COALESCE(t.category, '') = ''")
+            where.append(f"({' OR '.join(options)})")
+
+        columns = "t.hash_id, t.date, t.description, t.amount, t.source, t.category, t.is_manual"
+        offset = max(page - 1, 0) * page_size
+
+        conn = db_instance.get_connection()
+        try:
+            total = None
+            if match and self._has_index(conn):
+                # Contagem direto do índice (sem visitar a tabela): decide se o bm25 compensa
+                hits = conn.execute(
+                    "SELECT COUNT(*) FROM transactions_fts WHERE transactions_fts MATCH ?", (match,)
+                ).fetchone()[0]
+                if order == "relevance" and hits <= RANK_LIMIT:
+                    extra = f"AND {' AND '.join(where)}" if where else ""
+                    rows = pd.read_sql_query(f'''
+                        SELECT {columns}
+                        FROM transactions_fts JOIN transactions t ON t.id = transactions_fts.rowid
+                        WHERE transactions_fts MATCH ? {extra}
+                        ORDER BY bm25(transactions_fts), t.date DESC
+                        LIMIT ? OFFSET ?
+                    ''', conn, params=[match] + params + [page_size, offset])
+                    total = self._count(conn, match, where, params) if where else hits
+                    return rows, total
+                # Muitos resultados e só filtro de data: a página sai do índice de data, que para nos
+                # primeiros da ordem; o `+` impede o SQLite de partir do índice textual e ordenar tudo
+                total = self._count(conn, match, where, params) if where else hits
+                driver = "+t.id" if hits > RANK_LIMIT and len(where) == by_date else "t.id"
+                where.insert(0, f"{driver} IN (SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH ?)")
+                params.insert(0, match)
+            elif text.strip():
+                # FTS5 indisponível: LIKE por termo (varredura completa)
+                for word in _PHRASE.findall(text) + _PHRASE.sub(" ", text).split():
+                    if word.strip():
+                        where.append("t.description LIKE ?")
+                        params.append(f"%{word.strip()}%")
+
+            clause = f"WHERE {' AND '.join(where)}" if where else ""
+            if total is None:
+                total = conn.execute(f"SELECT COUNT(*) FROM transactions t {clause}", params).fetchone()[0]
+            # Filtros e LIMIT só sobre (data, id); as colunas são lidas apenas para as linhas da página
+            rows = pd.read_sql_query(f'''
+                SELECT {columns} FROM (
+                    SELECT t.id FROM transactions t {clause}
+                    ORDER BY t.date DESC, t.id DESC
+                    LIMIT ? OFFSET ?
+                ) page JOIN transactions t ON t.id = page.id
+                ORDER BY t.date DESC, t.id DESC
+            ''', conn, params=params + [page_size, offset])
+            return rows, total
+        finally:
+            conn.close()
+
+    def _count(self, conn: sqlite3.Connection, match: str, where: List[str], params: list) -> int:
+        """Total de resultados com texto + filtros, partindo do índice textual (uma busca por chave por resultado)."""
+        extra = f"AND {' AND '.join(where)}" if where else ""
+        return conn.execute(f'''
+            SELECT COUNT(*) FROM transactions_fts JOIN transactions t ON t.id = transactions_fts.rowid
+            WHERE transactions_fts MATCH ? {extra}
+        ''', [match] + params).fetchone()[0]
+
+    def _has_index(self, conn: sqlite3.Connection) -> bool:
+        """True se o índice FTS5 existe neste banco."""
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'transactions_fts'"
+        ).fetchone() is not None
@@ -0,0 +1,45 @@
+from src.database.connection import db_instance
+from src.utils.profiling import profiled
+
+class StatsService:
+    """
+    Estatísticas de saúde do sistema para a Home.
+    Lê contadores mantidos por triggers e os extremos do índice de datas,
+    portanto responde em tempo constante, independente do tamanho do histórico.
+    """
+
+    @profiled
+    def get_system_stats(self) -> dict:
+        """
+        Retorna total, pendentes, período coberto e tamanho do banco em uma única consulta.
+        Total e período incluem o acervo (lidos do catálogo, sem anexar os arquivos anuais);
+        `archived` conta as linhas arquivadas e `db_size_bytes` é só o banco quente.
+        Erros de banco são propagados para que a interface possa exibi-los.
+        """
+        conn = db_instance.get_connection()
+        try:
+            row = conn.execute('''
+                SELECT
+                    (SELECT value FROM system_counters WHERE name = 'total'),
+                    (SELECT value FROM system_counters WHERE name = 'pending'),
+                    (SELECT MIN(date) FROM transactions),
+                    (SELECT MAX(date) FROM transactions),
+                    (SELECT page_count * page_size FROM pragma_page_count(), pragma_page_size()),
+                    (SELECT SUM(rows) FROM archive_catalog),
+                    (SELECT MIN(min_date) FROM archive_catalog),
+                    (SELECT MAX(max_date) FROM archive_catalog)
+            ''').fetchone()
+
+            total, pending, min_date, max_date, db_size, archived, archive_min, archive_max = row
+            min_date = min(d for d in (min_date, archive_min) if d) if (min_date or archive_min) else None
+            max_date = max(d for d in (max_date, archive_max) if d) if (max_date or archive_max) else None
+            return {
+                "total": (total or 0) + (archived or 0),
+                "archived": archived or 0,
+                "pending": pending or 0,
+                "start": min_date,
+                "end": max_date,
+                "db_size_bytes": db_size or 0,
+            }
+        finally:
+            conn.close()
@@ -0,0 +1,245 @@
+import threading
+from typing import TYPE_CHECKING, Dict, List, Sequence, Tuple
+import numpy as np
+from src.database.connection import db_instance
+from src.database.writer import writer
+from src.utils.profiling import profiled
+from src.models.transaction_batch import source_kinds
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# --- ESPAÇO DE ATRIBUTOS (hashing) ---
+DIM = 1 << 16                   # Dimensão do vetor esparso
+MAX_BYTES = 48                  # Bytes da descrição considerados (o início concentra o nome)
+_TEXT_DIM = DIM - 128           # Trigramas; o topo do espaço fica reservado
+_AMOUNT_SLOTS = DIM - 64        # Faixa de valor: 2 sinais x 32 faixas (log2)
+_SOURCE_SLOTS = DIM - 72        # Tipo de origem (conta, cartão, contrato, outros)
+_HASH_MULT = np.uint32(2654435761)
+
+AMOUNT_WEIGHT = 0.5             # Peso relativo ao bloco de texto (norma 1)
+SOURCE_WEIGHT = 0.3
+TEMPERATURE = 0.05              # Softmax sobre o cosseno: menor = confiança mais concentrada
+SCORE_CHUNK = 200_000           # Entradas (linha x atributo) por bloco de pontuação
+JOURNAL_KEEP = 20_000           # Linhas do diário preservadas após a sincronização
+
+def _featurize(descriptions: Sequence[str], amounts, sources: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vetores esparsos normalizados (L2) em formato coordenado: (linhas, atributos, valores),
+    ordenados por linha. Trigramas de caracteres com hashing, calculados sobre a matriz de
+    bytes (n, MAX_BYTES) das descrições, sem laço por linha.
+    Letras ASCII viram maiúsculas e dígitos viram '#' ('UBER 123' ~ 'UBER 456').
+    """
+    n = len(descriptions)
+    if not n:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0, np.float32)
+
+    raw = np.array([f" {d} ".encode("utf-8")[:MAX_BYTES] for d in descriptions], dtype=f"S{MAX_BYTES}")
+    m = raw.view(np.uint8).reshape(n, MAX_BYTES).copy()
+    m[(m >= 97) & (m <= 122)] -= 32
+    m[(m >= 48) & (m <= 57)] = 35
+
+    codes = (m[:, :-2].astype(np.uint32) << 16) | (m[:, 1:-1].astype(np.uint32) << 8) | m[:, 2:]
+    valid = m[:, 2:] != 0  # Preenchimento só no fim: terceiro byte nulo = trigrama incompleto
+    hashed = ((codes[valid] * _HASH_MULT) >> np.uint32(16)) % np.uint32(_TEXT_DIM)
+    rows = np.broadcast_to(np.arange(n)[:, None], codes.shape)[valid]
+
+    # Frequência de cada trigrama na linha, normalizada por linha
+    keys, counts = np.unique(rows.astype(np.int64) * DIM + hashed, return_counts=True)
+    text_rows, text_feats = keys // DIM, keys % DIM
+    counts = counts.astype(np.float32)
+    norms = np.sqrt(np.bincount(text_rows, weights=counts ** 2, minlength=n)).astype(np.float32)
+    text_vals = counts / np.where(norms > 0, norms, 1)[text_rows]
+
+    amounts = np.asarray(amounts, dtype=np.float64)
+    bucket = np.clip(np.floor(np.log2(np.abs(amounts) + 1)), 0, 31).astype(np.int64)
+    amount_feats = _AMOUNT_SLOTS + (amounts >= 0).astype(np.int64) * 32 + bucket
+    source_feats = _SOURCE_SLOTS + source_kinds(sources)
+
+    every = np.arange(n)
+    rows = np.concatenate([text_rows, every, every])
+    feats = np.concatenate([text_feats, amount_feats, source_feats])
+    vals = np.concatenate([
+        text_vals,
+        np.full(n, AMOUNT_WEIGHT, np.float32),
+        np.full(n, SOURCE_WEIGHT, np.float32),
+    ]) / np.float32(np.sqrt(1 + AMOUNT_WEIGHT ** 2 + SOURCE_WEIGHT ** 2))
+
+    order = np.argsort(rows, kind="stable")
+    return rows[order], feats[order], vals[order]
+
+class _CategoryModel:
+    """
+    Centroides por categoria: soma dos vetores das transações classificadas.
+    Somas (e não médias) permitem adicionar/remover linhas sem reler o histórico.
+    """
+
+    def __init__(self):
+        self.categories: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.sums = np.zeros((0, DIM), dtype=np.float32)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.cursor = 0  # Último seq do diário já aplicado
+        self._normalized = None
+
+    def _category_index(self, category: str) -> int:
+        if category not in self.index:
+            self.index[category] = len(self.categories)
+            self.categories.append(category)
+            self.sums = np.vstack([self.sums, np.zeros((1, DIM), dtype=np.float32)])
+            self.counts = np.append(self.counts, 0)
+        return self.index[category]
+
+    def apply(self, descriptions, amounts, sources, categories, sign: float):
+        """Soma (sign=+1) ou subtrai (sign=-1) as linhas dos centroides das suas categorias."""
+        if not len(descriptions):
+            return
+        rows, feats, vals = _featurize(descriptions, amounts, sources)
+        cats = np.array([self._category_index(c) for c in categories], dtype=np.int64)
+        delta = np.bincount(cats[rows] * DIM + feats, weights=vals * sign, minlength=len(self.categories) * DIM)
+        self.sums += delta.reshape(-1, DIM).astype(np.float32)
+        np.add.at(self.counts, cats, int(sign))
+        self._normalized = None
+
+    def normalized(self) -> Tuple[np.ndarray, List[str]]:
+        """Centroides ativos normalizados (transpostos: DIM x categorias) e seus rótulos."""
+        if self._normalized is None:
+            active = np.flatnonzero(self.counts > 0)
+            sums = self.sums[active]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            weights = sums / np.where(norms > 0, norms, 1)
+            self._normalized = (np.ascontiguousarray(weights.T), [self.categories[i] for i in active])
+        return self._normalized
+
+    def score(self, descriptions, amounts, sources, k: int) -> List[List[Tuple[str, float]]]:
+        """Top-k (categoria, confiança) por linha, pontuando todas as linhas em lote."""
+        n = len(descriptions)
+        weights_t, labels = self.normalized()
+        if not n or not labels:
+            return [[] for _ in range(n)]
+
+        rows, feats, vals = _featurize(descriptions, amounts, sources)
+        cosine = np.zeros((n, len(labels)), dtype=np.float32)
+        # Produto esparso x denso em blocos (limita a memória de linhas x categorias)
+        for start in range(0, len(rows), SCORE_CHUNK):
+            r = rows[start:start + SCORE_CHUNK]
+            contrib = weights_t[feats[start:start + SCORE_CHUNK]] * vals[start:start + SCORE_CHUNK, None]
+            starts = np.flatnonzero(np.r_[True, r[1:] != r[:-1]])
+            cosine[r[starts]] += np.add.reduceat(contrib, starts, axis=0)
+
+        logits = (cosine - cosine.max(axis=1, keepdims=True)) / TEMPERATURE
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+
+        k = min(k, len(labels))
+        top = np.argpartition(-probs, k - 1, axis=1)[:, :k]
+        top = np.take_along_axis(top, np.argsort(-np.take_along_axis(probs, top, axis=1), axis=1), axis=1)
+        return [[(labels[j], float(probs[i, j])) for j in row] for i, row in enumerate(top)]
+
+# Modelos em memória por arquivo de banco (sobrevivem aos reruns do Streamlit)
+_MODELS: Dict[str, _CategoryModel] = {}
+_MODELS_LOCK = threading.Lock()
+
+class SuggestionService:
+    """
+    Sugestão de categoria para pendências, treinada no histórico já classificado.
+    Vetores de trigramas de caracteres + faixa de valor + tipo de origem; similaridade de
+    cosseno com o centroide de cada categoria (vizinho mais próximo entre protótipos).
+    O modelo acompanha o diário `category_journal` e só é reconstruído do zero na primeira
+    carga ou se o diário já foi podado além do ponto em que o modelo parou.
+    """
+
+    @profiled
+    def sync(self) -> _CategoryModel:
+        """Atualiza o modelo com as mudanças de classificação desde a última chamada."""
+        key = str(db_instance.db_path)
+        with _MODELS_LOCK:
+            model = _MODELS.get(key)
+            conn = db_instance.get_connection()
+            try:
+                first, last = conn.execute("SELECT MIN(seq), MAX(seq) FROM category_journal").fetchone()
+                stale = model is None or (first is not None and first > model.cursor + 1) \
+                    or (last is not None and last < model.cursor)
+                if stale:
+                    model = _MODELS[key] = self._rebuild(conn)
+                elif last is not None and last > model.cursor:
+                    self._apply_journal(conn, model)
+            finally:
+                conn.close()
+
+        # Poda: outros processos com cursor mais antigo detectam e reconstroem.
+        # Só quando o diário passou do limite (sync roda a cada rerun; sem job de escrita à toa).
+        # Enfileirada sem esperar (manutenção; não altera o modelo já sincronizado)
+        if first is not None and last - first > JOURNAL_KEEP:
+            writer.submit(lambda conn: conn.execute(
+                "DELETE FROM category_journal WHERE seq <= (SELECT MAX(seq) FROM category_journal) - ?",
+                (JOURNAL_KEEP,)
+            ))
+        return model
+
+    def _rebuild(self, conn) -> _CategoryModel:
+        """Treino completo a partir das transações classificadas."""
+        model = _CategoryModel()
+        # Leitura consistente: posição do diário e tabela no mesmo instante
+        conn.execute("BEGIN")
+        try:
+            model.cursor = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM category_journal").fetchone()[0]
+            cursor = conn.execute('''
+                SELECT description, amount, source, category FROM transactions
+                WHERE COALESCE(category, '') <> ''
+            ''')
+            while True:
+                chunk = cursor.fetchmany(50_000)
+                if not chunk:
+                    break
+                descriptions, amounts, sources, categories = zip(*chunk)
+                model.apply(descriptions, amounts, sources, categories, +1)
+        finally:
+            conn.rollback()
+        return model
+
+    def _apply_journal(self, conn, model: _CategoryModel):
+        """Aplica o diário após o cursor: remove o estado antigo, soma o novo."""
+        entries = conn.execute('''
+            SELECT seq, old_category, old_description, old_amount, old_source,
+                   new_category, new_description, new_amount, new_source
+            FROM category_journal WHERE seq > ? ORDER BY seq
+        ''', (model.cursor,)).fetchall()
+
+        removed = [e[1:5] for e in entries if e[1]]
+        added = [e[5:9] for e in entries if e[5]]
+        if removed:
+            categories, descriptions, amounts, sources = zip(*removed)
+            model.apply(descriptions, amounts, sources, categories, -1)
+        if added:
+            categories, descriptions, amounts, sources = zip(*added)
+            model.apply(descriptions, amounts, sources, categories, +1)
+        model.cursor = entries[-1][0]
+
+    def suggest(self, descriptions: Sequence[str], amounts, sources: Sequence[str], k: int = 3) -> List[List[Tuple[str, float]]]:
+        """Top-k categorias (categoria, confiança 0-1) para cada linha informada."""
+        return self.sync().score(list(descriptions), amounts, list(sources), k)
+
+    @profiled
+    def suggest_pending(self, k: int = 3) -> "pd.DataFrame":
+        """
+        Sugestões para todos os grupos pendentes (uma linha por descrição), em um único lote.
+        Colunas: description, occurrences, suggestions (lista de (categoria, confiança)).
+        """
+        import pandas as pd
+
+        conn = db_instance.get_connection()
+        try:
+            groups = pd.read_sql_query('''
+                SELECT description, COUNT(*) AS occurrences, AVG(amount) AS amount, MAX(source) AS source
+                FROM transactions
+                WHERE COALESCE(category, '') = ''
+                GROUP BY description
+            ''', conn)
+        finally:
+            conn.close()
+
+        groups["suggestions"] = self.suggest(
+            groups["description"].tolist(), groups["amount"].to_numpy(), groups["source"].tolist(), k
+        ) if len(groups) else []
+        return groups.drop(columns=["amount", "source"])
@@ -0,0 +1,196 @@
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import TYPE_CHECKING, Dict, Sequence, Tuple
+import numpy as np
+from src.database.connection import db_instance
+from src.utils.profiling import profiled
+from src.services.forecast_service import data_version
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+CATEGORY_IGNORE = "⛔ IGNORADO"
+UNCATEGORIZED = "(Pendente)"
+
+WINDOWS = (3, 6, 12)   # Médias móveis (meses)
+RUN_RATE_MONTHS = 3    # Run-rate anualizado: média dos últimos 3 meses x 12
+CACHE_SIZE = 4         # Matrizes guardadas (chave: banco, versão dos dados e acervo)
+
+_CACHE: "OrderedDict[tuple, Tuple[np.ndarray, np.datetime64, np.ndarray]]" = OrderedDict()
+_ARCHIVE_CACHE: Dict[tuple, "pd.DataFrame"] = {}  # Anos do acervo (arquivos imutáveis)
+_CACHE_LOCK = threading.Lock()
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Média móvel de `window` meses ao longo do eixo dos meses (colunas), via soma acumulada:
+    O(n) para qualquer janela. As primeiras `window - 1` colunas ficam NaN (janela incompleta).
+    """
+    csum = np.cumsum(np.pad(values, ((0, 0), (1, 0))), axis=1)
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] >= window:
+        out[:, window - 1:] = (csum[:, window:] - csum[:, :-window]) / window
+    return out
+
+def shift_months(values: np.ndarray, months: int) -> np.ndarray:
+    """Matriz deslocada `months` colunas para a direita (valor de `months` meses atrás; NaN no início)."""
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] > months:
+        out[:, months:] = values[:, :-months]
+    return out
+
+class TrendService:
+    """
+    Tendências de gastos por categoria: médias móveis de 3/6/12 meses, variação sobre o mesmo
+    mês do ano anterior e run-rate anualizado.
+
+    Tudo sai de uma matriz densa categoria x mês (gasto líquido de estornos) montada uma vez
+    a partir do realizado mensal (`budget_actuals`, mantido por triggers) e dos totais dos anos
+    do acervo. As janelas são operações vetorizadas sobre essa matriz; a matriz fica em cache
+    até a próxima alteração nas transações.
+    """
+
+    @profiled
+    def matrix(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (categorias, meses datetime64[M], gastos[categoria, mês]) de todo o histórico,
+        sem ignorados. Gasto positivo = saída; categorias de receita ficam negativas.
+        """
+        conn = db_instance.get_connection()
+        try:
+            version = data_version(conn)[0]
+            catalog = tuple(conn.execute("SELECT year, archived_at FROM archive_catalog ORDER BY year").fetchall())
+        finally:
+            conn.close()
+
+        key = (str(db_instance.db_path), version, catalog)
+        with _CACHE_LOCK:
+            cached = _CACHE.get(key)
+            if cached is not None:
+                _CACHE.move_to_end(key)
+        if cached is None:
+            cached = self._build(catalog)
+            with _CACHE_LOCK:
+                _CACHE[key] = cached
+                while len(_CACHE) > CACHE_SIZE:
+                    _CACHE.popitem(last=False)
+        categories, first_month, values = cached
+        return categories, first_month + np.arange(values.shape[1]), values
+
+    def _build(self, catalog: tuple) -> Tuple[np.ndarray, np.datetime64, np.ndarray]:
+        import pandas as pd
+
+        conn = db_instance.get_connection()
+        try:
+            hot = pd.read_sql_query(
+                "SELECT month, category, amount FROM budget_actuals WHERE category <> ?",
+                conn, params=(CATEGORY_IGNORE,)
+            )
+        finally:
+            conn.close()
+        frames = [hot] + [self._archived_year(year, archived_at) for year, archived_at in catalog]
+        frames = [f for f in frames if not f.empty]
+        df = pd.concat(frames, ignore_index=True) if frames else hot
+
+        if df.empty:
+            return np.array([], dtype=str), np.datetime64(date.today(), "M"), np.zeros((0, 0))
+
+        categories, rows = np.unique(df["category"].replace("", UNCATEGORIZED).to_numpy(dtype=str),
+                                     return_inverse=True)
+        months = df["month"].to_numpy(dtype="datetime64[M]")
+        first, last = months.min(), months.max()
+        cols = (months - first).astype(np.int64)
+        values = np.zeros((len(categories), int((last - first).astype(np.int64)) + 1))
+        np.add.at(values, (rows, cols), -df["amount"].to_numpy(dtype=np.float64))
+        return categories, first, values
+
+    def _archived_year(self, year: int, archived_at: str) -> "pd.DataFrame":
+        """Totais mês x categoria de um ano do acervo (calculados uma vez por arquivamento)."""
+        import pandas as pd
+
+        key = (str(db_instance.db_path), year, archived_at)
+        with _CACHE_LOCK:
+            cached = _ARCHIVE_CACHE.get(key)
+        if cached is not None:
+            return cached
+        conn = db_instance.get_connection(archive=(f"{year}-01-01", f"{year}-12-31"))
+        try:
+            df = pd.read_sql_query(f'''
+                SELECT substr(date, 1, 7) AS month, COALESCE(category, '') AS category, SUM(amount) AS amount
+                FROM archive_{int(year)}.transactions
+                WHERE COALESCE(category, '') <> ?
+                GROUP BY 1, 2
+            ''', conn, params=(CATEGORY_IGNORE,))
+        finally:
+            conn.close()
+        with _CACHE_LOCK:
+            _ARCHIVE_CACHE[key] = df
+        return df
+
+    @profiled
+    def trends(self, start=None, end=None, windows: Sequence[int] = WINDOWS) -> "pd.DataFrame":
+        """
+        Série mensal por categoria no período (meses 'AAAA-MM' ou datas): month, category, spent,
+        mean_<n> para cada janela, yoy (gasto - mesmo mês do ano anterior), yoy_pct e
+        run_rate (média dos últimos 3 meses x 12). As janelas usam o histórico anterior a `start`.
+        """
+        import pandas as pd
+
+        categories, months, values = self.matrix()
+        derived = {"spent": values}
+        for window in windows:
+            derived[f"mean_{window}"] = rolling_mean(values, window)
+        last_year = shift_months(values, 12)
+        derived["yoy"] = values - last_year
+        with np.errstate(invalid="ignore", divide="ignore"):
+            derived["yoy_pct"] = np.where(last_year > 0, derived["yoy"] / last_year, np.nan)
+        derived["run_rate"] = rolling_mean(values, RUN_RATE_MONTHS) * 12
+
+        sel = self._month_slice(months, start, end)
+        n_cat, n_month = len(categories), sel.stop - sel.start
+        return pd.DataFrame({
+            "month": np.tile(months[sel].astype(str), n_cat),
+            "category": np.repeat(categories, n_month),
+            **{name: np.round(m[:, sel].ravel(), 2) for name, m in derived.items()},
+        })
+
+    @profiled
+    def summary(self, month=None) -> "pd.DataFrame":
+        """
+        Retrato por categoria num mês (padrão, ou se posterior aos dados: último mês com dados):
+        month de referência, spent, médias móveis, trailing_12 (últimos 12 meses), yoy_12
+        (variação sobre os 12 meses anteriores), run_rate anualizado e momentum
+        (média de 3 meses / média de 12 meses - 1).
+        """
+        import pandas as pd
+
+        categories, months, values = self.matrix()
+        if not len(months):
+            return pd.DataFrame(columns=["category", "month", "spent", *(f"mean_{w}" for w in WINDOWS),
+                                         "trailing_12", "yoy_12", "run_rate", "momentum"])
+        sel = self._month_slice(months, None, month)
+        i = sel.stop - 1
+        means = {w: rolling_mean(values, w)[:, i] if i >= 0 else np.full(len(categories), np.nan) for w in WINDOWS}
+        trailing = rolling_mean(values, 12) * 12
+        current = trailing[:, i] if i >= 0 else np.full(len(categories), np.nan)
+        previous = trailing[:, i - 12] if i >= 12 else np.full(len(categories), np.nan)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            yoy = np.where(previous > 0, current / previous - 1, np.nan)
+            momentum = np.where(means[12] > 0, means[3] / means[12] - 1, np.nan)
+        return pd.DataFrame({
+            "category": categories,
+            "month": str(months[max(i, 0)]),
+            "spent": np.round(values[:, i], 2) if i >= 0 else 0.0,
+            **{f"mean_{w}": np.round(m, 2) for w, m in means.items()},
+            "trailing_12": np.round(current, 2),
+            "yoy_12": np.round(yoy, 4),
+            "run_rate": np.round(means[RUN_RATE_MONTHS] * 12, 2),
+            "momentum": np.round(momentum, 4),
+        }).sort_values("trailing_12", ascending=False, ignore_index=True)
+
+    @staticmethod
+    def _month_slice(months: np.ndarray, start, end) -> slice:
+        """Colunas da matriz entre os meses de `start` e `end` (inclusive; None = sem limite)."""
+        lo = 0 if start is None else int(np.searchsorted(months, np.datetime64(str(start)[:7], "M")))
+        hi = len(months) if end is None else int(np.searchsorted(months, np.datetime64(str(end)[:7], "M"), "right"))
+        return slice(lo, max(lo, hi))
@@ -0,0 +1,170 @@
+import io
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+from src.database.connection import db_instance
+from src.database.writer import writer
+from src.models.transaction_batch import TransactionBatch
+from src.services.categorizer_service import CategorizerService
+from src.services.importer_service import ImporterService, SUPPORTED_EXTENSIONS
+from src.utils.parsers import parse_bb_csv, parse_sisbb_txt, is_sisbb_header
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class _FileOffset:
+    """Estado de leitura de um arquivo monitorado."""
+    path: str
+    offset: int = 0
+    header: Optional[bytes] = None  # Cabeçalho do CSV, reaplicado a cada trecho novo
+    capturing: bool = False         # TXT: cabeçalho da área de transações já visto
+
+class IngestionWatcher:
+    """
+    Worker de ingestão contínua de uma pasta (ex: pasta de downloads sincronizada com o banco).
+    A cada varredura, lê apenas os bytes adicionados desde o último offset gravado de cada
+    arquivo, salva as transações novas e aplica as regras somente a elas.
+    """
+
+    def __init__(self, folder, interval: float = 5.0, recursive: bool = False, settle_seconds: float = 10.0):
+        self.folder = Path(folder).expanduser()
+        self.interval = interval
+        self.recursive = recursive
+        # Arquivo sem alteração há este tempo é considerado completo (lê a última linha sem '\n')
+        self.settle_seconds = settle_seconds
+        self.importer = ImporterService()
+        self.categorizer = CategorizerService()
+
+    def _scan(self) -> List[Path]:
+        """Arquivos suportados presentes na pasta."""
+        pattern = "**/*" if self.recursive else "*"
+        return sorted(
+            p for p in self.folder.glob(pattern)
+            if p.is_file() and p.suffix.lower() in SUPPORTED_EXTENSIONS
+        )
+
+    def _load_offsets(self) -> Dict[str, _FileOffset]:
+        conn = db_instance.get_connection()
+        try:
+            rows = conn.execute("SELECT path, offset, header, capturing FROM ingest_offsets").fetchall()
+        finally:
+            conn.close()
+        return {r[0]: _FileOffset(r[0], r[1], r[2], bool(r[3])) for r in rows}
+
+    def _save_offsets(self, states: List[_FileOffset]):
+        rows = [(s.path, s.offset, s.header, int(s.capturing)) for s in states]
+        writer.run(lambda conn: conn.executemany('''
+            INSERT OR REPLACE INTO ingest_offsets (path, offset, header, capturing, updated_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', rows))
+
+    def _read_increment(self, path: Path, state: _FileOffset) -> TransactionBatch:
+        """
+        Lê o trecho novo do arquivo (até a última quebra de linha completa) e avança o offset.
+        Arquivos que encolheram (substituídos) são relidos do início.
+        O trecho já consumido é reinterpretado para continuar o índice de ocorrência das
+        assinaturas (compras idênticas em trechos diferentes não colidem), com os mesmos
+        hashes de uma importação do arquivo inteiro.
+        """
+        info = path.stat()
+        if info.st_size < state.offset:
+            logger.info(f"{path.name}: arquivo substituído, relendo do início.")
+            state.offset, state.header, state.capturing = 0, None, False
+        if info.st_size == state.offset:
+            return TransactionBatch.empty()
+
+        with open(path, "rb") as fh:
+            consumed = fh.read(state.offset)
+            data = fh.read(info.st_size - state.offset)
+
+        # Só consome linhas completas; o resto fica para a próxima varredura,
+        # exceto quando o arquivo já está estável (última linha sem '\n')
+        cut = data.rfind(b"\n") + 1
+        if time.time() - info.st_mtime >= self.settle_seconds:
+            cut = len(data)
+        if cut == 0:
+            return TransactionBatch.empty()
+        chunk = data[:cut]
+
+        if path.suffix.lower() == ".csv":
+            if state.header is None:
+                first_break = chunk.find(b"\n") + 1 or len(chunk)
+                state.header = chunk[:first_break]
+                chunk = chunk[first_break:]
+            batch = parse_bb_csv(io.BytesIO(state.header + chunk), path.name) if chunk.strip() else TransactionBatch.empty()
+        else:
+            batch = parse_sisbb_txt(io.BytesIO(chunk), path.name, capturing=state.capturing)
+            if not state.capturing:
+                state.capturing = any(is_sisbb_header(line.strip()) for line in chunk.decode("latin-1").split("\n"))
+
+        if consumed and len(batch):
+            batch = batch.continuing(self._parse_consumed(path, consumed))
+
+        state.offset += cut
+        return batch
+
+    @staticmethod
+    def _parse_consumed(path: Path, consumed: bytes) -> TransactionBatch:
+        """Linhas já lidas do arquivo (do início até o offset), para a contagem de ocorrências."""
+        if path.suffix.lower() == ".csv":
+            return parse_bb_csv(io.BytesIO(consumed), path.name)
+        return parse_sisbb_txt(io.BytesIO(consumed), path.name)
+
+    def poll_once(self) -> dict:
+        """Uma varredura da pasta. Retorna estatísticas da rodada."""
+        stats = {"files": 0, "read": 0, "saved": 0, "classified": 0, "errors": []}
+        offsets = self._load_offsets()
+        changed, batches = [], []
+
+        for path in self._scan():
+            state = offsets.get(str(path)) or _FileOffset(str(path))
+            previous = state.offset
+            try:
+                batch = self._read_increment(path, state)
+            except Exception as e:
+                stats["errors"].append(f"{path.name}: Erro crítico - {str(e)}")
+                continue
+
+            if state.offset != previous:
+                changed.append(state)
+                stats["files"] += 1
+                batches.append(batch)
+
+        new_rows = TransactionBatch.concat(batches)
+        if len(new_rows):
+            stats["read"] = len(new_rows)
+            stats["saved"] = self.importer._save_batch(new_rows)
+            # Regras aplicadas apenas às linhas desta rodada
+            stats["classified"] = self.categorizer.run_auto_classification(hash_ids=new_rows.keys.tolist())
+
+        # Offsets gravados após as transações: no pior caso um trecho é relido (e deduplicado pelo hash)
+        if changed:
+            self._save_offsets(changed)
+        return stats
+
+    def run(self, stop_event: Optional[threading.Event] = None, on_poll=None):
+        """
+        Laço de monitoramento até `stop_event` ser sinalizado (ou Ctrl+C).
+        Falhas de uma varredura (ex: banco bloqueado) são registradas e a próxima tenta de novo:
+        os offsets só avançam depois da gravação.
+        """
+        stop_event = stop_event or threading.Event()
+        logger.info(f"Monitorando {self.folder} a cada {self.interval}s.")
+        while not stop_event.is_set():
+            try:
+                stats = self.poll_once()
+            except Exception:
+                logger.exception("Falha na varredura da pasta monitorada; nova tentativa na próxima rodada.")
+                stop_event.wait(self.interval)
+                continue
+            if stats["files"] or stats["errors"]:
+                logger.info(
+                    f"Ingestão: {stats['files']} arquivo(s), {stats['saved']} nova(s), "
+                    f"{stats['classified']} classificada(s)."
+                )
+                if on_poll:
+                    on_poll(stats)
+            stop_event.wait(self.interval)
@@ -0,0 +1,59 @@
+"""
+Árvore de categorias com expandir/recolher em qualquer nível, para telas Streamlit.
+
+A árvore chega pronta (CategoryService.tree/rollup, uma consulta por rerun); abrir ou fechar um
+nó só muda o conjunto de nós expandidos no session_state e filtra as linhas em memória.
+"""
+from typing import TYPE_CHECKING, Dict, Optional, Set
+from src.services.category_service import CategoryService
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+INDENT = "&emsp;"  # Recuo por nível (entidade HTML: espaços no início da linha são descartados)
+
+def expanded_nodes(key: str) -> Set[str]:
+    """Conjunto (mutável) de nós expandidos da árvore `key` nesta sessão."""
+    import streamlit as st
+
+    return st.session_state.setdefault(f"{key}_expanded", set())
+
+def _toggle(key: str, name: str):
+    expanded = expanded_nodes(key)
+    expanded.symmetric_difference_update({name})
+
+def _set_all(key: str, names):
+    expanded = expanded_nodes(key)
+    expanded.clear()
+    expanded.update(names)
+
+def render_category_tree(tree: "pd.DataFrame", key: str, values: Optional[Dict[str, str]] = None,
+                         container=None) -> "pd.DataFrame":
+    """
+    Desenha as linhas visíveis de `tree` (raízes + filhos dos nós abertos) em `container`
+    (padrão: a página). `values` = {coluna: formato}, ex: {'total': 'R$ {:,.2f}'}, exibidas
+    ao lado do nome. Retorna as linhas visíveis (para gráficos no mesmo nível de detalhe).
+    """
+    import streamlit as st
+
+    container = container or st
+    expanded = expanded_nodes(key)
+    parents = tree.loc[tree["children"] > 0, "name"].tolist()
+    visible = tree[CategoryService.visible(tree, expanded)]
+
+    if parents:
+        c_open, c_close = container.columns(2)
+        c_open.button("Expandir tudo", key=f"{key}_open_all", on_click=_set_all, args=(key, parents),
+                      use_container_width=True)
+        c_close.button("Recolher", key=f"{key}_close_all", on_click=_set_all, args=(key, []),
+                       use_container_width=True)
+
+    for row in visible.itertuples(index=False):
+        c_toggle, c_label = container.columns([1, 7], vertical_alignment="center")
+        if row.children:
+            c_toggle.button("▾" if row.name in expanded else "▸", key=f"{key}_toggle_{row.name}",
+                            on_click=_toggle, args=(key, row.name))
+        label = INDENT * int(row.depth) + (f"**{row.name}**" if row.children else row.name)
+        extra = " · ".join(fmt.format(getattr(row, col)) for col, fmt in (values or {}).items())
+        c_label.markdown(f"{label}  \n{INDENT * int(row.depth)}:gray[{extra}]" if extra else label)
+    return visible
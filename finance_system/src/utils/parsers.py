@@ -1,21 +1,19 @@
-import pandas as pd
 import re
-from typing import List
 from datetime import datetime
-from src.models.transaction import Transaction
-import hashlib
+from typing import TYPE_CHECKING
 
-def _generate_hash(t: Transaction) -> str:
-    """Gera ID único baseado em Data + Valor + Descrição."""
-    raw = f"{t.date}{t.amount:.2f}{t.description.strip()}"
-    return hashlib.md5(raw.encode()).hexdigest()
+if TYPE_CHECKING:
+    from src.models.transaction_batch import TransactionBatch
 
-def parse_bb_csv(file_buffer, filename: str) -> List[Transaction]:
+def parse_bb_csv(file_buffer, filename: str) -> "TransactionBatch":
     """
     Lê CSV do Banco do Brasil.
     Correção: Ajustado para ler decimais com PONTO (.) conforme amostra 'extrato (1).csv'.
+    Processamento vetorizado (colunas inteiras), sem iterar linha a linha.
     """
-    transactions = []
+    import pandas as pd
+    from src.models.transaction_batch import TransactionBatch
+
     try:
         # Tenta ler com encoding comum do BB (latin-1)
         # CORREÇÃO AQUI: decimal='.' e thousands=None (padrão US)
@@ -30,69 +28,63 @@ def parse_bb_csv(file_buffer, filename: str) -> List[Transaction]:
     # Verifica colunas essenciais
     required = ["Data", "Histórico", "Valor"]
     if not all(col in df.columns for col in required):
-        return []
+        return TransactionBatch.empty()
 
-    for _, row in df.iterrows():
-        # Ignora linhas de saldo/totais ou vazias
-        hist = str(row["Histórico"])
-        if "Saldo" in hist or "S A L D O" in hist:
-            continue
-            
-        try:
-            # Data
-            dt_obj = pd.to_datetime(row["Data"], format="%d/%m/%Y").date()
-            
-            # Valor (Já vem float correto devido ao decimal='.')
-            amount = float(row["Valor"])
-            
-            # Descrição
-            desc = hist.strip()
-            # Limpeza de Prefixos Comuns
-            desc = re.sub(r'Compra com Cartão - \d{2}/\d{2} \d{2}:\d{2} ', '', desc)
-            desc = re.sub(r'Pix - Enviado - \d{2}/\d{2} \d{2}:\d{2} ', 'Pix env: ', desc)
-            desc = re.sub(r'Pix - Recebido - \d{2}/\d{2} \d{2}:\d{2} ', 'Pix rec: ', desc)
-
-            t = Transaction(
-                date=dt_obj,
-                description=desc,
-                amount=amount,
-                source=f"CSV: {filename}",
-                category=None,
-                is_manual=False
-            )
-            t.hash_id = _generate_hash(t)
-            transactions.append(t)
-        except Exception as e:
-            # Pula linhas com erro de conversão
-            continue
-            
-    return transactions
+    hist = df["Histórico"].astype(str)
+
+    # Ignora linhas de saldo/totais ou vazias
+    is_balance = hist.str.contains("Saldo", regex=False) | hist.str.contains("S A L D O", regex=False)
+
+    # Data e Valor (Já vem float correto devido ao decimal='.'); linhas com erro de conversão são puladas
+    dates = pd.to_datetime(df["Data"], format="%d/%m/%Y", errors="coerce")
+    amounts = pd.to_numeric(df["Valor"], errors="coerce")
+    valid = ~is_balance & dates.notna() & amounts.notna()
 
-def parse_sisbb_txt(file_buffer, filename: str) -> List[Transaction]:
+    # Descrição: Limpeza de Prefixos Comuns
+    desc = hist[valid].str.strip()
+    desc = desc.str.replace(r'Compra com Cartão - \d{2}/\d{2} \d{2}:\d{2} ', '', regex=True)
+    desc = desc.str.replace(r'Pix - Enviado - \d{2}/\d{2} \d{2}:\d{2} ', 'Pix env: ', regex=True)
+    desc = desc.str.replace(r'Pix - Recebido - \d{2}/\d{2} \d{2}:\d{2} ', 'Pix rec: ', regex=True)
+
+    return TransactionBatch.from_columns(
+        dates=dates[valid].to_numpy(dtype="datetime64[D]"),
+        descriptions=desc.to_numpy(dtype=object),
+        amounts=amounts[valid].to_numpy(dtype="float64"),
+        source=f"CSV: {filename}",
+    )
+
+def is_sisbb_header(line: str) -> bool:
+    """Linha de cabeçalho da fatura SISBB que inicia a área de transações."""
+    return "Data" in line and "Transações" in line
+
+def parse_sisbb_txt(file_buffer, filename: str, capturing: bool = False) -> "TransactionBatch":
     """
     Lê arquivo de fatura do Cartão (TXT/Spool).
     Mantém lógica brasileira (Vírgula para decimais).
+    `capturing=True` permite ler um trecho anexado após o cabeçalho (leitura incremental).
     """
+    from src.models.transaction_batch import TransactionBatch
+
     try:
         content = file_buffer.getvalue().decode('latin-1')
     except:
         content = file_buffer.getvalue().decode('utf-8')
-        
-    transactions = []
-    
+
+    dates, descriptions, amounts = [], [], []
+
     # Regex ajustado para capturar a linha da fatura
     # Ex: 27.11    BONNAPAN    52,00
     # O ano geralmente vem no cabeçalho, mas o BB repete data completa às vezes ou só DD.MM
     # Vamos assumir DD.MM.AAAA com base no seu arquivo sample
     pattern = re.compile(r"^(\d{2}\.\d{2}\.\d{4}?)(.*?)\s+(-?[\d\.]+,\d{2})")
 
-    capture_mode = False
-    
+    capture_mode = capturing
+
     for line in content.split('\n'):
         line = line.strip()
-        
+
         # Gatilhos de início e fim de leitura
-        if "Data" in line and "Transações" in line:
+        if is_sisbb_header(line):
             capture_mode = True
             continue
         if "--------" in line and capture_mode:
@@ -105,7 +97,7 @@ def parse_sisbb_txt(file_buffer, filename: str) -> List[Transaction]:
         match = pattern.search(line)
         if match:
             dt_str, desc, val_str = match.groups()
-            
+
             # Filtra linhas de pagamento ou saldo anterior
             if "SALDO FATURA" in desc or "PGTO DEBITO" in desc:
                 continue
@@ -114,26 +106,25 @@ def parse_sisbb_txt(file_buffer, filename: str) -> List[Transaction]:
                 # Tratamento de Valor (Padrão BR: 1.000,00 -> 1000.00)
                 clean_val = val_str.replace('.', '').replace(',', '.')
                 amount = float(clean_val)
-                
+
                 # Regra: No TXT, gasto vem positivo. Inverter para negativo.
                 amount = -abs(amount)
 
                 # Tratamento de Data
-                # Se vier apenas DD.MM, precisamos adivinhar o ano (arriscado), 
+                # Se vier apenas DD.MM, precisamos adivinhar o ano (arriscado),
                 # mas seu sample mostra DD.MM.AAAA (12.09.2024), então parsing direto.
                 dt_obj = datetime.strptime(dt_str, "%d.%m.%Y").date()
-
-                t = Transaction(
-                    date=dt_obj,
-                    description=desc.strip(),
-                    amount=amount,
-                    source=f"Card: {filename}",
-                    category=None,
-                    is_manual=False
-                )
-                t.hash_id = _generate_hash(t)
-                transactions.append(t)
             except ValueError:
                 continue
 
-    return transactions
\ No newline at end of file
+            # Acumula em colunas; o lote é montado de uma vez ao final
+            dates.append(dt_obj)
+            descriptions.append(desc.strip())
+            amounts.append(amount)
+
+    return TransactionBatch.from_columns(
+        dates=dates,
+        descriptions=descriptions,
+        amounts=amounts,
+        source=f"Card: {filename}",
+    )
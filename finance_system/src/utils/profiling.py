@@ -0,0 +1,207 @@
+"""
+Perfilamento opcional (opt-in) das reruns do Streamlit.
+
+Serviços marcam seus métodos com `@profiled` (ou trechos com `timed(...)`); o custo é uma
+checagem de atributo quando nenhuma medição está ativa (CLI, páginas com o painel desligado).
+A página abre a medição no topo (`begin_page`) e a encerra no fim (`render_sidebar`), que
+mostra no sidebar chamadas, tempo total e tempo próprio por função. Com "Capturar cProfile",
+a rerun também é gravada em data/profiles/*.prof (abrir com `python -m pstats` ou snakeviz).
+
+A medição vale por thread: o Streamlit executa cada sessão em sua própria thread.
+"""
+import functools
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ENV = "FINANCE_PROFILE"          # "1" liga o painel por padrão
+PROFILE_DIR = Path("data") / "profiles"  # Mesmo diretório local do banco de fallback
+TOP_FUNCTIONS = 12                       # Linhas do resumo do cProfile no painel
+
+_local = threading.local()
+
+@dataclass
+class _Stat:
+    calls: int = 0
+    total_ms: float = 0.0   # Inclusivo (com as chamadas aninhadas)
+    self_ms: float = 0.0    # Exclusivo (descontadas as chamadas medidas aninhadas)
+    max_ms: float = 0.0
+
+class RerunProfile:
+    """Tempos de uma execução da página: uma entrada por nome medido, com aninhamento."""
+
+    def __init__(self, label: str, capture: bool = False):
+        self.label = label
+        self.stats: Dict[str, _Stat] = {}
+        self._stack: List[list] = []  # [nome, início, tempo dos filhos]
+        self.started = time.perf_counter()
+        self.elapsed_ms: Optional[float] = None
+        self.dump_path: Optional[Path] = None
+        self.summary: Optional[str] = None
+        self._profiler = None
+        if capture:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            try:
+                self._profiler.enable()
+            except ValueError:
+                # Outra sessão já está com o cProfile ligado (um por processo)
+                logger.warning("cProfile já ativo em outra sessão; capturando só os tempos.")
+                self._profiler = None
+
+    def enter(self, name: str):
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def exit(self):
+        name, started, children = self._stack.pop()
+        elapsed = (time.perf_counter() - started) * 1000
+        stat = self.stats.setdefault(name, _Stat())
+        stat.calls += 1
+        stat.max_ms = max(stat.max_ms, elapsed)
+        # Recursão: só a chamada mais externa entra no total inclusivo
+        if not any(frame[0] == name for frame in self._stack):
+            stat.total_ms += elapsed
+        stat.self_ms += elapsed - children
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    def close(self, dump_dir: Path = PROFILE_DIR) -> "RerunProfile":
+        """Encerra a medição; com cProfile, grava o .prof e guarda o resumo das funções mais caras."""
+        self.elapsed_ms = (time.perf_counter() - self.started) * 1000
+        if self._profiler is not None:
+            import io
+            import pstats
+
+            self._profiler.disable()
+            dump_dir.mkdir(parents=True, exist_ok=True)
+            slug = re.sub(r"[^\w-]+", "_", self.label).strip("_") or "rerun"
+            self.dump_path = dump_dir / f"{slug}_{datetime.now():%Y%m%d_%H%M%S_%f}.prof"
+            self._profiler.dump_stats(self.dump_path)
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+            self.summary = out.getvalue()
+            self._profiler = None
+        return self
+
+    def rows(self) -> List[dict]:
+        """Resumo por nome, do maior tempo total para o menor."""
+        return sorted(({
+            "name": name,
+            "calls": s.calls,
+            "total_ms": round(s.total_ms, 1),
+            "self_ms": round(s.self_ms, 1),
+            "max_ms": round(s.max_ms, 1),
+        } for name, s in self.stats.items()), key=lambda r: r["total_ms"], reverse=True)
+
+def current() -> Optional[RerunProfile]:
+    """Medição ativa nesta thread (None = perfilamento desligado)."""
+    return getattr(_local, "profile", None)
+
+def start(label: str, capture: bool = False) -> RerunProfile:
+    """Inicia a medição desta thread (descarta uma anterior não encerrada, ex: após st.stop)."""
+    stop()
+    _local.profile = RerunProfile(label, capture)
+    return _local.profile
+
+def stop() -> Optional[RerunProfile]:
+    """Encerra e devolve a medição desta thread, se houver."""
+    profile = getattr(_local, "profile", None)
+    _local.profile = None
+    return profile.close() if profile is not None else None
+
+@contextmanager
+def timed(name: str):
+    """Mede um trecho: `with timed("dashboard.load"): ...`."""
+    profile = getattr(_local, "profile", None)
+    if profile is None:
+        yield
+        return
+    profile.enter(name)
+    try:
+        yield
+    finally:
+        profile.exit()
+
+def profiled(func=None, *, name: Optional[str] = None):
+    """Decorador de métodos de serviço: `@profiled` ou `@profiled(name="...")`."""
+    def decorate(f):
+        label = name or f.__qualname__
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            profile = getattr(_local, "profile", None)
+            if profile is None:
+                return f(*args, **kwargs)
+            profile.enter(label)
+            try:
+                return f(*args, **kwargs)
+            finally:
+                profile.exit()
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
+
+# --- STREAMLIT ---
+
+def begin_page(label: str) -> Optional[RerunProfile]:
+    """Chamar no topo da página: inicia a medição se o painel estiver ligado nesta sessão."""
+    import streamlit as st
+
+    enabled = st.session_state.get("profiling_on", os.environ.get(PROFILE_ENV) == "1")
+    if not enabled:
+        stop()
+        return None
+    return start(label, capture=st.session_state.get("profiling_cprofile_on", False))
+
+def _keep(widget_key: str, state_key: str):
+    """Copia o valor do widget para uma chave comum (o Streamlit descarta chaves de widget entre páginas)."""
+    import streamlit as st
+    st.session_state[state_key] = st.session_state[widget_key]
+
+def render_sidebar():
+    """Chamar no fim da página: encerra a medição e desenha o painel compacto no sidebar."""
+    import streamlit as st
+
+    profile = stop()
+    enabled = st.session_state.get("profiling_on", os.environ.get(PROFILE_ENV) == "1")
+    with st.sidebar.expander("⏱️ Perfil da execução", expanded=profile is not None):
+        st.toggle("Medir tempos", value=enabled, key="_profiling_toggle",
+                  on_change=_keep, args=("_profiling_toggle", "profiling_on"))
+        st.checkbox("Capturar cProfile", value=st.session_state.get("profiling_cprofile_on", False),
+                    key="_profiling_cprofile", disabled=profile is None,
+                    on_change=_keep, args=("_profiling_cprofile", "profiling_cprofile_on"))
+        if profile is None:
+            st.caption("Ligue para medir a próxima execução desta página.")
+            return
+
+        rows = profile.rows()
+        top_level = sum(r["self_ms"] for r in rows)  # Soma dos próprios = tempo medido sem dupla contagem
+        st.caption(
+            f"**{profile.elapsed_ms:.0f} ms** na rerun · {top_level:.0f} ms em serviços medidos · "
+            f"{sum(r['calls'] for r in rows)} chamadas"
+        )
+        if rows:
+            st.dataframe(
+                rows,
+                column_config={
+                    "name": "Função",
+                    "calls": "Chamadas",
+                    "total_ms": st.column_config.NumberColumn("Total (ms)", format="%.1f"),
+                    "self_ms": st.column_config.NumberColumn("Próprio (ms)", format="%.1f"),
+                    "max_ms": st.column_config.NumberColumn("Máx (ms)", format="%.1f"),
+                },
+                hide_index=True,
+                use_container_width=True,
+            )
+        if profile.dump_path:
+            st.caption(f"cProfile: `{profile.dump_path}`")
+            st.code(profile.summary, language="text")
@@ -0,0 +1,61 @@
+"""
+Verificação de ida e volta do caminho legado (Transaction <-> TransactionBatch).
+
+Converte um lote para objetos `Transaction` e de volta, com o hash_id em cada formato
+aceito (hex legado de 32 caracteres, hex curto de 16 exposto pelo banco e chave inteira),
+e confere que as chaves gravadas no banco e as colunas se preservam.
+
+Uso (a partir de finance_system/):
+    python tools/batch_roundtrip.py          # código de saída 1 se alguma verificação falhar
+"""
+import sys
+from dataclasses import replace
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.models.transaction import transaction_key  # noqa: E402
+from src.models.transaction_batch import TransactionBatch  # noqa: E402
+
+def sample_batch() -> TransactionBatch:
+    """Lote com repetição no mesmo dia (índice de ocorrência '#1') e origem única."""
+    return TransactionBatch.from_columns(
+        dates=["2025-03-05", "2025-03-05", "2025-03-06"],
+        descriptions=["PADARIA", "PADARIA", "MERCADO"],
+        amounts=[-12.5, -12.5, -80.0],
+        source="CSV: extrato.csv",
+        category="Alimentação",
+    )
+
+def main() -> int:
+    batch = sample_batch()
+    objects = batch.to_transactions()
+    variants = {
+        "hex legado (32)": objects,
+        "hex curto (16)": [replace(t, hash_id=t.hash_id[:16]) for t in objects],
+        "chave inteira": [replace(t, hash_id=transaction_key(t.hash_id)) for t in objects],
+        "sem hash_id": [replace(t, hash_id=None) for t in objects],
+    }
+
+    failures = 0
+    for label, transactions in variants.items():
+        back = TransactionBatch.from_transactions(transactions)
+        checks = {
+            "chaves": back.keys.tolist() == batch.keys.tolist(),
+            "colunas": list(back.to_records()) == list(batch.to_records()),
+        }
+        if label == "hex legado (32)":
+            checks["digest"] = back.hash_ids == batch.hash_ids
+        if label == "sem hash_id":
+            # Sem assinatura, cada objeto é um lote próprio: a repetição volta à chave legada
+            checks = {"colunas": [r[1:] for r in back.to_records()] == [r[1:] for r in batch.to_records()]}
+        ok = all(checks.values())
+        failures += not ok
+        detail = ", ".join(f"{name} {'ok' if passed else 'DIVERGE'}" for name, passed in checks.items())
+        print(f"{'OK ' if ok else 'FALHOU':7} {label:16} {detail}")
+
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
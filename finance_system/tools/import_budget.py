@@ -0,0 +1,94 @@
+"""
+Orçamento de tempo de importação (cold start).
+
+Mede, em um interpretador limpo por módulo, o tempo cumulativo de `import` via
+`python -X importtime` e compara com o orçamento definido abaixo. Também mede o
+primeiro uso do banco (resolução do caminho + schema), que deixou de acontecer
+no import.
+
+Uso (a partir de finance_system/):
+    python tools/import_budget.py            # tabela + código de saída 1 se estourar
+    python tools/import_budget.py --json     # saída legível por máquina
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Orçamento em milissegundos (tempo cumulativo do módulo, interpretador frio)
+BUDGET_MS = {
+    "src.database.connection": 40,
+    "src.services.stats_service": 40,
+    "src.services.importer_service": 60,
+    "src.services.categorizer_service": 60,
+    "src.services.search_service": 60,
+    "src.services.loan_service": 250,  # NumPy é necessário para qualquer cálculo de contrato
+    "src.services.suggestion_service": 250,  # NumPy: vetores de trigramas
+}
+
+# Primeiro acesso ao banco (caminho + DDL idempotente)
+FIRST_USE_BUDGET_MS = 150
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(\S+)\s*$")
+
+def measure_import(module: str) -> float:
+    """Tempo cumulativo (ms) de importação de `module` em um processo novo."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env={**os.environ, "PYTHONPATH": str(ROOT)}
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {module}: {proc.stderr.strip().splitlines()[-1]}")
+
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match and match.group(3) == module:
+            return int(match.group(2)) / 1000
+    raise RuntimeError(f"Tempo de importação de {module} não encontrado.")
+
+def measure_first_use() -> float:
+    """Tempo (ms) do primeiro acesso a `db_instance.db_path`."""
+    code = (
+        "import time; from src.database.connection import db_instance; "
+        "t = time.perf_counter(); db_instance.db_path; print((time.perf_counter() - t) * 1000)"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True, text=True, env={**os.environ, "PYTHONPATH": str(ROOT)}
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Falha no primeiro uso do banco: {proc.stderr.strip().splitlines()[-1]}")
+    return float(proc.stdout.strip().splitlines()[-1])
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Verifica o orçamento de tempo de importação.")
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON.")
+    args = parser.parse_args()
+
+    results = []
+    for module, budget in BUDGET_MS.items():
+        elapsed = measure_import(module)
+        results.append({"target": module, "ms": round(elapsed, 1), "budget_ms": budget, "ok": elapsed <= budget})
+
+    elapsed = measure_first_use()
+    results.append({
+        "target": "db_instance.db_path (primeiro uso)",
+        "ms": round(elapsed, 1), "budget_ms": FIRST_USE_BUDGET_MS, "ok": elapsed <= FIRST_USE_BUDGET_MS
+    })
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        for r in results:
+            flag = "OK " if r["ok"] else "ESTOUROU"
+            print(f"{flag:9} {r['ms']:8.1f} ms / {r['budget_ms']:4d} ms  {r['target']}")
+
+    return 0 if all(r["ok"] for r in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())